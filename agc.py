@@ -63,8 +63,11 @@ class AutomaticGainControl:
             return samples
 
         # Calculate the instantaneous power of the current batch using
-        # mean square as power.
-        current_batch_power = np.mean(samples**2)
+        # mean square as power.  Square in floating point: integer
+        # samples would overflow, and float32 stays float32.
+        current_batch_power = float(
+            np.mean(np.square(samples, dtype=np.result_type(samples.dtype, np.float32)))
+        )
 
         # Update the internal power estimate using exponential smoothing.
         self._current_power_estimate = (
@@ -85,8 +88,9 @@ class AutomaticGainControl:
             + (1 - self._smoothing_factor) * self._current_gain
         )
 
-        self._current_gain = smoothed_gain
-        return samples * smoothed_gain
+        # A Python float, so that float32 samples stay float32.
+        self._current_gain = float(smoothed_gain)
+        return samples * self._current_gain
 
     def get_current_gain(self) -> float:
         """Returns the smoothed gain that was applied to the most
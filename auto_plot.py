@@ -1,12 +1,14 @@
 #! /usr/bin/env python3
 
 import argparse
+import math
 import sys
 from pathlib import Path
 
 import matplotlib.pyplot as plt
 import pandas as pd
-from scipy.interpolate import interp1d
+
+import sweep
 
 
 def main(argv):
@@ -32,13 +34,21 @@ def main(argv):
 
     plt.figure(figsize=(12, 8))
 
-    plt.errorbar(
-        df["power_dBm"],
-        df["sinad_mean_dB"],
-        yerr=df["sinad_std_dB"],
-        fmt="o",
-        label="AI6KG soft meter",
-    )
+    # A sweep of several channels has a set of columns per channel,
+    # suffixed _ch<n>; one channel has them plain.
+    prefix = "sinad_mean_dB_ch"
+    suffixes = [
+        column[len("sinad_mean_dB") :] for column in df if column.startswith(prefix)
+    ]
+    suffixes = suffixes or [""]
+    for suffix in suffixes:
+        plt.errorbar(
+            df["power_dBm"],
+            df[f"sinad_mean_dB{suffix}"],
+            yerr=df[f"sinad_std_dB{suffix}"],
+            fmt="o",
+            label=f"AI6KG soft meter {suffix[1:]}".rstrip(),
+        )
 
     # The Keithley is a check on the soft meter, not part of a sweep, so
     # it is only present in files from a run with --keithley.
@@ -51,20 +61,31 @@ def main(argv):
             label="Keithley 2015",
         )
 
-    interp_func = interp1d(df["sinad_mean_dB"], df["power_dBm"], kind="linear")
-
     target_sinad = 12.0
-    try:
-        interpolated_power = interp_func(target_sinad)
+    for suffix in suffixes:
+        name = f"{suffix[1:]} " if suffix else ""
+        # In power order, as auto_sinad.py reports it, so that the plot
+        # and the CSV's sweep agree on a non-monotonic curve.
+        points = list(
+            zip(
+                df["power_dBm"],
+                df[f"sinad_mean_dB{suffix}"],
+                df[f"sinad_std_dB{suffix}"],
+                strict=True,
+            )
+        )
+        interpolated_power = sweep.crossing(points, target_sinad)
+        if math.isnan(interpolated_power):
+            print(f"{name}SINAD never crosses {target_sinad} dB")
+            continue
         plt.annotate(
-            f"{target_sinad} dB SINAD @: {interpolated_power:.2f} dBm\n(interpolated)",
+            f"{name}{target_sinad} dB SINAD @: {interpolated_power:.2f} dBm\n"
+            "(interpolated)",
             xy=(interpolated_power, target_sinad),
             xytext=(interpolated_power + 5, target_sinad - 3),
             arrowprops={"facecolor": "blue", "shrink": 0.05, "alpha": 0.25},
         )
         plt.plot(interpolated_power, target_sinad, "ro", markersize=8, marker="x")
-    except ValueError as e:
-        print(f"Could not interpolate for SINAD={target_sinad} dB: {e}")
 
     plt.xlabel("Power (dBm)")
     plt.ylabel("SINAD (dB)")
@@ -1,16 +1,21 @@
 #! /usr/bin/env python3
 
 import argparse
+import contextlib
 import sys
 
 import numpy as np
-import pandas as pd
 import pyvisa
 
+import capture
+import checkpoint
 import filters
+import keithley_burst
 import sinad as sinad_pkg
+import sinad_pool
 import source as source_pkg
-from instruments import hp_8662a, keithley_2015, rs_smb100a
+import sweep
+import sweep_settings
 
 DEFAULT_RS_SMB100A_SIG_GEN_RESOURCE = "TCPIP::rssmb100a180609.local::INSTR"
 DEFAULT_HP_8663A_SIG_GEN_RESOURCE = "TCPIP::e5810a::gpib0,25::INSTR"
@@ -18,17 +23,30 @@ DEFAULT_KEITHLEY_2015_RESOURCE = "TCPIP::e5810a::gpib0,22::INSTR"
 
 DEFAULT_SIGGEN = "hp8663a"
 
+DEFAULTS = sweep_settings.DEFAULTS
+
+
+# The instrument drivers are imported where they are used, so that only
+# the ones a sweep uses need be present.
+
 
 def _make_hp8663a(_resource_manager, resource_name):
+    from instruments import hp_8662a  # noqa: PLC0415
+
     return hp_8662a.HP8663A(resource_name)
 
 
 def _make_rs_smb100a(resource_manager, resource_name):
+    from instruments import rs_smb100a  # noqa: PLC0415
+
     return rs_smb100a.RhodeSchwarzSMB100A(resource_manager, resource_name)
 
 
 # Signal generator name -> (factory, default VISA resource).  The two
-# drivers take different arguments, hence the factories.
+# drivers take different arguments, hence the factories.  A factory
+# takes the resource manager and resource name and returns a context
+# manager that opens the generator, with set_power() and set_output(),
+# which is all a stand-in needs to be added here.
 SIGGENS = {
     "hp8663a": (_make_hp8663a, DEFAULT_HP_8663A_SIG_GEN_RESOURCE),
     "rssmb100a": (_make_rs_smb100a, DEFAULT_RS_SMB100A_SIG_GEN_RESOURCE),
@@ -73,6 +91,57 @@ def _summarize(readings):
     return (valid.mean(), valid.std(), valid.size)
 
 
+def _update(stats, readings):
+    """
+    Adds a batch of readings to each channel's statistics.
+
+    Args:
+        stats (list[sweep.RunningStats]): one per channel
+        readings (numpy.ndarray): a reading per record, or a row of
+                                  readings, one per channel, per record
+    """
+    columns = np.reshape(readings, (len(readings), len(stats))).T
+    for level, column in zip(stats, columns, strict=True):
+        level.update(column)
+
+
+def _read_filtered(source, audio_filter, decimator=None):
+    """
+    Reads a record from the source, decimates it and band-limits it.
+
+    A continuous source that overran has a gap in its stream, so the
+    filters are restarted and the record read again from the new stream.
+
+    Args:
+        source (source.Source): the source
+        audio_filter (filters.FirFilter): the filter, or None
+        decimator (filters.Decimator): the decimator, or None
+
+    Returns:
+        numpy.ndarray: the filtered record, a row per channel if the
+                       source reads several
+    """
+    while True:
+        try:
+            samples = source.read()
+        except source_pkg.OverrunError as e:
+            print(f" ({e})", end="")
+            if decimator is not None:
+                decimator.reset()
+            if audio_filter:
+                audio_filter.reset()
+            continue
+        if decimator is not None:
+            if not source.continuous:
+                decimator.reset()
+            samples = decimator(samples)
+        if audio_filter:
+            if not source.continuous:
+                audio_filter.reset()
+            samples = audio_filter(samples)
+        return samples
+
+
 def _open_keithley(resource_manager, resource_name, hpf_cutoff, lpf_cutoff):
     """
     Opens and configures the Keithley 2015 as a SINAD reference.
@@ -86,6 +155,8 @@ def _open_keithley(resource_manager, resource_name, hpf_cutoff, lpf_cutoff):
     Returns:
         keithley_2015.Keithley2015: the opened meter
     """
+    from instruments import keithley_2015  # noqa: PLC0415
+
     meter = keithley_2015.Keithley2015(resource_manager, resource_name).open()
     meter.inst.timeout = 10e3
     meter.reset()
@@ -116,123 +187,378 @@ def run(
     siggen_resource_name,
     keithley_resource_name,
     output_path,
+    prefetch=DEFAULTS.prefetch,
+    jobs=DEFAULTS.jobs,
+    settle_time=DEFAULTS.settle_time,
+    strategy=DEFAULTS.strategy,
+    start_dBm=DEFAULTS.start_dBm,
+    stop_dBm=DEFAULTS.stop_dBm,
+    num_points=DEFAULTS.num_points,
+    target_dB=DEFAULTS.target_dB,
+    tolerance_dB=DEFAULTS.tolerance_dB,
+    coarse_step_dB=DEFAULTS.coarse_step_dB,
+    min_readings=DEFAULTS.min_readings,
+    max_readings=DEFAULTS.max_readings,
+    target_sem_dB=DEFAULTS.target_sem_dB,
+    keithley_readings=DEFAULTS.keithley_readings,
+    resume=False,
+    capture_path=None,
+    band_limit=DEFAULTS.band_limit,
+    decimate=DEFAULTS.decimate,
+    filter_spec=DEFAULTS.filter_spec,
+    progress=None,
 ):
-    hpf_cutoff = 200.0
-    lpf_cutoff = 4000.0
+    """
+    Sweeps the generator's power and measures the SINAD at each level.
+
+    Args and settings are as main() describes them, the settings
+    defaulting and bounded as sweep_settings has them.  progress, if
+    given, is called with each row as it is written, so that a caller
+    running sweeps elsewhere can follow them.
+
+    Returns:
+        list[float]: the power (dBm) at which each channel crosses
+                     target_dB, NaN where it is not bracketed
+
+    Raises:
+        ValueError: a setting is out of bounds
+    """
+    given = locals()
+    sweep_settings.check(
+        {name: given[name] for name in sweep_settings.Settings._fields}
+    )
+    (hpf_cutoff, lpf_cutoff) = sweep_settings.AUDIO_BAND
+    keithley_readings = keithley_readings or max_readings
+
+    # Everything that changes what a row means, so that a resumed sweep
+    # is one sweep.  Prefetch and jobs change only how fast it goes.
+    config = {
+        "source": source_class.name,
+        "source_args": vars(source_args),
+        "siggen": siggen_name,
+        "siggen_resource": siggen_resource_name,
+        "keithley_resource": keithley_resource_name,
+        "keithley_readings": keithley_readings if keithley_resource_name else None,
+        "hpf_cutoff": hpf_cutoff,
+        "lpf_cutoff": lpf_cutoff,
+        "band_limit": band_limit,
+        "decimate": decimate,
+        "filter_spec": filter_spec,
+        "settle_time": settle_time,
+        "strategy": strategy,
+        "start_dBm": start_dBm,
+        "stop_dBm": stop_dBm,
+        "num_points": num_points,
+        "target_dB": target_dB,
+        "tolerance_dB": tolerance_dB,
+        "coarse_step_dB": coarse_step_dB,
+        "min_readings": min_readings,
+        "max_readings": max_readings,
+        "target_sem_dB": target_sem_dB,
+    }
+    log = checkpoint.SweepLog(output_path, config, resume)
+    if log.done:
+        print(f"resuming {output_path}: {len(log.done)} levels done")
 
     rm = pyvisa.ResourceManager("@py")
     siggen_resource = make_siggen(siggen_name, rm, siggen_resource_name)
 
-    keithley_meter = None
+    # The Keithley reads in bursts, alongside the capture rather than
+    # between records.
+    burst = None
     if keithley_resource_name:
         keithley_meter = _open_keithley(
             rm, keithley_resource_name, hpf_cutoff, lpf_cutoff
         )
+        burst = keithley_burst.KeithleyBurst(keithley_meter)
 
     sample_frequency = source_args.sample_frequency
     record_length = source_args.record_length
     num_samples = round(sample_frequency * record_length)
+    dtype = source_pkg.sample_dtype(source_args)
+    # Every channel is captured, filtered and measured together, and
+    # the first one steers an adaptive sweep.
+    channels = source_pkg.channels(source_args)
+    # Audio to drop after a power change, at the source's rate.
+    settle_samples = round(sample_frequency * settle_time)
+
+    # Everything after the decimator, records included, is at its rate.
+    decimator = None
+    if decimate:
+        decimator = filters.make_decimator(sample_frequency, num_samples, lpf_cutoff)
+    if decimator is not None:
+        sample_frequency /= decimator.factor
+        num_samples //= decimator.factor
+
+    spec = None
+    if filter_spec is not None:
+        spec = filters.band_spec(hpf_cutoff, lpf_cutoff, filter_spec)
+    (audio_filter, spectral) = filters.make_band_limit(
+        sample_frequency, hpf_cutoff, lpf_cutoff, band_limit, spec=spec
+    )
 
-    audio_filter = filters.make_audio_filter(sample_frequency, hpf_cutoff, lpf_cutoff)
-
-    data = []
-
-    with siggen_resource as siggen:
-        try:
-            for power_dBm in np.linspace(-125, -95, 51):
-                print(f"{power_dBm:6.3f}", end="")
-                sys.stdout.flush()
-
-                siggen.set_power(power_dBm)
-                siggen.set_output(True)
-
-                with source_class(source_args) as source:
-                    sinad_dB_readings = []
-                    keithley_sinad_dB_readings = []
-                    keithley_freq_Hz_readings = []
-                    for _ in range(128):
-                        samples = source.read()
-                        assert len(samples) == num_samples
-
-                        if audio_filter:
-                            if not source.continuous:
-                                audio_filter.reset()
-                            samples = audio_filter(samples)
-
-                        (sinad, _) = sinad_pkg.measure(samples, sample_frequency)
-                        sinad_dB_readings.append(sinad)
-
-                        if keithley_meter is None:
-                            continue
-
-                        keithley_sinad_dB = float(keithley_meter.query(":READ?"))
-                        if keithley_sinad_dB > 1e6:
-                            keithley_sinad_dB = float("nan")
-                        keithley_sinad_dB_readings.append(keithley_sinad_dB)
-
-                        keithley_freq_Hz = float(
-                            keithley_meter.query(":SENS:DIST:FREQ?")
-                        )
-                        if keithley_freq_Hz > 1e6:
-                            keithley_freq_Hz = float("nan")
-                        keithley_freq_Hz_readings.append(keithley_freq_Hz)
-
-                    (sinad_mean_dB, sinad_std_dB, sinad_n) = _summarize(
-                        sinad_dB_readings
-                    )
+    # Each step's records, reused from step to step.  With a pool they
+    # live in memory the workers share.
+    pool = None
+    if jobs > 1:
+        pool = sinad_pool.SinadPool(
+            jobs,
+            max_readings,
+            num_samples,
+            sample_frequency,
+            audio_filter,
+            spectral,
+            dtype,
+            len(channels),
+        )
+        records = pool.records
+    else:
+        records = np.empty(
+            (max_readings, *source_pkg.record_shape(num_samples, channels)),
+            dtype=dtype,
+        )
+    # Rows measured at a time.  A pool gets them in pieces small enough
+    # that the workers start while the step is still being captured;
+    # sequential sampling checks whether to stop after each piece.
+    chunk = len(records) // (2 * jobs) if pool is not None else len(records)
+    if target_sem_dB is not None:
+        chunk = min(chunk, min_readings)
+    chunk = max(1, chunk)
+
+    # The source stays open for the whole sweep; reopening it at every
+    # step costs seconds of device setup.
+    source = source_pkg.open_source(source_class, source_args, prefetch)
+    writer = None
+    if capture_path:
+        writer = capture.CaptureWriter(
+            capture_path,
+            round(source_args.sample_frequency * record_length),
+            source_args.sample_frequency,
+            source_class.name,
+            vars(source_args),
+            source_pkg.sample_dtype(source_args),
+            num_channels=len(channels),
+        )
+        source = capture.CapturingSource(source, writer)
+    # power_dBm -> (mean_dB, sem_dB) of each channel, for the crossings.
+    levels = {}
+    with (
+        log,
+        siggen_resource as siggen,
+        pool or contextlib.nullcontext(),
+        burst or contextlib.nullcontext(),
+        writer or contextlib.nullcontext(),
+        source,
+    ):
+
+        def measure(power_dBm):
+            print(f"{power_dBm:6.3f}", end="")
+            done = log.done.get(power_dBm)
+            if done is not None:
+                print(" (done)")
+                levels[power_dBm] = [
                     (
-                        keithley_sinad_mean_dB,
-                        keithley_sinad_std_dB,
-                        keithley_sinad_n,
-                    ) = _summarize(keithley_sinad_dB_readings)
-                    (keithley_freq_mean_Hz, keithley_freq_std_Hz, _) = _summarize(
-                        keithley_freq_Hz_readings
+                        float(done[sweep.channel_column("sinad_mean_dB", c, channels)]),
+                        float(done[sweep.channel_column("sinad_sem_dB", c, channels)]),
                     )
-
-                    print(
-                        f" sinad={sinad_mean_dB:10.3f} dB std={sinad_std_dB:10.3f} dB",
-                        end="",
-                    )
-                    if keithley_meter is not None:
-                        print(
-                            f" keithley_sinad={keithley_sinad_mean_dB:10.3f} dB"
-                            f" keithley_std={keithley_sinad_std_dB:10.3f}",
-                            end="",
-                        )
-                        print(
-                            f" keithley_freq={keithley_freq_mean_Hz:10.3f} Hz"
-                            f" keithley_std={keithley_freq_std_Hz:10.3f} Hz",
-                            end="",
-                        )
-                    # Invalid readings are dropped from the means, so say
-                    # so; the counts are not carried in the CSV.
-                    discarded = (len(sinad_dB_readings) - sinad_n) + (
-                        len(keithley_sinad_dB_readings) - keithley_sinad_n
+                    for c in channels
+                ]
+                return levels[power_dBm][0]
+            sys.stdout.flush()
+
+            siggen.set_power(power_dBm)
+            siggen.set_output(True)
+            if writer is not None:
+                source.power_dBm = power_dBm
+
+            # Anything captured before the change is stale, and a
+            # continuous stream now has a gap in it.
+            source.flush()
+            if settle_samples:
+                source.discard(settle_samples)
+            if decimator is not None:
+                decimator.reset()
+            if audio_filter:
+                audio_filter.reset()
+
+            keithley_future = None
+            if burst is not None:
+                keithley_future = burst.start(keithley_readings)
+
+            # Records that are not one stream are filtered
+            # independently, so the workers can do that too.
+            filter_in_pool = pool is not None and not source.continuous
+            stats = [sweep.RunningStats() for _ in channels]
+            taken = 0
+            submitted = 0
+            while taken < len(records):
+                records[taken] = _read_filtered(
+                    source, None if filter_in_pool else audio_filter, decimator
+                )
+                taken += 1
+                if taken - submitted < chunk and taken < len(records):
+                    continue
+                if pool is not None:
+                    pool.submit(submitted, taken, filter_in_pool)
+                    # Only what the workers have finished; capture goes
+                    # on meanwhile.
+                    _update(stats, pool.gather(block=False)[0])
+                else:
+                    # A piece at a time, every channel, in one vectorized
+                    # pass, rather than a measure() call per record.
+                    _update(
+                        stats,
+                        sinad_pkg.measure_batch(
+                            records[submitted:taken], sample_frequency, **spectral
+                        )[0],
                     )
-                    if discarded:
-                        print(f" ({discarded} readings discarded)", end="")
-                    print()
-                    row = {
-                        "power_dBm": power_dBm,
-                        "sinad_mean_dB": sinad_mean_dB,
-                        "sinad_std_dB": sinad_std_dB,
+                submitted = taken
+                if target_sem_dB is not None and all(
+                    level.count >= min_readings and level.sem <= target_sem_dB
+                    for level in stats
+                ):
+                    break
+            if pool is not None:
+                _update(stats, pool.gather()[0])
+            levels[power_dBm] = [(level.mean, level.sem) for level in stats]
+            keithley_sinad_dB_readings = []
+            keithley_freq_Hz = float("nan")
+            if keithley_future is not None:
+                # The burst has its own deadline; this one is in case
+                # the meter stops answering altogether.
+                (keithley_sinad_dB_readings, keithley_freq_Hz) = keithley_future.result(
+                    timeout=burst.timeout(keithley_readings)
+                )
+            (
+                keithley_sinad_mean_dB,
+                keithley_sinad_std_dB,
+                keithley_sinad_n,
+            ) = _summarize(keithley_sinad_dB_readings)
+            # The frequency is read once a burst, not with every reading,
+            # but keeps the columns it always had: of one reading, its
+            # mean is that reading, and its spread is not known.
+            keithley_freq_mean_Hz = keithley_freq_Hz
+            keithley_freq_std_Hz = float("nan")
+
+            for channel, level in zip(channels, stats, strict=True):
+                label = "" if len(channels) == 1 else f" ch{channel}"
+                print(
+                    f"{label} sinad={level.mean:10.3f} dB std={level.std:10.3f} dB",
+                    end="",
+                )
+            if burst is not None:
+                print(
+                    f" keithley_sinad={keithley_sinad_mean_dB:10.3f} dB"
+                    f" keithley_std={keithley_sinad_std_dB:10.3f}",
+                    end="",
+                )
+                print(f" keithley_freq={keithley_freq_mean_Hz:10.3f} Hz", end="")
+            print(f" n={'/'.join(str(level.count) for level in stats)}", end="")
+            # Invalid readings are dropped from the means, so say
+            # so.
+            discarded = sum(taken - level.count for level in stats) + (
+                len(keithley_sinad_dB_readings) - keithley_sinad_n
+            )
+            if discarded:
+                print(f" ({discarded} readings discarded)", end="")
+            print()
+            row = {"power_dBm": power_dBm, **sweep.sinad_columns(stats, channels)}
+            if burst is not None:
+                row.update(
+                    {
+                        "keithley_sinad_mean_dB": keithley_sinad_mean_dB,
+                        "keithley_sinad_std_dB": keithley_sinad_std_dB,
+                        "keithley_freq_mean_Hz": keithley_freq_mean_Hz,
+                        "keithley_freq_std_Hz": keithley_freq_std_Hz,
+                        # New; after the established columns, so readers
+                        # of those are unaffected.
+                        "keithley_sinad_n": keithley_sinad_n,
                     }
-                    if keithley_meter is not None:
-                        row.update(
-                            {
-                                "keithley_sinad_mean_dB": keithley_sinad_mean_dB,
-                                "keithley_sinad_std_dB": keithley_sinad_std_dB,
-                                "keithley_freq_mean_Hz": keithley_freq_mean_Hz,
-                                "keithley_freq_std_Hz": keithley_freq_std_Hz,
-                            }
-                        )
-                    data.append(row)
+                )
+            log.write(row)
+            if progress is not None:
+                progress(row)
+            return levels[power_dBm][0]
+
+        try:
+            if strategy == "adaptive":
+                sweep.adaptive(
+                    measure,
+                    start_dBm,
+                    stop_dBm,
+                    target_dB,
+                    tolerance_dB,
+                    coarse_step_dB,
+                )
+            else:
+                sweep.linear(measure, start_dBm, stop_dBm, num_points)
         finally:
             # Never leave the generator transmitting, however we leave.
             siggen.set_output(False)
-    df = pd.DataFrame(data)
-    df.to_csv(output_path, index=False)
+
+    sensitivities = []
+    for i, channel in enumerate(channels):
+        points = [(p, *level[i]) for p, level in levels.items()]
+        sensitivity_dBm = sweep.crossing(points, target_dB)
+        label = "" if len(channels) == 1 else f"ch{channel}: "
+        print(f"{label}{target_dB:g} dB SINAD at {sensitivity_dBm:.2f} dBm")
+        sensitivities.append(sensitivity_dBm)
+
+    # An adaptive sweep visits levels out of order; the CSV is by power.
+    log.sort()
     print(f"wrote {output_path}")
+    return sensitivities
+
+
+def make_source_parser(source_class):
+    """
+    Makes the parser of a source's arguments, those after the sweep's.
+
+    Args:
+        source_class (type): the source
+
+    Returns:
+        argparse.ArgumentParser: the parser
+    """
+    source_parser = argparse.ArgumentParser(
+        description=f"SINAD Meter using {source_class.pretty_name}"
+    )
+    default_sample_frequency = source_class.default_sample_frequency()
+    source_parser.add_argument(
+        "-s",
+        "--sample-frequency",
+        type=float,
+        default=default_sample_frequency,
+        help="sample frequency, in samples per second "
+        f"(default: {default_sample_frequency} Hz)",
+    )
+
+    default_record_length = source_class.default_record_length()
+    source_parser.add_argument(
+        "-r",
+        "--record-length",
+        type=float,
+        default=default_record_length,
+        help=f"record length, in seconds (default: {default_record_length} s)",
+    )
+    source_parser.add_argument(
+        "--dtype",
+        choices=source_pkg.DTYPES,
+        default="float64",
+        help="sample type from the source on: float32 halves the memory "
+        "filtering and measurement stream through (default: float64)",
+    )
+    source_parser.add_argument(
+        "--channels",
+        type=source_pkg.parse_channels,
+        metavar="N[,N...]",
+        help="input channels to capture, counting from 0, e.g. 0,1 for two "
+        "receivers at once; each is filtered and measured on its own "
+        "(default: 0)",
+    )
+
+    source_class.augment_argparse(source_parser)
+    return source_parser
 
 
 def main():
@@ -273,8 +599,16 @@ def main():
         "--keithley",
         action="store_true",
         help="Also measure with the Keithley 2015, to check this meter "
-        "against it.  Off by default: it roughly doubles the queries per "
-        "reading and requires the meter to be connected.",
+        "against it.  Off by default: it requires the meter to be "
+        "connected.",
+    )
+    parser.add_argument(
+        "--keithley-readings",
+        type=int,
+        metavar="N",
+        help="Keithley readings per level, taken as one burst into its "
+        f"trace buffer, at most {keithley_burst.MAX_READINGS} "
+        "(default: --max-readings)",
     )
     parser.add_argument(
         "--keithley-resource",
@@ -287,46 +621,194 @@ def main():
         "--output", help="CSV to write (default: auto_sinad_<siggen>.csv)"
     )
 
-    (args, unparsed_args) = parser.parse_known_args()
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="keep the levels already in --output, if it was written with "
+        "the same settings, and measure only the rest",
+    )
 
-    source_class = registry.get(args.source)
-    source_parser = argparse.ArgumentParser(
-        description=f"SINAD Meter using {source_class.pretty_name}"
+    parser.add_argument(
+        "--capture",
+        metavar="DIR",
+        help="also keep every raw record, with its power and time, in "
+        "DIR for analysing again later (see capture.py); appends if DIR "
+        "already holds a capture",
     )
-    default_sample_frequency = source_class.default_sample_frequency()
-    source_parser.add_argument(
-        "-s",
-        "--sample-frequency",
+
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=DEFAULTS.prefetch,
+        metavar="N",
+        help="read up to N records ahead on a separate thread, so that "
+        "acquisition overlaps processing (default: 0, off)",
+    )
+
+    parser.add_argument(
+        "--settle",
         type=float,
-        default=default_sample_frequency,
-        help="sample frequency, in samples per second "
-        f"(default: {default_sample_frequency} Hz)",
+        default=DEFAULTS.settle_time,
+        metavar="SECONDS",
+        help="audio to discard after each power change while the receiver "
+        f"settles (default: {DEFAULTS.settle_time:g} s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=DEFAULTS.jobs,
+        metavar="N",
+        help="filter and measure in N worker processes while capturing "
+        "(default: 1, in this process)",
+    )
+    parser.add_argument(
+        "--decimate",
+        action="store_true",
+        help="bring the sample rate down to about 4x the 4000 Hz band edge "
+        "before filtering and measuring, which makes both cheaper "
+        "(default: off)",
+    )
+    parser.add_argument(
+        "--band-limit",
+        choices=filters.BAND_LIMITS,
+        default=DEFAULTS.band_limit,
+        help="how the 200-4000 Hz audio band is applied: time filters the "
+        "samples; brickwall and response instead weight the SINAD "
+        "periodogram, by the band or by the filter's response, and skip "
+        "the filter pass (default: time)",
+    )
+    parser.add_argument(
+        "--filter-spec",
+        type=filters.parse_filter_spec,
+        metavar="STOP_LOW,STOP_HIGH,RIPPLE_DB,ATTENUATION_DB",
+        help="design the 200-4000 Hz filter as the cheapest that meets "
+        "this, e.g. 100,4500,0.1,60 (default: a 101-tap window design)",
     )
 
-    default_record_length = source_class.default_record_length()
-    source_parser.add_argument(
-        "-r",
-        "--record-length",
+    parser.add_argument(
+        "--strategy",
+        choices=sweep_settings.STRATEGIES,
+        default=DEFAULTS.strategy,
+        help="linear visits --points evenly spaced levels; adaptive brackets "
+        "the --target crossing and homes in on it (default: linear)",
+    )
+    parser.add_argument(
+        "--start",
         type=float,
-        default=default_record_length,
-        help=f"record length, in seconds (default: {default_record_length} s)",
+        default=DEFAULTS.start_dBm,
+        metavar="DBM",
+        help=f"lowest generator power (default: {DEFAULTS.start_dBm:g} dBm)",
+    )
+    parser.add_argument(
+        "--stop",
+        type=float,
+        default=DEFAULTS.stop_dBm,
+        metavar="DBM",
+        help=f"highest generator power (default: {DEFAULTS.stop_dBm:g} dBm)",
+    )
+    parser.add_argument(
+        "--points",
+        type=int,
+        default=DEFAULTS.num_points,
+        help=f"levels in a linear sweep (default: {DEFAULTS.num_points})",
+    )
+    parser.add_argument(
+        "--target",
+        type=float,
+        default=DEFAULTS.target_dB,
+        metavar="DB",
+        help=f"SINAD whose crossing is reported (default: {DEFAULTS.target_dB:g} dB)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULTS.tolerance_dB,
+        metavar="DB",
+        help="adaptive: stop once the crossing is known this closely "
+        f"(default: {DEFAULTS.tolerance_dB:g} dB)",
+    )
+    parser.add_argument(
+        "--coarse-step",
+        type=float,
+        default=DEFAULTS.coarse_step_dB,
+        metavar="DB",
+        help="adaptive: step of the bracketing pass "
+        f"(default: {DEFAULTS.coarse_step_dB:g} dB)",
     )
 
-    source_class.augment_argparse(source_parser)
+    parser.add_argument(
+        "--max-readings",
+        type=int,
+        default=DEFAULTS.max_readings,
+        metavar="N",
+        help=f"readings per level (default: {DEFAULTS.max_readings}); with "
+        "--target-sem, the most",
+    )
+    parser.add_argument(
+        "--min-readings",
+        type=int,
+        default=DEFAULTS.min_readings,
+        metavar="N",
+        help="with --target-sem, the fewest readings per level "
+        f"(default: {DEFAULTS.min_readings})",
+    )
+    parser.add_argument(
+        "--target-sem",
+        type=float,
+        metavar="DB",
+        help="stop reading a level once the standard error of its mean "
+        "SINAD is at most this (default: always take --max-readings)",
+    )
+
+    (args, unparsed_args) = parser.parse_known_args()
+    try:
+        settings = sweep_settings.check(
+            {
+                "prefetch": args.prefetch,
+                "jobs": args.jobs,
+                "settle_time": args.settle,
+                "strategy": args.strategy,
+                "start_dBm": args.start,
+                "stop_dBm": args.stop,
+                "num_points": args.points,
+                "target_dB": args.target,
+                "tolerance_dB": args.tolerance,
+                "coarse_step_dB": args.coarse_step,
+                "min_readings": args.min_readings,
+                "max_readings": args.max_readings,
+                "target_sem_dB": args.target_sem,
+                "keithley_readings": args.keithley_readings,
+                "band_limit": args.band_limit,
+                "decimate": args.decimate,
+                "filter_spec": args.filter_spec,
+            }
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    source_class = registry.get(args.source)
+    source_parser = make_source_parser(source_class)
     if args.help_source:
         source_parser.print_help()
         return
     source_args = source_parser.parse_args(args=unparsed_args)
 
     output_path = args.output or f"auto_sinad_{args.siggen}.csv"
-    run(
-        source_class,
-        source_args,
-        args.siggen,
-        args.siggen_resource,
-        args.keithley_resource if args.keithley else None,
-        output_path,
-    )
+    try:
+        run(
+            source_class,
+            source_args,
+            args.siggen,
+            args.siggen_resource,
+            args.keithley_resource if args.keithley else None,
+            output_path,
+            resume=args.resume,
+            capture_path=args.capture,
+            **settings._asdict(),
+        )
+    except checkpoint.ConfigMismatchError as e:
+        parser.error(f"cannot --resume: {e}")
 
 
 if __name__ == "__main__":
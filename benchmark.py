@@ -0,0 +1,358 @@
+#! /usr/bin/env python3
+#
+# Benchmarks of the measurement pipeline.
+#
+# Each case is timed over a grid of sample rates and record lengths, and
+# reports how many calls it manages a second, how many seconds of audio
+# that is per second of wall time (realtime, for the cases that take a
+# record), and the most memory a call allocates.  Results are written as
+# JSON; a saved run is a baseline, and comparing against one fails if a
+# case has slowed by more than the tolerance.  The live meter keeps up
+# only while the loop case runs faster than real time, so that is
+# checked on every run.
+#
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+
+import agc
+import filters
+import sinad as sinad_pkg
+import source_synthetic
+from vendored import pysnr
+
+DEFAULT_SAMPLE_FREQUENCIES = (16_000, 48_000, 192_000)
+DEFAULT_RECORD_LENGTHS = (0.1, 0.25, 1.0)
+DEFAULT_MIN_TIME = 0.5
+DEFAULT_TOLERANCE = 0.25
+
+HPF_CUTOFF = 200.0
+LPF_CUTOFF = 4000.0
+# A filter long enough to take FirFilter's overlap-save path.
+LONG_NUMTAPS = 401
+
+
+def _synthetic_source(sample_frequency, record_length):
+    parser = argparse.ArgumentParser()
+    source_synthetic.SyntheticSource.augment_argparse(parser)
+    args = parser.parse_args([])
+    args.sample_frequency = sample_frequency
+    args.record_length = record_length
+    return source_synthetic.SyntheticSource(args)
+
+
+#
+# Each case takes (sample_frequency, record_length) and returns
+# (call, per_record): what to time, and whether each call handles one
+# record, which is what makes a realtime figure meaningful.
+#
+
+
+def _case_measure(sample_frequency, record_length):
+    record = _synthetic_source(sample_frequency, record_length).read()
+    return (lambda: sinad_pkg.measure(record, sample_frequency), True)
+
+
+def _case_pysnr(sample_frequency, record_length):
+    record = _synthetic_source(sample_frequency, record_length).read()
+    return (lambda: pysnr.sinad_signal(record, fs=sample_frequency), True)
+
+
+def _case_fir_filter(sample_frequency, record_length):
+    record = _synthetic_source(sample_frequency, record_length).read()
+    audio_filter = filters.make_audio_filter(sample_frequency, HPF_CUTOFF, LPF_CUTOFF)
+    return (lambda: audio_filter(record), True)
+
+
+def _case_long_fir_filter(sample_frequency, record_length):
+    record = _synthetic_source(sample_frequency, record_length).read()
+    audio_filter = filters.make_audio_filter(
+        sample_frequency, HPF_CUTOFF, LPF_CUTOFF, LONG_NUMTAPS
+    )
+    return (lambda: audio_filter(record), True)
+
+
+def _case_make_audio_filter(sample_frequency, _record_length):
+    return (
+        lambda: filters.make_audio_filter(sample_frequency, HPF_CUTOFF, LPF_CUTOFF),
+        False,
+    )
+
+
+def _case_agc(sample_frequency, record_length):
+    record = _synthetic_source(sample_frequency, record_length).read()
+    gain_control = agc.AutomaticGainControl(0.1)
+    return (lambda: gain_control(record), True)
+
+
+def _case_loop(sample_frequency, record_length):
+    # What sinad_meter does per record, from the source to a reading.
+    source = _synthetic_source(sample_frequency, record_length)
+    audio_filter = filters.make_audio_filter(sample_frequency, HPF_CUTOFF, LPF_CUTOFF)
+
+    def loop():
+        samples = audio_filter(source.read())
+        return sinad_pkg.measure(samples, sample_frequency)
+
+    return (loop, True)
+
+
+def _case_decimating_loop(sample_frequency, record_length):
+    # The loop with sinad_meter --decimate.
+    source = _synthetic_source(sample_frequency, record_length)
+    num_samples = round(sample_frequency * record_length)
+    decimator = filters.make_decimator(sample_frequency, num_samples, LPF_CUTOFF)
+    if decimator is not None:
+        sample_frequency /= decimator.factor
+    audio_filter = filters.make_audio_filter(sample_frequency, HPF_CUTOFF, LPF_CUTOFF)
+
+    def loop():
+        samples = source.read()
+        if decimator is not None:
+            samples = decimator(samples)
+        return sinad_pkg.measure(audio_filter(samples), sample_frequency)
+
+    return (loop, True)
+
+
+CASES = {
+    "sinad.measure": _case_measure,
+    "pysnr.sinad_signal": _case_pysnr,
+    "FirFilter": _case_fir_filter,
+    f"FirFilter({LONG_NUMTAPS})": _case_long_fir_filter,
+    "make_audio_filter": _case_make_audio_filter,
+    "AutomaticGainControl": _case_agc,
+    "loop": _case_loop,
+    "loop(decimate)": _case_decimating_loop,
+}
+
+# The case that says whether the live meter keeps up.
+LOOP_CASE = "loop"
+
+
+def _time(call, min_time):
+    """Calls call repeatedly for at least min_time; returns calls/s."""
+    call()  # Warm up: plans, caches, first-touch of buffers.
+    calls = 0
+    batch = 1
+    start = time.perf_counter()
+    while True:
+        for _ in range(batch):
+            call()
+        calls += batch
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+        batch *= 2
+
+
+def _peak_bytes(call, repeats=3):
+    """The most memory any of a few calls allocated at once."""
+    peak = 0
+    tracemalloc.start()
+    try:
+        for _ in range(repeats):
+            tracemalloc.reset_peak()
+            (before, _) = tracemalloc.get_traced_memory()
+            call()
+            (_, call_peak) = tracemalloc.get_traced_memory()
+            peak = max(peak, call_peak - before)
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def run(cases, sample_frequencies, record_lengths, min_time=DEFAULT_MIN_TIME):
+    """
+    Runs the benchmarks.
+
+    Args:
+        cases (list[str]): keys of CASES
+        sample_frequencies (list[float]): sample rates (Hz)
+        record_lengths (list[float]): record lengths (s)
+        min_time (float): the least time to spend timing each point (s)
+
+    Returns:
+        dict: the environment, and a result per case, rate and length
+    """
+    results = []
+    for name in cases:
+        for sample_frequency in sample_frequencies:
+            for record_length in record_lengths:
+                (call, per_record) = CASES[name](sample_frequency, record_length)
+                calls_per_second = _time(call, min_time)
+                results.append(
+                    {
+                        "case": name,
+                        "sample_frequency": sample_frequency,
+                        "record_length": record_length,
+                        "calls_per_second": calls_per_second,
+                        "realtime": (
+                            calls_per_second * record_length if per_record else None
+                        ),
+                        "peak_bytes": _peak_bytes(call),
+                    }
+                )
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+
+
+def _key(result):
+    return (result["case"], result["sample_frequency"], result["record_length"])
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Finds what has slowed down since a baseline.
+
+    Points in only one of the two are ignored, so a baseline from a
+    different grid compares on what they share.
+
+    Args:
+        report (dict): a run()
+        baseline (dict): an earlier run()
+        tolerance (float): the fraction of speed that may be lost
+
+    Returns:
+        list[str]: one line per regression, empty if there are none
+    """
+    before = {_key(r): r for r in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        old = before.get(_key(result))
+        if old is None:
+            continue
+        ratio = result["calls_per_second"] / old["calls_per_second"]
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{_describe(result)}: {result['calls_per_second']:.1f}/s, "
+                f"was {old['calls_per_second']:.1f}/s ({ratio - 1:+.0%})"
+            )
+    return regressions
+
+
+def falling_behind(report):
+    """
+    Finds where the live loop runs slower than real time.
+
+    Args:
+        report (dict): a run()
+
+    Returns:
+        list[str]: one line per rate and length that cannot keep up
+    """
+    return [
+        f"{_describe(r)}: {r['realtime']:.2f}x real time"
+        for r in report["results"]
+        if r["case"] == LOOP_CASE and r["realtime"] < 1
+    ]
+
+
+def _describe(result):
+    return (
+        f"{result['case']} at {result['sample_frequency']:g} Hz, "
+        f"{result['record_length']:g} s"
+    )
+
+
+def _print_table(report, file):
+    print(
+        f"{'case':22s} {'fs':>8s} {'length':>7s} {'calls/s':>10s} "
+        f"{'realtime':>9s} {'peak':>10s}",
+        file=file,
+    )
+    for r in report["results"]:
+        realtime = "" if r["realtime"] is None else f"{r['realtime']:8.1f}x"
+        print(
+            f"{r['case']:22s} {r['sample_frequency']:8g} {r['record_length']:7g} "
+            f"{r['calls_per_second']:10.1f} {realtime:>9s} "
+            f"{r['peak_bytes'] / 1024:8.0f}KB",
+            file=file,
+        )
+
+
+def _floats(text):
+    return [float(x) for x in text.split(",")]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks the SINAD pipeline.")
+    parser.add_argument(
+        "--cases",
+        type=lambda text: text.split(","),
+        default=list(CASES),
+        help=f"comma-separated cases to run (default: all of {', '.join(CASES)})",
+    )
+    parser.add_argument(
+        "--sample-frequencies",
+        type=_floats,
+        default=list(DEFAULT_SAMPLE_FREQUENCIES),
+        metavar="HZ,...",
+        help="sample rates (default: 16000,48000,192000)",
+    )
+    parser.add_argument(
+        "--record-lengths",
+        type=_floats,
+        default=list(DEFAULT_RECORD_LENGTHS),
+        metavar="S,...",
+        help="record lengths (default: 0.1,0.25,1)",
+    )
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=DEFAULT_MIN_TIME,
+        metavar="SECONDS",
+        help=f"least time to time each point for (default: {DEFAULT_MIN_TIME} s)",
+    )
+    parser.add_argument("-o", "--output", help="JSON file to write the results to")
+    parser.add_argument(
+        "--baseline",
+        help="JSON from an earlier run; fail if anything is slower than it "
+        "by more than --tolerance",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="fraction of speed a case may lose against the baseline "
+        f"(default: {DEFAULT_TOLERANCE})",
+    )
+    args = parser.parse_args(argv[1:])
+    unknown = sorted(set(args.cases) - set(CASES))
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    report = run(
+        args.cases, args.sample_frequencies, args.record_lengths, args.min_time
+    )
+    _print_table(report, sys.stdout)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"wrote {args.output}")
+
+    failures = falling_behind(report)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += compare(report, json.load(f), args.tolerance)
+    for line in failures:
+        print(f"FAIL: {line}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
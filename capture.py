@@ -0,0 +1,311 @@
+#
+# Raw records kept on disk, so a sweep can be analysed again later.
+#
+# A capture is a directory of three files:
+#
+#   metadata.json -- what every record shares: samples per record,
+#                    channels, sample rate, dtype, and the source and
+#                    its settings
+#   records.bin   -- the samples, record after record, as a raw array
+#   index.bin     -- per record: generator power, capture time, and
+#                    whether the stream broke before it (INDEX_DTYPE)
+#
+# Both binary files are only ever appended to, so whatever made it to
+# disk before a crash is readable, and both are read back through
+# numpy.memmap, so opening a capture costs nothing however large it is.
+#
+
+import json
+import pathlib
+import queue
+import threading
+import time
+
+import numpy as np
+
+import source as source_pkg
+
+METADATA_NAME = "metadata.json"
+RECORDS_NAME = "records.bin"
+INDEX_NAME = "index.bin"
+
+INDEX_DTYPE = np.dtype([("power_dBm", "<f8"), ("timestamp", "<f8"), ("gap", "?")])
+
+
+class CaptureWriter:
+    """
+    Appends records to a capture on a background thread.
+
+    write() copies the record into a bounded queue and returns; the
+    thread does the file I/O.  Only the queue's worth of records is ever
+    held in memory, and the capturing loop waits on the disk only if the
+    disk falls that far behind (counted in backlog_waits).
+
+    An existing capture is appended to if it holds records of the same
+    shape and rate, so a resumed sweep lands in the same capture.
+
+    Records of several channels are (num_channels, num_samples), as the
+    source reads them, and are stored a channel's row after another.
+
+    Args:
+        path (str or pathlib.Path): the capture's directory
+        num_samples (int): samples per record
+        sample_frequency (float): sample rate (Hz)
+        source_name (str): the source's name
+        source_args (dict): the source's settings, as JSON
+        dtype (numpy.dtype): what to store the samples as
+        depth (int): records to queue for the writer
+        num_channels (int): channels per record
+    """
+
+    def __init__(
+        self,
+        path,
+        num_samples,
+        sample_frequency,
+        source_name,
+        source_args=None,
+        dtype=np.float64,
+        depth=32,
+        num_channels=1,
+    ):
+        self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        metadata = {
+            "num_samples": int(num_samples),
+            "num_channels": int(num_channels),
+            "sample_frequency": float(sample_frequency),
+            "dtype": np.dtype(dtype).str,
+            "source": source_name,
+            "source_args": source_args or {},
+        }
+        metadata_path = self.path / METADATA_NAME
+        if metadata_path.exists():
+            existing = json.loads(metadata_path.read_text())
+            existing.setdefault("num_channels", 1)
+            for key in ("num_samples", "num_channels", "sample_frequency", "dtype"):
+                if existing[key] != metadata[key]:
+                    raise ValueError(
+                        f"{self.path} holds {key}={existing[key]}, not {metadata[key]}"
+                    )
+            # A record cut short by a crash would misalign everything
+            # appended after it.
+            values = num_channels * num_samples
+            count = _record_count(self.path, np.dtype(existing["dtype"]), values)
+            for name, itemsize in (
+                (RECORDS_NAME, np.dtype(dtype).itemsize * values),
+                (INDEX_NAME, INDEX_DTYPE.itemsize),
+            ):
+                with open(self.path / name, "ab") as f:
+                    f.truncate(count * itemsize)
+        else:
+            metadata_path.write_text(json.dumps(metadata, indent=2) + "\n")
+        self._dtype = np.dtype(dtype)
+        self._shape = (int(num_samples),)
+        if num_channels > 1:
+            self._shape = (int(num_channels), int(num_samples))
+        self._queue = queue.Queue(depth)
+        self._error = None
+        self.records_written = 0
+        self.backlog_waits = 0
+        # Held open until close(); the thread is their only user.
+        self._records_file = open(self.path / RECORDS_NAME, "ab")  # noqa: SIM115
+        self._index_file = open(self.path / INDEX_NAME, "ab")  # noqa: SIM115
+        self._thread = threading.Thread(
+            target=self._run, name=f"CaptureWriter({self.path})", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, samples, power_dBm=float("nan"), gap=False):
+        """
+        Queues a record for writing.
+
+        Args:
+            samples (numpy.ndarray): the record; it is copied, so the
+                                     caller may reuse it at once
+            power_dBm (float): generator power, or NaN if there is none
+            gap (bool): whether the stream broke just before it
+        """
+        self._raise_error()
+        if np.shape(samples) != self._shape:
+            raise ValueError(f"record is {np.shape(samples)}, not {self._shape}")
+        entry = np.empty((), dtype=INDEX_DTYPE)
+        entry["power_dBm"] = power_dBm
+        entry["timestamp"] = time.time()
+        entry["gap"] = gap
+        item = (np.array(samples, dtype=self._dtype), entry)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.backlog_waits += 1
+            self._queue.put(item)
+
+    def close(self):
+        """Writes out whatever is queued and closes the files."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            self._records_file.close()
+            self._index_file.close()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError(f"writing {self.path} failed") from self._error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                # Keep draining, so that write() never blocks for good.
+                continue
+            (samples, entry) = item
+            try:
+                # Samples first: a record is only indexed once it is all
+                # there.
+                self._records_file.write(samples.tobytes())
+                self._records_file.flush()
+                self._index_file.write(entry.tobytes())
+                self._index_file.flush()
+                self.records_written += 1
+            except OSError as e:
+                self._error = e
+
+
+class CapturingSource(source_pkg.Source):
+    """
+    Passes records through from another source, capturing each one.
+
+    Only what read() returns is captured; samples dropped by discard()
+    while settling are not.  The generator power recorded with each
+    record is whatever power_dBm was set to when it was read.
+
+    Args:
+        inner (source.Source): the source to read from; it is started,
+                               stopped and closed with this one
+        writer (CaptureWriter): where the records go
+    """
+
+    def __init__(self, inner, writer):
+        self._inner = inner
+        self._writer = writer
+        self.name = inner.name
+        self.pretty_name = inner.pretty_name
+        self.continuous = inner.continuous
+        self.power_dBm = float("nan")
+        self._gap = True
+
+    def start(self):
+        self._inner.start()
+
+    def stop(self):
+        self._inner.stop()
+
+    def close(self):
+        self._inner.close()
+
+    def read(self):
+        try:
+            samples = self._inner.read()
+        except source_pkg.OverrunError:
+            self._gap = True
+            raise
+        self._writer.write(samples, self.power_dBm, self._gap)
+        # Record-based sources have a gap before every record.
+        self._gap = not self.continuous
+        return samples
+
+    def flush(self):
+        self._inner.flush()
+        self._gap = True
+
+    def discard(self, num_samples):
+        self._gap = True
+        return self._inner.discard(num_samples)
+
+    def sample_range(self):
+        return self._inner.sample_range()
+
+    def sample_unit(self):
+        return self._inner.sample_unit()
+
+
+class Capture:
+    """
+    A capture opened for reading.
+
+    records and index are read-only memory maps of the files, so they
+    are views of the disk, not copies.  A record that was being written
+    when the capture stopped is left out.
+
+    Attributes:
+        metadata (dict): the contents of metadata.json
+        sample_frequency (float): sample rate (Hz)
+        num_channels (int): channels per record
+        records (numpy.ndarray): (records, samples), or (records,
+                                 channels, samples) with more than one
+                                 channel, memory-mapped
+        index (numpy.ndarray): INDEX_DTYPE per record, memory-mapped
+        power_dBm, timestamp, gap (numpy.ndarray): the index's fields
+
+    Args:
+        path (str or pathlib.Path): the capture's directory
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.metadata = json.loads((self.path / METADATA_NAME).read_text())
+        self.sample_frequency = self.metadata["sample_frequency"]
+        # Captures from before there were channels have one.
+        self.num_channels = self.metadata.get("num_channels", 1)
+        dtype = np.dtype(self.metadata["dtype"])
+        shape = (self.metadata["num_samples"],)
+        if self.num_channels > 1:
+            shape = (self.num_channels, *shape)
+        count = _record_count(self.path, dtype, int(np.prod(shape)))
+        self.records = _map(self.path / RECORDS_NAME, dtype, (count, *shape))
+        self.index = _map(self.path / INDEX_NAME, INDEX_DTYPE, (count,))
+
+    @property
+    def power_dBm(self):
+        return self.index["power_dBm"]
+
+    @property
+    def timestamp(self):
+        return self.index["timestamp"]
+
+    @property
+    def gap(self):
+        return self.index["gap"]
+
+    def __len__(self):
+        return len(self.records)
+
+
+def _record_count(path, dtype, num_samples):
+    # Records of num_samples values both written and indexed.
+    sizes = []
+    for name in (RECORDS_NAME, INDEX_NAME):
+        try:
+            sizes.append((path / name).stat().st_size)
+        except FileNotFoundError:
+            sizes.append(0)
+    return min(
+        sizes[0] // (dtype.itemsize * num_samples), sizes[1] // INDEX_DTYPE.itemsize
+    )
+
+
+def _map(path, dtype, shape):
+    # numpy cannot map an empty file.
+    if shape[0] == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
@@ -0,0 +1,125 @@
+#
+# Sweep results written as they are measured, and picked up again.
+#
+
+import csv
+import hashlib
+import json
+import os
+import pathlib
+
+
+class ConfigMismatchError(ValueError):
+    """A file being resumed was written under a different configuration."""
+
+
+def config_hash(config):
+    """
+    Hashes a sweep's configuration.
+
+    Args:
+        config (dict): the settings that affect the results; values
+                       that are not JSON are hashed by their str()
+
+    Returns:
+        str: a short hex digest, the same for equal configurations
+    """
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()[:16]
+
+
+class SweepLog:
+    """
+    Appends sweep rows to a CSV as they are measured.
+
+    Each row is flushed to disk as soon as it is written, so a sweep
+    that dies part way keeps what it measured.  Every row carries the
+    hash of the configuration that produced it, and resuming reads back
+    the rows of an identical configuration so that their levels need
+    not be measured again.  A file from any other configuration is
+    refused rather than mixed with.
+
+    Args:
+        path (str or pathlib.Path): the CSV
+        config (dict): the settings that affect the results
+        resume (bool): whether to keep and continue an existing file,
+                       rather than start afresh
+    """
+
+    def __init__(self, path, config, resume=False):
+        self.path = pathlib.Path(path)
+        self.config_hash = config_hash(config)
+        # power_dBm -> row, as read back (values are strings).
+        self.done = {}
+        self._rows = []
+        self._fieldnames = None
+        if resume and self.path.exists():
+            self._load()
+            # Rewritten so that a row cut short by the crash is gone
+            # before more are appended after it.
+            self._rewrite(self._rows)
+        # Held open for the life of the log; close() closes it.
+        mode = "a" if self._fieldnames else "w"
+        self._file = open(self.path, mode, newline="")  # noqa: SIM115
+        self._writer = None
+        if self._fieldnames:
+            self._writer = csv.DictWriter(self._file, self._fieldnames)
+
+    def write(self, row):
+        """
+        Appends a row and flushes it to disk.
+
+        Args:
+            row (dict): column -> value; the first row fixes the columns
+        """
+        row = {**row, "config_hash": self.config_hash}
+        if self._writer is None:
+            self._fieldnames = list(row)
+            self._writer = csv.DictWriter(self._file, self._fieldnames)
+            self._writer.writeheader()
+        self._writer.writerow(row)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._rows.append(row)
+
+    def sort(self):
+        """Rewrites the file in power order, once the sweep is done."""
+        self.close()
+        self._rewrite(sorted(self._rows, key=lambda row: float(row["power_dBm"])))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def _load(self):
+        with open(self.path, newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                if None in row.values() or None in row:
+                    # Cut short, or run on, by the interruption.
+                    continue
+                if row.get("config_hash") != self.config_hash:
+                    raise ConfigMismatchError(
+                        f"{self.path} was written by a different configuration "
+                        f"({row.get('config_hash')}, not {self.config_hash})"
+                    )
+                self.done[float(row["power_dBm"])] = row
+                self._rows.append(row)
+            if self._rows:
+                self._fieldnames = reader.fieldnames
+
+    def _rewrite(self, rows):
+        if not rows:
+            self.path.unlink(missing_ok=True)
+            return
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, "w", newline="") as f:
+            writer = csv.DictWriter(f, self._fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(temporary, self.path)
@@ -1,18 +1,143 @@
+import collections
+import functools
+import math
+
 import numpy as np
+import scipy.fft
+import scipy.integrate
 import scipy.signal
 
 
+def working_dtype(samples):
+    """
+    The precision filters and the SINAD FFT work on samples in.
+
+    Single precision stays single precision end to end; anything else,
+    integers included, is worked in double.
+
+    Args:
+        samples (numpy.ndarray): the samples
+
+    Returns:
+        numpy.dtype: float32 or float64
+    """
+    if np.asarray(samples).dtype == np.float32:
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def _in_dtype(coefficients, dtype, cache):
+    # coefficients cast to dtype, cast only the first time.
+    typed = cache.get(dtype)
+    if typed is None:
+        typed = cache[dtype] = coefficients.astype(dtype)
+    return typed
+
+
+def _state_for(state, samples, dtype, core):
+    # The delay line to carry into samples, in dtype: the one kept from
+    # the last call, or after a reset() (state None) zeros of shape core
+    # for each of however many channels samples has.
+    channels = np.shape(samples)[:-1]
+    if state is None:
+        return np.zeros((*channels, *core), dtype=dtype)
+    kept = state.shape[: state.ndim - len(core)]
+    if kept != channels:
+        raise ValueError(
+            f"the filter holds state for channels {kept}, not {channels}; reset() it"
+        )
+    return state.astype(dtype, copy=False)
+
+
 class FirFilter:
+    """
+    A FIR filter whose state carries from one call to the next.
+
+    Up to FFT_THRESHOLD taps this is scipy.signal.lfilter(), whose cost
+    per sample grows with the number of taps.  Longer filters convolve
+    by overlap-save instead: blocks of input are multiplied by the taps'
+    spectrum, computed once, so the cost per sample grows only with the
+    log of the block size.  Either way the delay line is the last
+    len(taps) - 1 input samples, so consecutive calls give what one call
+    over the joined samples would, as lfilter(zi=...) does.
+
+    float32 samples are filtered in float32, and anything else in
+    float64 (see working_dtype()).
+
+    Samples are filtered along the last axis, so a (channels, N) block
+    is every channel at once, each with its own delay line.  The number
+    of channels is fixed by the first call after a reset().
+
+    Args:
+        taps (numpy.ndarray): the filter's coefficients
+    """
+
+    # Taps above which overlap-save beats lfilter(), measured on records
+    # of 0.1-1 s at 16-48 kHz.  The default audio filter stays below it.
+    FFT_THRESHOLD = 128
+
     def __init__(self, taps):
-        self._taps = taps
-        self._state = np.zeros(len(taps) - 1)
+        self._taps = np.array(taps, dtype=float)
+        self._use_fft = len(self._taps) > self.FFT_THRESHOLD
+        # dtype -> the taps, and lfilter()'s denominator, in it.
+        self._typed = {}
+        self._denominators = {}
+        # (block length, dtype) -> spectrum of the taps at that length.
+        self._spectra = {}
+        self.reset()
 
     def __call__(self, samples):
-        filtered_samples, new_state = scipy.signal.lfilter(
-            self._taps, 1.0, samples, zi=self._state
+        dtype = working_dtype(samples)
+        if not self._use_fft:
+            filtered_samples, self._state = scipy.signal.lfilter(
+                _in_dtype(self._taps, dtype, self._typed),
+                _in_dtype(np.ones(1), dtype, self._denominators),
+                samples,
+                zi=_state_for(self._state, samples, dtype, (len(self._taps) - 1,)),
+            )
+            return filtered_samples
+        overlap = len(self._taps) - 1
+        history = np.concatenate(
+            (_state_for(self._history, samples, dtype, (overlap,)), samples),
+            axis=-1,
+            dtype=dtype,
         )
-        self._state = new_state
-        return filtered_samples
+        # A copy: a view would keep the whole of this call's samples
+        # alive until the next.
+        self._history = history[..., history.shape[-1] - overlap :].copy()
+        return self._overlap_save(history)
+
+    def _overlap_save(self, history):
+        # Output n is the taps against history[n : n + len(taps)]; each
+        # block of nfft inputs yields the nfft - len(taps) + 1 outputs
+        # that need no samples from outside it.
+        overlap = len(self._taps) - 1
+        (*channels, length) = history.shape
+        num_outputs = length - overlap
+        if num_outputs == 0:
+            return np.empty((*channels, 0), dtype=history.dtype)
+        # Blocks of several times the taps waste little on the overlap
+        # and stay in cache; a short call is done in one block.
+        nfft = scipy.fft.next_fast_len(
+            min(max(8 * len(self._taps), 1024), length), real=True
+        )
+        step = nfft - overlap
+        num_blocks = -(-num_outputs // step)
+        padded = np.zeros((*channels, num_blocks * step + overlap), dtype=history.dtype)
+        padded[..., :length] = history
+        blocks = np.lib.stride_tricks.sliding_window_view(padded, nfft, axis=-1)[
+            ..., ::step, :
+        ]
+        key = (nfft, history.dtype)
+        spectrum = self._spectra.get(key)
+        if spectrum is None:
+            spectrum = self._spectra[key] = scipy.fft.rfft(
+                self._taps.astype(history.dtype), nfft
+            )
+        filtered = scipy.fft.irfft(
+            scipy.fft.rfft(blocks, axis=-1) * spectrum, nfft, axis=-1
+        )
+        return filtered[..., overlap:].reshape(*channels, -1)[..., :num_outputs]
 
     def reset(self):
         """
@@ -22,11 +147,62 @@ class FirFilter:
         one stream, so that a record does not begin with the tail of an
         unrelated one.
         """
-        self._state = np.zeros(len(self._taps) - 1)
+        # Zeros, for however many channels the next call brings.
+        self._state = None
+        self._history = None
 
     def __len__(self):
         return len(self._taps)
 
+    @property
+    def taps(self):
+        """The filter's taps, as a tuple (hashable, for sinad.get_plan())."""
+        return tuple(float(t) for t in self._taps)
+
+
+class SosFilter:
+    """
+    An IIR filter, as second-order sections, whose state carries on.
+
+    The counterpart of FirFilter for the designs design_filter() makes
+    as IIR: the same calls, with scipy.signal.sosfilt() underneath, and
+    the same precision and channels (see working_dtype()).
+
+    Args:
+        sos (numpy.ndarray): the sections, (n, 6)
+    """
+
+    def __init__(self, sos):
+        self._sos = np.array(sos, dtype=float)
+        self._typed = {}
+        self.reset()
+
+    def __call__(self, samples):
+        dtype = working_dtype(samples)
+        # Kept as (channels..., sections, 2); sosfilt() wants the
+        # sections first.
+        filtered_samples, state = scipy.signal.sosfilt(
+            _in_dtype(self._sos, dtype, self._typed),
+            samples,
+            zi=np.moveaxis(
+                _state_for(self._state, samples, dtype, (len(self._sos), 2)), -2, 0
+            ),
+        )
+        self._state = np.moveaxis(state, 0, -2)
+        return filtered_samples
+
+    def reset(self):
+        """Clears the delay line; see FirFilter.reset()."""
+        self._state = None
+
+    def __len__(self):
+        return len(self._sos)
+
+    @property
+    def sos(self):
+        """The filter's second-order sections."""
+        return self._sos
+
 
 def make_moving_average_filter(window_length):
     """
@@ -108,7 +284,391 @@ def make_fir_bandpass_filter(
     return FirFilter(taps)
 
 
-def make_audio_filter(sample_frequency, hpf_cutoff, lpf_cutoff, numtaps=101):
+# A filter requirement.  passband and stopband are (low, high) edges in
+# Hz; a band-pass has all four, a low-pass only the high ones and a
+# high-pass only the low ones, the others being None.  ripple_dB is the
+# most the passband gain may vary, attenuation_dB the least the stopband
+# must be below it.
+FilterSpec = collections.namedtuple(
+    "FilterSpec", "passband stopband ripple_dB attenuation_dB"
+)
+
+# What design_filter() chose.  method is "kaiser", "remez" or "iir";
+# coefficients are the taps or, for "iir", second-order sections; cost
+# is multiplies per sample; enbw is the white-noise bandwidth in Hz.
+Design = collections.namedtuple("Design", "method coefficients cost enbw")
+
+# The most taps a FIR design may grow to while looking for one that
+# meets the spec.
+MAX_NUMTAPS = 4001
+
+# Frequencies at which a design is checked and its ENBW integrated.
+_RESPONSE_POINTS = 1 << 14
+
+# How far a design may miss the spec and still meet it (dB): rounding,
+# and a grid that need not land on a response's peak.
+_SLACK_dB = 1e-3
+
+# The fraction of the ripple, and the extra attenuation (dB), an IIR is
+# designed to the second time, should one designed exactly to the spec
+# land just outside it.
+_IIR_RIPPLE_MARGIN = 0.95
+_IIR_ATTENUATION_MARGIN_dB = 0.5
+
+
+def design_filter(sample_frequency, spec, linear_phase=False):
+    """
+    Designs the cheapest filter that meets a spec.
+
+    A Kaiser-window FIR, the shortest equiripple (Remez) FIR, and, unless
+    linear_phase is asked for, an elliptic IIR are each designed and
+    checked against the spec on a fine grid, and the one that meets it in
+    the fewest multiplies per sample wins.  A SINAD reading does not
+    care about phase, so the IIR, which usually wins by far, is fine for
+    it; its ringing does take longer to die away after a reset.
+
+    Designs are cached per rate and spec, so asking again costs nothing.
+    The coefficients are shared and read-only.
+
+    Args:
+        sample_frequency (float): sample rate (Hz)
+        spec (FilterSpec): the requirement
+        linear_phase (bool): whether only FIR designs will do
+
+    Returns:
+        Design: the winner
+    """
+    return _design_filter(float(sample_frequency), spec, bool(linear_phase))
+
+
+@functools.lru_cache(maxsize=32)
+def _design_filter(sample_frequency, spec, linear_phase):
+    _check_spec(sample_frequency, spec)
+    candidates = [
+        _design_kaiser(sample_frequency, spec),
+        _design_remez(sample_frequency, spec),
+    ]
+    if not linear_phase:
+        candidates.append(_design_iir(sample_frequency, spec))
+    candidates = [c for c in candidates if c is not None]
+    if not candidates:
+        raise ValueError(f"no design meets {spec} at {sample_frequency:g} Hz")
+    (method, coefficients) = min(candidates, key=lambda c: _cost(*c))
+    coefficients.flags.writeable = False
+    return Design(
+        method,
+        coefficients,
+        _cost(method, coefficients),
+        _enbw(sample_frequency, method, coefficients),
+    )
+
+
+def make_filter(sample_frequency, spec, linear_phase=False):
+    """
+    Makes a filter that meets a spec; see design_filter().
+
+    Args:
+        sample_frequency (float): sample rate (Hz)
+        spec (FilterSpec): the requirement
+        linear_phase (bool): whether only FIR designs will do
+
+    Returns:
+        FirFilter or SosFilter: the filter, with its own state
+    """
+    design = design_filter(sample_frequency, spec, linear_phase)
+    if design.method == "iir":
+        return SosFilter(design.coefficients)
+    return FirFilter(design.coefficients)
+
+
+def parse_filter_spec(text):
+    """
+    Parses --filter-spec: STOP_LOW,STOP_HIGH,RIPPLE_DB,ATTENUATION_DB.
+
+    These are the audio filter's stopband edges (Hz), passband ripple
+    and stopband attenuation; its passband is the cutoffs it is made
+    for, so an edge is left empty where there is no cutoff, as in
+    ",4500,0.1,60" for a low-pass alone.
+
+    Args:
+        text (str): e.g. "100,4500,0.1,60"
+
+    Returns:
+        (float, float, float, float): the stopband edges, None where
+                                      empty, the ripple and the
+                                      attenuation (dB)
+    """
+    fields = text.split(",")
+    if len(fields) != 4:
+        raise ValueError(f"need STOP_LOW,STOP_HIGH,RIPPLE_DB,ATTENUATION_DB: {text}")
+    (stop_low, stop_high) = (float(x) if x else None for x in fields[:2])
+    return (stop_low, stop_high, float(fields[2]), float(fields[3]))
+
+
+def band_spec(hpf_cutoff, lpf_cutoff, filter_spec):
+    """
+    The spec of the audio filter between a pair of optional cutoffs.
+
+    Args:
+        hpf_cutoff (float): highpass cutoff (Hz), or None
+        lpf_cutoff (float): lowpass cutoff (Hz), or None
+        filter_spec (tuple): the rest of it, as parse_filter_spec()
+                             returns it
+
+    Returns:
+        FilterSpec: the spec, for make_band_limit()
+
+    Raises:
+        ValueError: the stopband does not go with the cutoffs, or the
+                    ripple or attenuation is not positive
+    """
+    (stop_low, stop_high, ripple_dB, attenuation_dB) = filter_spec
+    spec = FilterSpec(
+        (hpf_cutoff, lpf_cutoff), (stop_low, stop_high), ripple_dB, attenuation_dB
+    )
+    if ripple_dB <= 0 or attenuation_dB <= 0:
+        raise ValueError(f"{spec}: ripple and attenuation must be positive")
+    # The rate is not known yet; design_filter() checks the edges
+    # against its Nyquist.
+    _check_spec(math.inf, spec)
+    return spec
+
+
+def _check_spec(sample_frequency, spec):
+    (pass_low, pass_high) = spec.passband
+    (stop_low, stop_high) = spec.stopband
+    if (pass_low is None) != (stop_low is None) or (pass_high is None) != (
+        stop_high is None
+    ):
+        raise ValueError(f"{spec}: each band edge needs a stopband edge")
+    if pass_low is None and pass_high is None:
+        raise ValueError(f"{spec}: no band edges")
+    edges = [e for e in (stop_low, pass_low, pass_high, stop_high) if e is not None]
+    if not all(a < b for a, b in zip(edges[:-1], edges[1:], strict=True)):
+        raise ValueError(f"{spec}: band edges must increase")
+    if edges[0] <= 0 or edges[-1] >= sample_frequency / 2:
+        raise ValueError(f"{spec}: edges must be within (0, {sample_frequency / 2:g})")
+
+
+def _cost(method, coefficients):
+    # A biquad takes five multiplies; a FIR one per tap.
+    return 5 * len(coefficients) if method == "iir" else len(coefficients)
+
+
+def _response(sample_frequency, method, coefficients):
+    # The gain at _RESPONSE_POINTS frequencies from 0 Hz to Nyquist.  A
+    # FIR's is one FFT, whose bins fall on exactly those frequencies.
+    frequencies = np.linspace(0, sample_frequency / 2, _RESPONSE_POINTS)
+    if method == "iir":
+        (_, h) = scipy.signal.sosfreqz(
+            coefficients, worN=frequencies, fs=sample_frequency
+        )
+    else:
+        h = scipy.fft.rfft(coefficients, 2 * (_RESPONSE_POINTS - 1))
+    return (frequencies, np.abs(h))
+
+
+def _meets(sample_frequency, spec, method, coefficients):
+    (pass_low, pass_high) = spec.passband
+    (stop_low, stop_high) = spec.stopband
+    (frequencies, gain) = _response(sample_frequency, method, coefficients)
+    in_pass = np.ones(len(frequencies), dtype=bool)
+    in_stop = np.zeros(len(frequencies), dtype=bool)
+    if pass_low is not None:
+        in_pass &= frequencies >= pass_low
+        in_stop |= frequencies <= stop_low
+    if pass_high is not None:
+        in_pass &= frequencies <= pass_high
+        in_stop |= frequencies >= stop_high
+    with np.errstate(divide="ignore"):
+        gain_dB = 20 * np.log10(gain)
+    passband_dB = gain_dB[in_pass]
+    # Attenuation is below the passband's peak, or below unity gain,
+    # which an elliptic design's passband peaks at, if that is higher:
+    # the grid need not sample its peak exactly.
+    reference_dB = max(np.max(passband_dB), 0.0)
+    return (
+        np.ptp(passband_dB) <= spec.ripple_dB + _SLACK_dB
+        and np.max(gain_dB[in_stop]) <= reference_dB - spec.attenuation_dB + _SLACK_dB
+    )
+
+
+def _fir_bands(sample_frequency, spec):
+    # The transition bands' widths and middles, and what firwin() takes.
+    (pass_low, pass_high) = spec.passband
+    (stop_low, stop_high) = spec.stopband
+    widths = []
+    cutoffs = []
+    if pass_low is not None:
+        widths.append(pass_low - stop_low)
+        cutoffs.append((pass_low + stop_low) / 2)
+    if pass_high is not None:
+        widths.append(stop_high - pass_high)
+        cutoffs.append((pass_high + stop_high) / 2)
+    pass_zero = "bandpass" if len(cutoffs) == 2 else pass_low is None
+    return (min(widths), cutoffs, pass_zero)
+
+
+def _ripple_deviations(spec):
+    # The peak deviations a FIR design aims at, passband and stopband.
+    passband = (10 ** (spec.ripple_dB / 20) - 1) / (10 ** (spec.ripple_dB / 20) + 1)
+    return (passband, 10 ** (-spec.attenuation_dB / 20))
+
+
+def _odd(n):
+    # Odd lengths are the only ones that can pass Nyquist, as a
+    # high-pass must.
+    return n | 1
+
+
+def _design_kaiser(sample_frequency, spec):
+    (width, cutoffs, pass_zero) = _fir_bands(sample_frequency, spec)
+    (passband, stopband) = _ripple_deviations(spec)
+    attenuation_dB = -20 * np.log10(min(passband, stopband))
+    (estimate, beta) = scipy.signal.kaiserord(
+        attenuation_dB, width / (sample_frequency / 2)
+    )
+
+    def design(numtaps):
+        taps = scipy.signal.firwin(
+            numtaps,
+            cutoffs,
+            window=("kaiser", beta),
+            pass_zero=pass_zero,
+            fs=sample_frequency,
+        )
+        return taps if _meets(sample_frequency, spec, "kaiser", taps) else None
+
+    # kaiserord() is an estimate; find the length that really meets it.
+    taps = _shortest(design, estimate)
+    return None if taps is None else ("kaiser", taps)
+
+
+def _design_remez(sample_frequency, spec):
+    (pass_low, pass_high) = spec.passband
+    (passband, stopband) = _ripple_deviations(spec)
+    # Remez goes astray in a transition much wider than the other, so
+    # both are made the narrower width, which only tightens the spec.
+    (width, _, _) = _fir_bands(sample_frequency, spec)
+    (stop_low, stop_high) = (
+        None if pass_low is None else pass_low - width,
+        None if pass_high is None else pass_high + width,
+    )
+    bands = [0.0]
+    desired = []
+    weights = []
+    if pass_low is not None:
+        bands += [stop_low, pass_low]
+        desired.append(0.0)
+        weights.append(1 / stopband)
+    desired.append(1.0)
+    weights.append(1 / passband)
+    if pass_high is not None:
+        bands += [pass_high, stop_high]
+        desired.append(0.0)
+        weights.append(1 / stopband)
+    bands.append(sample_frequency / 2)
+
+    def design(numtaps):
+        try:
+            taps = scipy.signal.remez(
+                numtaps, bands, desired, weight=weights, fs=sample_frequency
+            )
+        except ValueError:
+            # Failed to converge.
+            return None
+        return taps if _meets(sample_frequency, spec, "remez", taps) else None
+
+    # The Kaiser estimate is generous for an equiripple design, which
+    # the search allows for.
+    attenuation_dB = -20 * np.log10(min(passband, stopband))
+    (estimate, _) = scipy.signal.kaiserord(
+        attenuation_dB, width / (sample_frequency / 2)
+    )
+    taps = _shortest(design, estimate)
+    return None if taps is None else ("remez", taps)
+
+
+def _shortest(design, estimate):
+    """
+    Finds the fewest taps with which a FIR design meets its spec.
+
+    Lengths are odd.  From the estimate, the length doubles until a
+    design meets the spec, and then is bisected between the longest
+    that did not and the shortest that did, so that a search costs a
+    few dozen designs at most, whatever the length.
+
+    Args:
+        design (callable): takes a length and returns the taps, or None
+                           if that length does not meet the spec
+        estimate (int): where to start
+
+    Returns:
+        numpy.ndarray: the taps, or None if nothing up to MAX_NUMTAPS
+                       meets the spec
+    """
+    # Odd lengths both; low too short to meet anything, so far as known.
+    low = 1
+    high = min(_odd(estimate), MAX_NUMTAPS)
+    best = design(high)
+    while best is None:
+        if high == MAX_NUMTAPS:
+            return None
+        (low, high) = (high, min(2 * high + 1, MAX_NUMTAPS))
+        best = design(high)
+    while high - low > 2:
+        middle = _odd((low + high) // 2)
+        taps = design(middle)
+        if taps is None:
+            low = middle
+        else:
+            (high, best) = (middle, taps)
+    return best
+
+
+def _design_iir(sample_frequency, spec):
+    (pass_low, pass_high) = spec.passband
+    (stop_low, stop_high) = spec.stopband
+    if pass_low is None:
+        (wp, ws) = (pass_high, stop_high)
+    elif pass_high is None:
+        (wp, ws) = (pass_low, stop_low)
+    else:
+        (wp, ws) = ([pass_low, pass_high], [stop_low, stop_high])
+    # Designed to the spec exactly, an elliptic filter can miss it by a
+    # hair; then once more with a margin, which may cost a section.
+    for ripple_dB, attenuation_dB in (
+        (spec.ripple_dB, spec.attenuation_dB),
+        (
+            spec.ripple_dB * _IIR_RIPPLE_MARGIN,
+            spec.attenuation_dB + _IIR_ATTENUATION_MARGIN_dB,
+        ),
+    ):
+        sos = scipy.signal.iirdesign(
+            wp,
+            ws,
+            ripple_dB,
+            attenuation_dB,
+            ftype="ellip",
+            output="sos",
+            fs=sample_frequency,
+        )
+        if _meets(sample_frequency, spec, "iir", sos):
+            return ("iir", sos)
+    return None
+
+
+def _enbw(sample_frequency, method, coefficients):
+    # The bandwidth of a brickwall with the passband's peak gain that
+    # passes as much white noise.
+    (frequencies, gain) = _response(sample_frequency, method, coefficients)
+    power = gain**2
+    return float(scipy.integrate.trapezoid(power, frequencies) / np.max(power))
+
+
+def make_audio_filter(
+    sample_frequency, hpf_cutoff, lpf_cutoff, numtaps=101, spec=None, linear_phase=False
+):
     """
     Makes the filter implied by a pair of optional cutoffs.
 
@@ -117,15 +677,32 @@ def make_audio_filter(sample_frequency, hpf_cutoff, lpf_cutoff, numtaps=101):
     upper.  Both together give a bandpass; one gives that one filter;
     neither gives no filter.
 
+    By default the filter is a numtaps-long firwin() design, whatever
+    the rate.  Given a spec, it is instead the cheapest design that
+    meets it (see design_filter()), and the cutoffs are its passband
+    edges.
+
     Args:
         sample_frequency (float): sample rate of the signal (Hz)
         hpf_cutoff (float): highpass cutoff (Hz), or None
         lpf_cutoff (float): lowpass cutoff (Hz), or None
         numtaps (int): number of taps.  Must be odd.
+        spec (FilterSpec): what to design to; its passband must be
+                           (hpf_cutoff, lpf_cutoff)
+        linear_phase (bool): with a spec, whether only FIR designs will
+                             do
 
     Returns:
-        FirFilter: the filter, or None if both cutoffs are None
+        FirFilter or SosFilter: the filter, or None if both cutoffs are
+                                None
     """
+    if spec is not None:
+        if tuple(spec.passband) != (hpf_cutoff, lpf_cutoff):
+            raise ValueError(
+                f"spec passband {spec.passband} is not the cutoffs "
+                f"({hpf_cutoff}, {lpf_cutoff})"
+            )
+        return make_filter(sample_frequency, spec, linear_phase)
     if hpf_cutoff is not None and lpf_cutoff is not None:
         if hpf_cutoff >= lpf_cutoff:
             raise ValueError(
@@ -140,3 +717,169 @@ def make_audio_filter(sample_frequency, hpf_cutoff, lpf_cutoff, numtaps=101):
     if hpf_cutoff is not None:
         return make_fir_highpass_filter(sample_frequency, hpf_cutoff, numtaps)
     return None
+
+
+# Where the audio band is applied: "time" filters the samples before
+# they are measured; "brickwall" and "response" instead weight the
+# periodogram the measurement takes anyway (see sinad.SinadPlan), with a
+# rectangular band or with the time filter's own response.
+BAND_LIMITS = ("time", "brickwall", "response")
+
+
+def make_band_limit(
+    sample_frequency, hpf_cutoff, lpf_cutoff, band_limit="time", numtaps=101, spec=None
+):
+    """
+    Makes what applies the audio band, by one of BAND_LIMITS.
+
+    Args:
+        sample_frequency (float): sample rate of the signal (Hz)
+        hpf_cutoff (float): highpass cutoff (Hz), or None
+        lpf_cutoff (float): lowpass cutoff (Hz), or None
+        band_limit (str): one of BAND_LIMITS
+        numtaps (int): number of taps.  Must be odd.
+        spec (FilterSpec): design the filter to this instead, as
+                           make_audio_filter() does; for "response",
+                           which needs taps, only FIR designs
+
+    Returns:
+        (FirFilter, dict): the filter to run the samples through, or
+                           None, and the band and response keyword
+                           arguments for sinad.measure()
+    """
+    if band_limit not in BAND_LIMITS:
+        raise ValueError(f"band_limit must be one of {BAND_LIMITS}, not {band_limit}")
+    if band_limit == "response" and spec is not None:
+        audio_filter = make_audio_filter(
+            sample_frequency, hpf_cutoff, lpf_cutoff, spec=spec, linear_phase=True
+        )
+    else:
+        audio_filter = make_audio_filter(
+            sample_frequency, hpf_cutoff, lpf_cutoff, numtaps, spec
+        )
+    if band_limit == "time" or audio_filter is None:
+        return (audio_filter, {})
+    if band_limit == "brickwall":
+        return (None, {"band": (hpf_cutoff, lpf_cutoff)})
+    return (None, {"response": audio_filter.taps})
+
+
+class Decimator:
+    """
+    Low-pass filters and keeps every factor-th sample, carrying state.
+
+    The polyphase form of filtering then downsampling, as
+    scipy.signal.upfirdn() does it: only the outputs that are kept are
+    computed, so the cost per input sample is len(taps) / factor.  Like
+    FirFilter, consecutive calls give what one call over the joined
+    samples would: the delay line and the position of the next kept
+    sample both carry over, so a call need not be a multiple of factor
+    long.  Precision and channels are as FirFilter's.
+
+    Args:
+        taps (numpy.ndarray): the anti-aliasing filter's coefficients
+        factor (int): keep one sample in this many
+    """
+
+    def __init__(self, taps, factor):
+        if factor < 1:
+            raise ValueError(f"factor must be at least 1, not {factor}")
+        self._taps = np.asarray(taps, dtype=float)
+        self.factor = factor
+        self._typed = {}
+        self.reset()
+
+    def __call__(self, samples):
+        dtype = working_dtype(samples)
+        overlap = len(self._taps) - 1
+        history = np.concatenate(
+            (_state_for(self._history, samples, dtype, (overlap,)), samples),
+            axis=-1,
+            dtype=dtype,
+        )
+        (*channels, length) = history.shape
+        # Where in history the first kept sample is, counting from the
+        # first new one.
+        first = overlap + self._next
+        count = max(0, -(-(length - first) // self.factor))
+        self._next = first + count * self.factor - length
+        # A copy, as FirFilter keeps, not a view of the whole call.
+        self._history = history[..., length - overlap :].copy()
+        if count == 0:
+            return np.empty((*channels, 0), dtype=dtype)
+        # upfirdn() keeps outputs at multiples of factor from its first
+        # input sample, so pad the front to put the first kept one on one.
+        pad = -first % self.factor
+        if pad:
+            history = np.concatenate(
+                (np.zeros((*channels, pad), dtype=dtype), history), axis=-1
+            )
+        decimated = scipy.signal.upfirdn(
+            _in_dtype(self._taps, dtype, self._typed),
+            history,
+            up=1,
+            down=self.factor,
+            axis=-1,
+        )
+        start = (first + pad) // self.factor
+        return decimated[..., start : start + count]
+
+    def reset(self):
+        """
+        Clears the delay line; see FirFilter.reset().
+
+        The next sample in is the first one kept.
+        """
+        self._history = None
+        self._next = 0
+
+    def __len__(self):
+        return len(self._taps)
+
+
+def make_decimator(
+    sample_frequency, num_samples, lpf_cutoff, oversampling=4, attenuation_dB=80.0
+):
+    """
+    Makes the decimator that brings a record down to what the band needs.
+
+    The output rate is about oversampling times lpf_cutoff.  The factor
+    is chosen to divide num_samples, so every record decimates to the
+    same length.  The anti-aliasing filter passes up to lpf_cutoff and
+    attenuates by attenuation_dB everything that would fold back below
+    it; what folds in between lpf_cutoff and the new Nyquist frequency
+    is left for the audio filter, run at the lower rate, to remove.
+
+    Args:
+        sample_frequency (float): sample rate of the signal (Hz)
+        num_samples (int): samples per record
+        lpf_cutoff (float): highest frequency of interest (Hz), or None
+        oversampling (float): output rate over lpf_cutoff; above 2, as at
+                              2 there is no room for a transition band
+        attenuation_dB (float): stopband attenuation
+
+    Returns:
+        Decimator: the decimator, or None if no factor above 1 fits
+    """
+    if lpf_cutoff is None:
+        return None
+    if oversampling <= 2:
+        raise ValueError(f"oversampling must be above 2, not {oversampling}")
+    factor = int(sample_frequency // (oversampling * lpf_cutoff))
+    while factor > 1 and num_samples % factor:
+        factor -= 1
+    if factor < 2:
+        return None
+    output_frequency = sample_frequency / factor
+    # Pass to lpf_cutoff, stop from where the image of lpf_cutoff lands.
+    stopband = output_frequency - lpf_cutoff
+    (numtaps, beta) = scipy.signal.kaiserord(
+        attenuation_dB, (stopband - lpf_cutoff) / (sample_frequency / 2)
+    )
+    taps = scipy.signal.firwin(
+        numtaps,
+        (lpf_cutoff + stopband) / 2,
+        window=("kaiser", beta),
+        fs=sample_frequency,
+    )
+    return Decimator(taps, factor)
@@ -0,0 +1,136 @@
+#
+# Keithley 2015 readings taken as a burst into the trace buffer.
+#
+# Asking for each reading with :READ? costs a bus round trip per
+# reading, and another for the frequency.  Instead the meter is armed
+# for a burst of readings into its trace buffer, runs it on its own,
+# and the lot comes back in one transfer.  The waiting is done on a
+# thread of its own, so the software meter captures meanwhile.
+#
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# The 2015's trace buffer holds this many readings.
+MAX_READINGS = 1024
+
+# :STAT:MEAS:COND? bit set once the trace buffer is full.
+BUFFER_FULL = 1 << 9
+
+# How often to ask whether the burst is done (s).
+POLL_INTERVAL = 0.1
+
+# The longest a distortion reading should take (s), and the time on top
+# of a burst's readings allowed for arming and fetching it.  A burst not
+# done by then has stalled, or missed its trigger.
+READING_TIME = 0.5
+TIMEOUT_MARGIN = 10.0
+
+# Readings above this are the meter's overflow value, 9.9e37.
+OVERFLOW = 1e6
+
+
+class KeithleyBurst:
+    """
+    Takes bursts of readings from a Keithley 2015 in the background.
+
+    The meter must already be configured for the measurement; this only
+    sets up triggering, the trace buffer, and the reading format.  The
+    meter can be anything with SCPI write() and query(), which is how
+    it is tested.
+
+    Args:
+        meter: the meter, already set up to measure distortion
+        poll_interval (float): how often to poll for completion (s)
+        reading_time (float): the longest one reading should take (s)
+        timeout_margin (float): time allowed beyond the readings (s)
+    """
+
+    def __init__(
+        self,
+        meter,
+        poll_interval=POLL_INTERVAL,
+        reading_time=READING_TIME,
+        timeout_margin=TIMEOUT_MARGIN,
+    ):
+        self._meter = meter
+        self._poll_interval = poll_interval
+        self._reading_time = reading_time
+        self._timeout_margin = timeout_margin
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="keithley")
+        meter.write(":INIT:CONT OFF")
+        meter.write(":TRIG:SOUR IMM")
+        meter.write(":TRIG:COUN 1")
+        meter.write(":FORM:ELEM READ")
+        meter.write(":TRAC:FEED SENS")
+
+    def start(self, count):
+        """
+        Arms a burst and starts it.
+
+        Args:
+            count (int): readings to take, at most MAX_READINGS
+
+        Returns:
+            concurrent.futures.Future: resolves to (numpy.ndarray,
+                                       float), the SINAD readings (dB)
+                                       and the tone frequency (Hz),
+                                       overflows as NaN; raises
+                                       TimeoutError if the burst takes
+                                       longer than timeout(count)
+        """
+        if not 1 <= count <= MAX_READINGS:
+            raise ValueError(f"count must be 1..{MAX_READINGS}, not {count}")
+        return self._executor.submit(self._burst, count)
+
+    def timeout(self, count):
+        """
+        The longest a burst should take, from start() to its readings.
+
+        Args:
+            count (int): readings in the burst
+
+        Returns:
+            float: the time (s)
+        """
+        return count * self._reading_time + self._timeout_margin
+
+    def close(self):
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def _burst(self, count):
+        deadline = time.monotonic() + self.timeout(count)
+        meter = self._meter
+        meter.write(":TRAC:CLE")
+        meter.write(f":TRAC:POIN {count}")
+        meter.write(f":SAMP:COUN {count}")
+        meter.write(":TRAC:FEED:CONT NEXT")
+        meter.write(":INIT")
+        # Polled rather than waited for with *OPC?, which would have to
+        # outlast the bus timeout for a long burst.
+        while not int(meter.query(":STAT:MEAS:COND?")) & BUFFER_FULL:
+            if time.monotonic() > deadline:
+                meter.write(":ABOR")
+                raise TimeoutError(
+                    f"Keithley burst of {count} readings not done after "
+                    f"{self.timeout(count):g} s"
+                )
+            time.sleep(self._poll_interval)
+        readings = np.array(
+            [float(x) for x in meter.query(":TRAC:DATA?").split(",")], dtype=float
+        )
+        readings[readings > OVERFLOW] = np.nan
+        # The buffer holds only the primary reading; the frequency of the
+        # last one is as good as any.
+        frequency_Hz = float(meter.query(":SENS:DIST:FREQ?"))
+        if frequency_Hz > OVERFLOW:
+            frequency_Hz = float("nan")
+        return (readings, frequency_Hz)
@@ -0,0 +1,363 @@
+#! /usr/bin/env python3
+#
+# Runs auto_sinad.py sweeps on several benches at once.
+#
+# A manifest names the stations, each with its own signal generator,
+# audio source and device under test, and the sweep settings they
+# share.  Every station sweeps in a process of its own, so one bench's
+# slow instrument never holds up another's, and a station that fails,
+# or whose process dies outright, is reported as such while the rest
+# carry on.  Each writes its CSV, and its console output as a log, under
+# the output directory as <dut>.csv and <dut>.log; progress and results
+# come back here over a queue and are reported as they arrive.
+#
+
+import argparse
+import collections
+import contextlib
+import json
+import multiprocessing
+import pathlib
+import queue as queue_pkg
+import sys
+import traceback
+
+import source as source_pkg
+import sweep_settings
+
+# One bench: the DUT's id, which names its files; the signal generator,
+# as auto_sinad.SIGGENS names it; the source, by registry name; the
+# generator's VISA resource (None for its default); the source's
+# arguments as auto_sinad.py takes them after the sweep's; the
+# Keithley's VISA resource, or None for none; and settings that override
+# the shared ones for this station alone.
+Station = collections.namedtuple(
+    "Station",
+    "dut siggen source siggen_resource source_args keithley_resource sweep",
+    defaults=(None, (), None, {}),
+)
+
+# How a station's sweep ended: "done" or "failed", the power (dBm) at
+# which each channel crossed the target, and why it failed.
+StationResult = collections.namedtuple(
+    "StationResult", "dut status sensitivities_dBm error"
+)
+
+# How long to wait on the queue before looking for stations that died.
+_POLL_INTERVAL = 0.1
+
+
+def load_manifest(path):
+    """
+    Reads a station manifest.
+
+    The manifest is JSON: an object with a "stations" list, each station
+    an object with Station's fields (dut, siggen and source required),
+    and optionally "sweep", the settings all stations share, as
+    sweep_settings.Settings names them.  Each station's settings, its
+    own over the shared ones, are checked as auto_sinad.py checks its
+    command line.
+
+    Args:
+        path (str or pathlib.Path): the manifest
+
+    Returns:
+        (list[Station], dict): the stations, and the shared settings
+
+    Raises:
+        ValueError: the manifest is malformed, names a DUT twice, puts
+                    two stations on one signal generator, or gives a
+                    setting that is unknown or out of bounds
+    """
+    with open(path) as f:
+        manifest = json.load(f)
+    settings = dict(manifest.get("sweep", {}))
+    stations = []
+    for i, fields in enumerate(manifest.get("stations", [])):
+        try:
+            station = Station(**fields)
+        except TypeError as e:
+            raise ValueError(f"{path}: station {i}: {e}") from None
+        if not station.dut or not station.siggen or not station.source:
+            raise ValueError(f"{path}: station {i} needs a dut, siggen and source")
+        if pathlib.Path(station.dut).name != station.dut:
+            raise ValueError(f"{path}: DUT {station.dut!r} is not a file name")
+        try:
+            sweep_settings.check({**settings, **station.sweep})
+        except ValueError as e:
+            raise ValueError(f"{path}: {station.dut}: {e}") from None
+        stations.append(
+            station._replace(
+                source_args=list(station.source_args), sweep=dict(station.sweep)
+            )
+        )
+    if not stations:
+        raise ValueError(f"{path}: no stations")
+
+    duts = collections.Counter(station.dut for station in stations)
+    twice = sorted(dut for dut, count in duts.items() if count > 1)
+    if twice:
+        raise ValueError(f"{path}: DUTs named more than once: {', '.join(twice)}")
+    # Two sweeps driving one generator would each set the other's power.
+    # None is the generator's default resource, shared like any other.
+    generators = collections.Counter(
+        (station.siggen, station.siggen_resource) for station in stations
+    )
+    shared = sorted(
+        f"{siggen} {resource or '(default)'}"
+        for (siggen, resource), count in generators.items()
+        if count > 1
+    )
+    if shared:
+        raise ValueError(
+            f"{path}: stations share a signal generator: {', '.join(shared)}"
+        )
+    return (stations, settings)
+
+
+def sweep_station(station, output_path, settings, progress):
+    """
+    Sweeps one station with auto_sinad.py, on its real instruments.
+
+    Args:
+        station (Station): the station
+        output_path (pathlib.Path): the CSV to write
+        settings (dict): auto_sinad.run()'s keyword arguments
+        progress (callable): called with each row as it is written
+
+    Returns:
+        list[float]: the power (dBm) at which each channel crossed the
+                     target
+    """
+    # Imported here, in the station's own process: auto_sinad brings in
+    # pyvisa and the instrument drivers, which the orchestrator itself
+    # never touches.
+    import auto_sinad  # noqa: PLC0415
+
+    source_class = source_pkg.load_sources().get(station.source)
+    source_args = auto_sinad.make_source_parser(source_class).parse_args(
+        station.source_args
+    )
+    return auto_sinad.run(
+        source_class,
+        source_args,
+        station.siggen,
+        station.siggen_resource,
+        station.keithley_resource,
+        output_path,
+        progress=progress,
+        **settings,
+    )
+
+
+def orchestrate(
+    stations,
+    output_dir,
+    settings=None,
+    resume=False,
+    capture=False,
+    worker=sweep_station,
+    on_event=None,
+):
+    """
+    Sweeps every station at once, each in a process of its own.
+
+    Args:
+        stations (list[Station]): the stations
+        output_dir (pathlib.Path): where each station's CSV, log and
+                                   capture go, named for its DUT
+        settings (dict): sweep_settings.Settings shared by every
+                         station, before each station's own; the rest
+                         are the defaults, as auto_sinad.py's are
+        resume (bool): whether to resume each station's CSV
+        capture (bool): whether to keep each station's raw records, in
+                        <dut>.capture
+        worker (callable): sweeps a station, as sweep_station() does;
+                           anything else must be picklable, as it runs
+                           in the station's process
+        on_event (callable): called here with (dut, kind, payload) as
+                             news arrives: kind "row" with each row,
+                             "done" with the sensitivities, "failed"
+                             with why.  Default: print a line.
+
+    Returns:
+        dict[str, StationResult]: by DUT, in the order of stations
+    """
+    on_event = on_event or _print_event
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # spawn, not fork: each station opens its own instruments and audio
+    # device, and SinadPool spawns workers of its own under it.
+    context = multiprocessing.get_context("spawn")
+    events = context.Queue()
+    processes = {}
+    for station in stations:
+        station_settings = {
+            **sweep_settings.check({**(settings or {}), **station.sweep})._asdict(),
+            "resume": resume,
+            "capture_path": (
+                output_dir / f"{station.dut}.capture" if capture else None
+            ),
+        }
+        processes[station.dut] = context.Process(
+            target=_run_station,
+            args=(
+                worker,
+                station,
+                output_dir / f"{station.dut}.csv",
+                station_settings,
+                output_dir / f"{station.dut}.log",
+                events,
+            ),
+            name=f"station-{station.dut}",
+        )
+    for process in processes.values():
+        process.start()
+
+    results = {}
+
+    def handle(event):
+        (dut, kind, payload) = event
+        if kind == "done":
+            results[dut] = StationResult(dut, "done", payload, None)
+        elif kind == "failed":
+            results[dut] = StationResult(dut, "failed", [], payload)
+        on_event(dut, kind, payload)
+
+    try:
+        while any(process.is_alive() for process in processes.values()):
+            with contextlib.suppress(queue_pkg.Empty):
+                handle(events.get(timeout=_POLL_INTERVAL))
+    finally:
+        # On an interrupt, the stations have had it too, and stop once
+        # their generators are off.
+        for process in processes.values():
+            process.join()
+    # A process flushes what it queued before it exits.
+    while True:
+        try:
+            handle(events.get(timeout=_POLL_INTERVAL))
+        except queue_pkg.Empty:
+            break
+
+    for dut, process in processes.items():
+        if dut not in results:
+            # Died without a word: killed, or crashed in native code.
+            error = f"exited with code {process.exitcode}"
+            results[dut] = StationResult(dut, "failed", [], error)
+            on_event(dut, "failed", error)
+    return {station.dut: results[station.dut] for station in stations}
+
+
+def _run_station(worker, station, output_path, settings, log_path, events):
+    # The station's process.  Its console output goes to its log, so
+    # that stations running together do not interleave theirs.
+    with (
+        open(log_path, "a", buffering=1) as log,
+        contextlib.redirect_stdout(log),
+        contextlib.redirect_stderr(log),
+    ):
+        try:
+            sensitivities = worker(
+                station,
+                output_path,
+                settings,
+                lambda row: events.put((station.dut, "row", row)),
+            )
+        except BaseException as e:  # noqa: BLE001
+            # Anything, even an argparse exit or an interrupt, is this
+            # station's failure alone.
+            traceback.print_exc()
+            error = traceback.format_exception_only(e)[-1].strip()
+            events.put((station.dut, "failed", f"{error} (see {log_path})"))
+        else:
+            events.put((station.dut, "done", list(sensitivities or [])))
+
+
+def _print_event(dut, kind, payload):
+    if kind == "row":
+        readings = " ".join(
+            f"{name}={value:.3f}"
+            for name, value in payload.items()
+            if name.startswith("sinad_mean_dB")
+        )
+        print(f"[{dut}] {payload['power_dBm']:8.3f} dBm {readings}")
+    elif kind == "done":
+        crossings = ", ".join(f"{p:.2f} dBm" for p in payload)
+        print(f"[{dut}] done: crossing at {crossings or 'none'}")
+    else:
+        print(f"[{dut}] FAILED: {payload}", file=sys.stderr)
+
+
+def write_summary(results, path):
+    """
+    Writes how every station's sweep ended, as JSON.
+
+    Args:
+        results (dict[str, StationResult]): from orchestrate()
+        path (pathlib.Path): the file to write
+    """
+    with open(path, "w") as f:
+        json.dump([result._asdict() for result in results.values()], f, indent=2)
+        f.write("\n")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Runs SINAD sweeps on several benches at once."
+    )
+    parser.add_argument(
+        "manifest",
+        type=pathlib.Path,
+        help="JSON station manifest (see load_manifest())",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=pathlib.Path,
+        required=True,
+        help="where to write each station's <dut>.csv and <dut>.log, and summary.json",
+    )
+    parser.add_argument(
+        "--only",
+        type=lambda text: text.split(","),
+        metavar="DUT[,DUT...]",
+        help="sweep only these stations of the manifest",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="keep the levels each station has already written, as "
+        "auto_sinad.py --resume does",
+    )
+    parser.add_argument(
+        "--capture",
+        action="store_true",
+        help="also keep each station's raw records, in <dut>.capture",
+    )
+    args = parser.parse_args(argv[1:])
+
+    try:
+        (stations, settings) = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.only:
+        unknown = sorted(set(args.only) - {station.dut for station in stations})
+        if unknown:
+            parser.error(f"not in the manifest: {', '.join(unknown)}")
+        stations = [station for station in stations if station.dut in args.only]
+
+    results = orchestrate(
+        stations, args.output_dir, settings, args.resume, args.capture
+    )
+    summary_path = args.output_dir / "summary.json"
+    write_summary(results, summary_path)
+    print(f"wrote {summary_path}")
+    failed = [result.dut for result in results.values() if result.status != "done"]
+    if failed:
+        print(f"failed: {', '.join(failed)}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
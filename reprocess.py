@@ -0,0 +1,276 @@
+#! /usr/bin/env python3
+#
+# Measures stored captures again, under other settings.
+#
+# Takes captures written by auto_sinad.py --capture and, for every
+# combination of the bands, filter lengths and windows asked for,
+# filters and measures the raw records again and writes a CSV in
+# auto_sinad.py's layout, a set of columns per channel, so auto_plot.py
+# plots it as it would a sweep.
+# The work is spread over processes, each reading the captures through
+# memory maps, so only the records being measured are ever in memory.
+#
+
+import argparse
+import collections
+import itertools
+import math
+import pathlib
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import capture
+import checkpoint
+import filters
+import sinad as sinad_pkg
+import sweep
+
+DEFAULT_BAND = (200.0, 4000.0)
+DEFAULT_NUMTAPS = 101
+
+# One way of measuring: the band-pass edges (Hz, or None for no edge),
+# the filter's length, the periodogram's window, and how the band is
+# applied (one of filters.BAND_LIMITS).
+Config = collections.namedtuple(
+    "Config", "hpf_cutoff lpf_cutoff numtaps window band_limit", defaults=("time",)
+)
+
+# The power of records captured with no generator.  NaN is not equal to
+# itself, so every NaN is mapped to this one to make them one level.
+_NO_POWER = float("nan")
+
+
+def config_name(config):
+    """
+    Names a configuration, for its output file.
+
+    Args:
+        config (Config): the configuration
+
+    Returns:
+        str: e.g. "200-4000Hz_101taps_kaiser38", with the band limit
+             appended unless it is "time"
+    """
+    band = "-".join("" if f is None else f"{f:g}" for f in config[:2])
+    band = "nofilter" if band == "-" else f"{band}Hz"
+    window = config.window
+    if isinstance(window, tuple):
+        window = "".join(
+            f"{part:g}" if isinstance(part, float) else str(part) for part in window
+        )
+    name = f"{band}_{config.numtaps}taps_{window}"
+    if config.band_limit != "time":
+        name += f"_{config.band_limit}"
+    return name
+
+
+def levels(recording):
+    """
+    Splits a capture into runs of records at one generator power.
+
+    Args:
+        recording (capture.Capture): the capture
+
+    Returns:
+        list[(float, int, int)]: (power_dBm, start, stop) of each run,
+                                 in capture order
+    """
+    power_dBm = recording.power_dBm
+    if len(power_dBm) == 0:
+        return []
+    # NaN, from a capture with no generator, is one level like any other.
+    key = np.where(np.isnan(power_dBm), np.inf, power_dBm)
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    stops = np.r_[starts[1:], len(key)]
+    return [
+        (float(power_dBm[start]), int(start), int(stop))
+        for start, stop in zip(starts, stops, strict=True)
+    ]
+
+
+def reprocess(paths, configs, output_dir, jobs=None):
+    """
+    Measures captures under each configuration and writes the results.
+
+    Args:
+        paths (list[pathlib.Path]): capture directories; levels found
+                                    in more than one are pooled
+        configs (list[Config]): the configurations
+        output_dir (pathlib.Path): where to write one CSV per
+                                   configuration
+        jobs (int): worker processes, or None for one per core
+
+    Returns:
+        list[pathlib.Path]: the CSVs written, in the order of configs
+    """
+    channels = {_channels(capture.Capture(path)) for path in paths}
+    if len(channels) != 1:
+        raise ValueError(f"the captures are of different channels: {channels}")
+    (channels,) = channels
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tasks = []
+    for path in paths:
+        for power_dBm, start, stop in levels(capture.Capture(path)):
+            if math.isnan(power_dBm):
+                power_dBm = _NO_POWER
+            tasks.extend(
+                (config, power_dBm, str(path), start, stop) for config in configs
+            )
+
+    # config -> power_dBm -> statistics of each channel
+    stats = collections.defaultdict(
+        lambda: collections.defaultdict(
+            lambda: [sweep.RunningStats() for _ in channels]
+        )
+    )
+    with ProcessPoolExecutor(jobs) as executor:
+        futures = [
+            executor.submit(_measure_level, *task[2:], task[0]) for task in tasks
+        ]
+        for (config, power_dBm, *_), future in zip(tasks, futures, strict=True):
+            readings = future.result().reshape(-1, len(channels))
+            for level, column in zip(stats[config][power_dBm], readings.T, strict=True):
+                level.update(column)
+
+    written = []
+    sources = [capture.Capture(path).metadata for path in paths]
+    for config in configs:
+        output_path = output_dir / f"{config_name(config)}.csv"
+        settings = {"captures": sources, **config._asdict()}
+        with checkpoint.SweepLog(output_path, settings) as log:
+            for power_dBm, level in sorted(stats[config].items()):
+                log.write(
+                    {"power_dBm": power_dBm, **sweep.sinad_columns(level, channels)}
+                )
+        written.append(output_path)
+    return written
+
+
+def _channels(recording):
+    # The input channels a capture's records hold, as auto_sinad.py
+    # numbers its columns.
+    channels = recording.metadata["source_args"].get("channels")
+    return tuple(channels or range(recording.num_channels))
+
+
+#
+# Worker side.  Each worker maps a capture once and keeps it.
+#
+
+_captures = {}
+
+
+def _measure_level(path, start, stop, config):
+    recording = _captures.get(path)
+    if recording is None:
+        recording = _captures[path] = capture.Capture(path)
+    fs = recording.sample_frequency
+    records = recording.records[start:stop]
+    (audio_filter, spectral) = filters.make_band_limit(
+        fs, config.hpf_cutoff, config.lpf_cutoff, config.band_limit, config.numtaps
+    )
+    if audio_filter:
+        filtered = np.empty(records.shape, dtype=filters.working_dtype(records))
+        for i in range(len(records)):
+            # Filter state carries on through a continuous stream, and
+            # starts over wherever it broke, as it did when captured.
+            if i == 0 or recording.gap[start + i]:
+                audio_filter.reset()
+            filtered[i] = audio_filter(records[i])
+        records = filtered
+    (sinad_dB, _) = sinad_pkg.measure_batch(records, fs, config.window, **spectral)
+    return sinad_dB
+
+
+def _band(text):
+    if text == "none":
+        return (None, None)
+    (low, _, high) = text.partition(":")
+    return (float(low) if low else None, float(high) if high else None)
+
+
+def _window(text):
+    (name, _, parameter) = text.partition(":")
+    return (name, float(parameter)) if parameter else name
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description="Measures stored captures again under other settings."
+    )
+    parser.add_argument(
+        "captures",
+        type=pathlib.Path,
+        nargs="+",
+        help="capture directories, from auto_sinad.py --capture",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        type=pathlib.Path,
+        required=True,
+        help="where to write one CSV per configuration",
+    )
+    parser.add_argument(
+        "-b",
+        "--band",
+        type=_band,
+        action="append",
+        metavar="LOW:HIGH",
+        help="pass band in Hz; either edge may be left empty, or 'none' for "
+        "no filter.  May be repeated (default: 200:4000).",
+    )
+    parser.add_argument(
+        "-n",
+        "--numtaps",
+        type=int,
+        action="append",
+        help=f"filter length, odd.  May be repeated (default: {DEFAULT_NUMTAPS}).",
+    )
+    parser.add_argument(
+        "-w",
+        "--window",
+        type=_window,
+        action="append",
+        metavar="NAME[:PARAM]",
+        help="periodogram window as scipy names it, e.g. hann or kaiser:38.  "
+        "May be repeated (default: kaiser:38, as pysnr uses).",
+    )
+    parser.add_argument(
+        "-L",
+        "--band-limit",
+        choices=filters.BAND_LIMITS,
+        action="append",
+        help="how the band is applied: time filters the samples; brickwall "
+        "and response weight the periodogram instead.  May be repeated "
+        "(default: time).",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="worker processes (default: one per core)",
+    )
+    args = parser.parse_args(argv[1:])
+
+    bands = args.band or [DEFAULT_BAND]
+    numtaps = args.numtaps or [DEFAULT_NUMTAPS]
+    windows = args.window or [sinad_pkg.DEFAULT_WINDOW]
+    band_limits = args.band_limit or ["time"]
+    if any(n % 2 == 0 for n in numtaps):
+        parser.error("--numtaps must be odd")
+    configs = [
+        Config(low, high, n, window, band_limit)
+        for ((low, high), n, window, band_limit) in itertools.product(
+            bands, numtaps, windows, band_limits
+        )
+    ]
+    for path in reprocess(args.captures, configs, args.output_dir, args.jobs):
+        print(f"wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
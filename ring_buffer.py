@@ -0,0 +1,129 @@
+#
+# Fixed-size sample FIFO.
+#
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    A fixed-size FIFO of samples, written and read in place.
+
+    Writing copies into preallocated storage, so a real-time producer
+    such as an audio callback allocates nothing.  When a write would
+    overflow, the oldest samples are dropped to make room; write()
+    says how many, and it is up to the caller whether that is a gap
+    to report or simply how a live window stays live.
+
+    There is no locking: one producer and one consumer share it under
+    a lock of their own.
+
+    With channels, a sample is a frame of one value per channel, as an
+    interleaved device delivers it: writes take and reads return
+    (n, channels) arrays.
+
+    Args:
+        capacity (int): the most samples held at once
+        dtype (numpy.dtype): the sample type
+        channels (int): values per sample, or None for plain 1-D samples
+    """
+
+    def __init__(self, capacity, dtype=float, channels=None):
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, not {capacity}")
+        frame = () if channels is None else (channels,)
+        self._buffer = np.zeros((capacity, *frame), dtype=dtype)
+        self._written = 0
+        self._read = 0
+
+    @property
+    def capacity(self):
+        return len(self._buffer)
+
+    @property
+    def available(self):
+        """The number of samples written and not yet read or dropped."""
+        return self._written - self._read
+
+    def write(self, samples):
+        """
+        Appends samples, dropping the oldest if there is not room.
+
+        Args:
+            samples (numpy.ndarray): the samples, as a 1-D array, or
+                                     (n, channels) with channels
+
+        Returns:
+            int: how many unread samples were dropped
+        """
+        n = len(samples)
+        capacity = self.capacity
+        if n > capacity:
+            # Only the newest capacity of them can survive.
+            self._written += n - capacity
+            samples = samples[n - capacity :]
+            n = capacity
+        start = self._written % capacity
+        first = min(n, capacity - start)
+        self._buffer[start : start + first] = samples[:first]
+        self._buffer[: n - first] = samples[first:]
+        self._written += n
+        dropped = max(0, self.available - capacity)
+        self._read += dropped
+        return dropped
+
+    def read(self, n, out=None):
+        """
+        Removes and returns the oldest n samples.
+
+        Args:
+            n (int): how many; at most available
+            out (numpy.ndarray): where to put them, or None for a new array
+
+        Returns:
+            numpy.ndarray: the samples, oldest first
+        """
+        out = self._peek(self._read, n, out)
+        self._read += n
+        return out
+
+    def read_newest(self, n, out=None):
+        """
+        Returns the newest n samples and drops everything else.
+
+        Args:
+            n (int): how many; at most available
+            out (numpy.ndarray): where to put them, or None for a new array
+
+        Returns:
+            numpy.ndarray: the samples, oldest first
+        """
+        out = self._peek(self._written - n, n, out)
+        self._read = self._written
+        return out
+
+    def discard(self, n=None):
+        """
+        Drops the oldest n samples, or all of them.
+
+        Args:
+            n (int): how many, or None for everything available
+
+        Returns:
+            int: how many were dropped
+        """
+        n = self.available if n is None else min(n, self.available)
+        self._read += n
+        return n
+
+    def _peek(self, position, n, out):
+        if not 0 <= n <= self.available:
+            raise ValueError(f"cannot read {n} samples, {self.available} available")
+        if out is None:
+            out = np.empty((n, *self._buffer.shape[1:]), dtype=self._buffer.dtype)
+        capacity = self.capacity
+        start = position % capacity
+        first = min(n, capacity - start)
+        out[:first] = self._buffer[start : start + first]
+        out[first:n] = self._buffer[: n - first]
+        return out
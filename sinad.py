@@ -2,12 +2,21 @@
 # SINAD measurement.
 #
 
+import functools
+import threading
+
 import numpy as np
+import scipy.fft
+import scipy.signal
 
+import filters
 from vendored import pysnr
 
+# pysnr's window, which the MATLAB figures it is checked against use.
+DEFAULT_WINDOW = ("kaiser", 38)
+
 
-def measure(samples, sample_frequency):
+def measure(samples, sample_frequency, window=DEFAULT_WINDOW, band=None, response=None):
     """
     Measures the SINAD of a record.
 
@@ -31,10 +40,638 @@ def measure(samples, sample_frequency):
     Args:
         samples (numpy.ndarray): the record, as a 1-D array
         sample_frequency (float): sample rate of the record (Hz)
+        window: the periodogram's window, as scipy.signal.get_window
+                takes it; anything but the default departs from pysnr
+        band ((float, float)): band-limit to this pass band (Hz), as a
+                               brickwall; either edge may be None
+        response (tuple[float]): band-limit with the response of these
+                                 FIR taps
 
     Returns:
         (float, float): the SINAD (dB) and the total noise-plus-
                         distortion power (dB)
     """
-    (snr_dB, noise_dB) = pysnr.sinad_signal(samples, fs=sample_frequency)
-    return (10.0 * np.log10(1.0 + 10.0 ** (snr_dB / 10.0)), noise_dB)
+    plan = get_plan(
+        len(samples),
+        sample_frequency,
+        window,
+        band,
+        response,
+        filters.working_dtype(samples),
+    )
+    return plan.measure(samples)
+
+
+def measure_batch(
+    records, sample_frequency, window=DEFAULT_WINDOW, band=None, response=None
+):
+    """
+    Measures the SINAD of each of a stack of records.
+
+    This is measure() run over every row at once: one periodogram along
+    the last axis, and the tone search, notch and noise refill of
+    pysnr.sinad_signal() done as array operations instead of a Python
+    call per record.  The steps and their order are pysnr's, so each
+    reading agrees with measure() on the same row to within rounding.
+
+    float32 records are measured in float32, from the window through
+    the FFT to the noise sum, which halves the memory the periodogram
+    streams through; anything else is measured in float64.
+
+    Any leading axes are batched over alike, so records from several
+    channels, (M, channels, N), are measured in the same one pass and
+    read back as (M, channels).
+
+    Args:
+        records (numpy.ndarray): the records, as an (M, N) array, or
+                                 (..., N)
+        sample_frequency (float): sample rate of the records (Hz)
+        window: the periodogram's window; see measure()
+        band ((float, float)): brickwall pass band; see measure()
+        response (tuple[float]): FIR taps to band-limit with; see
+                                 measure()
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): the SINAD (dB) and the total
+                                        noise-plus-distortion power (dB)
+                                        of each record, both of shape (M,),
+                                        or records' leading axes
+    """
+    records = np.asarray(records)
+    if records.ndim < 2:
+        raise ValueError(f"records must be at least 2-D, not {records.ndim}-D")
+    plan = get_plan(
+        records.shape[-1],
+        sample_frequency,
+        window,
+        band,
+        response,
+        filters.working_dtype(records),
+    )
+    (sinad_dB, noise_dB) = plan.measure_batch(records.reshape(-1, records.shape[-1]))
+    return (
+        sinad_dB.reshape(records.shape[:-1]),
+        noise_dB.reshape(records.shape[:-1]),
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def get_plan(
+    num_samples,
+    sample_frequency,
+    window=DEFAULT_WINDOW,
+    band=None,
+    response=None,
+    dtype=np.float64,
+):
+    """
+    Returns the shared plan for a record length and sample rate.
+
+    Both are fixed for a whole session, so in practice this builds one
+    plan and returns it from then on.  The cache is bounded so that a
+    caller sweeping through lengths does not keep every plan alive.
+
+    Args:
+        num_samples (int): samples per record
+        sample_frequency (float): sample rate (Hz)
+        window: the periodogram's window; see measure()
+        band ((float, float)): brickwall pass band; see measure()
+        response (tuple[float]): FIR taps to band-limit with; see
+                                 measure()
+        dtype (numpy.dtype): what precision to work in
+
+    Returns:
+        SinadPlan: the plan
+    """
+    return SinadPlan(num_samples, sample_frequency, window, band, response, dtype)
+
+
+class SinadPlan:
+    """
+    Everything measuring records of one length and rate can reuse.
+
+    pysnr.sinad_signal() rebuilds its window, frequency axis and bin
+    widths on every call and copies the spectrum several times over.
+    None of that depends on the samples, so a plan builds it once and
+    keeps scratch arrays that each measurement overwrites.
+
+    The FFT is taken at the record length, not padded to a faster one:
+    padding would move the bins, and with them the readings, away from
+    pysnr and the MATLAB figures it is pinned against.  scipy.fft
+    already caches its own setup per length.
+
+    The window is pysnr's unless another is asked for, which is for
+    trying alternatives offline (see reprocess.py).
+
+    A plan can also band-limit, in place of filtering the samples first:
+    the periodogram is weighted by a mask, either a brickwall band or
+    the power response of a FIR filter.  That saves a pass over every
+    record, and the noise bandwidth is known exactly (noise_bandwidth).
+    A brickwall zeroes the bins outside the band, and zeroed bins take
+    no part in the noise refill, so the notch is refilled with the
+    median density in the band, not one dragged down by the stopband.
+
+    Measurements are serialized, since they share the scratch arrays.
+    """
+
+    def __init__(
+        self,
+        num_samples,
+        sample_frequency,
+        window=DEFAULT_WINDOW,
+        band=None,
+        response=None,
+        dtype=np.float64,
+    ):
+        if num_samples < 2:
+            raise ValueError(f"need at least 2 samples, not {num_samples}")
+        self.num_samples = num_samples
+        self.sample_frequency = sample_frequency
+        self.dtype = np.dtype(dtype)
+        window = scipy.signal.get_window(window, num_samples)
+        # Density scaling, as scipy.signal.periodogram applies it.
+        self._scale = self.dtype.type(
+            1.0 / (sample_frequency * np.sum(window * window))
+        )
+        self._window = window.astype(self.dtype)
+        self._frequencies = scipy.fft.rfftfreq(num_samples, 1.0 / sample_frequency)
+        self._num_bins = len(self._frequencies)
+        self._bins = np.arange(self._num_bins)
+        # pysnr's bandpower() gives each bin the spacing to its
+        # neighbour below, and the bin at 0 Hz the mean spacing.
+        self._df = np.diff(self._frequencies)
+        f = self._frequencies
+        self._widths = np.hstack(((f[-1] - f[0]) / (len(f) - 1), self._df)).astype(
+            self.dtype
+        )
+        self._mask = _band_mask(f, sample_frequency, band, response)
+        if self._mask is not None:
+            self._mask = self._mask.astype(self.dtype)
+        self._lock = threading.Lock()
+        self._workspace = _Workspace(1, num_samples, self._num_bins, self.dtype)
+
+    @property
+    def noise_bandwidth(self):
+        """
+        The bandwidth (Hz) white noise is measured over.
+
+        The integral of the band mask, or half the sample rate with none.
+        """
+        if self._mask is None:
+            return self.sample_frequency / 2
+        return float(np.sum(self._mask * self._widths))
+
+    def measure(self, samples):
+        """
+        Measures the SINAD of a record; see measure().
+
+        Args:
+            samples (numpy.ndarray): the record, num_samples long
+
+        Returns:
+            (float, float): the SINAD (dB) and the total noise-plus-
+                            distortion power (dB)
+        """
+        (sinad_dB, noise_dB) = self.measure_batch(np.reshape(samples, (1, -1)))
+        return (float(sinad_dB[0]), float(noise_dB[0]))
+
+    def measure_batch(self, records):
+        """
+        Measures the SINAD of each row of records; see measure_batch().
+
+        Args:
+            records (numpy.ndarray): the records, (M, num_samples)
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): the SINAD (dB) and the total
+                                            noise-plus-distortion power
+                                            (dB) of each record
+        """
+        if records.shape[-1] != self.num_samples:
+            raise ValueError(
+                f"records are {records.shape[-1]} samples long, "
+                f"this plan is for {self.num_samples}"
+            )
+        with self._lock:
+            ws = self._workspace_for(len(records))
+            self._periodogram(records, ws)
+            (snr_dB, noise_dB) = self._sinad_from_psd(ws)
+        return (10.0 * np.log10(1.0 + 10.0 ** (snr_dB / 10.0)), noise_dB)
+
+    def _workspace_for(self, num_records):
+        # Only the most recent shape is kept: a session measures either
+        # one record at a time or a fixed number per step.
+        if self._workspace.num_records != num_records:
+            self._workspace = _Workspace(
+                num_records, self.num_samples, self._num_bins, self.dtype
+            )
+        return self._workspace
+
+    def _periodogram(self, records, ws):
+        # pysnr removes the mean and calls scipy.signal.periodogram with
+        # detrend=False; this is that, step for step, into the scratch.
+        np.mean(records, axis=-1, keepdims=True, out=ws.means)
+        np.subtract(records, ws.means, out=ws.records)
+        ws.records *= self._window
+        spectrum = scipy.fft.rfft(ws.records, axis=-1)
+        np.multiply(spectrum.real, spectrum.real, out=ws.orig_pxx)
+        np.multiply(spectrum.imag, spectrum.imag, out=ws.work)
+        ws.orig_pxx += ws.work
+        ws.orig_pxx *= self._scale
+        # One-sided: every bin but DC, and Nyquist when N is even, is
+        # doubled.
+        if self.num_samples % 2:
+            ws.orig_pxx[:, 1:] *= 2
+        else:
+            ws.orig_pxx[:, 1:-1] *= 2
+        if self._mask is not None:
+            ws.orig_pxx *= self._mask
+
+    #
+    # The rest is pysnr's sinad_power_spectral_density() over rows.  Its
+    # tone search walks outward from a peak while the spectrum keeps
+    # falling; here each walk is the first bin, on that side, where it
+    # stops falling.
+    #
+
+    def _tone_edges(self, pxx, peak, ws):
+        """
+        Finds the bins either side of each row's peak where the tone ends.
+
+        Args:
+            pxx (numpy.ndarray): the spectra, (M, K)
+            peak (numpy.ndarray): index of the peak in each row, (M,)
+            ws (_Workspace): scratch
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): first and last bin of each tone
+        """
+        k = self._num_bins
+        left_start = np.maximum(0, peak - 1)[:, None]
+        right_start = np.minimum(peak + 1, k - 1)[:, None]
+        # Walking left stops at bin j once bin j-1 is higher; it always
+        # stops at 0.  Walking right stops at bin j once bin j+1 is
+        # higher; it always stops at the last bin.
+        stop = ws.mask
+        stop[:, 0] = True
+        np.greater(pxx[:, :-1], pxx[:, 1:], out=stop[:, 1:])
+        np.less_equal(self._bins, left_start, out=ws.mask2)
+        stop &= ws.mask2
+        left = k - 1 - np.argmax(stop[:, ::-1], axis=-1)
+        stop[:, -1] = True
+        np.less(pxx[:, :-1], pxx[:, 1:], out=stop[:, :-1])
+        np.greater_equal(self._bins, right_start, out=ws.mask2)
+        stop &= ws.mask2
+        right = np.argmax(stop, axis=-1)
+        return (left, right)
+
+    def _sinad_from_psd(self, ws):
+        f = self._frequencies
+        k = self._num_bins
+        pxx = ws.pxx
+        rows = np.arange(len(pxx))
+        np.copyto(pxx, ws.orig_pxx)
+
+        # The DC "tone": the larger of the first two bins, after doubling
+        # the first, and everything up to where the spectrum turns up.
+        pxx[:, 0] *= 2
+        dc_peak = np.argmax(pxx[:, :2], axis=-1)
+        (_, dc_right) = self._tone_edges(pxx, dc_peak, ws)
+        np.less_equal(self._bins, dc_right[:, None], out=ws.mask)
+        np.copyto(pxx, 0.0, where=ws.mask)
+
+        # The fundamental is the largest bin left.  pysnr finds no tone
+        # in the last bin, so such a record has no signal power.
+        peak = np.argmax(pxx, axis=-1)
+        has_tone = peak < k - 1
+        (left, right) = self._tone_edges(pxx, peak, ws)
+        left = np.where(has_tone, left, 0)
+        right = np.where(has_tone, right, -1)
+        width = right - left + 1
+        offsets = np.arange(max(1, width.max()))
+        in_tone = offsets < width[:, None]
+        tone_bins = np.minimum(left[:, None] + offsets, k - 1)
+        signal_pxx = np.where(in_tone, pxx[rows[:, None], tone_bins], 0.0)
+
+        # bandpower() gives each bin the spacing to its neighbour above,
+        # except that the bin at 0 Hz gets the mean spacing, and a slice
+        # not starting at 0 Hz gives its last bin the mean spacing instead.
+        with np.errstate(invalid="ignore"):
+            mean_df = (f[right] - f[left]) / (right - left)
+        starts_at_dc = (f[left] == 0)[:, None]
+        below = self._df[np.maximum(tone_bins - 1, 0)]
+        above = self._df[np.minimum(tone_bins, k - 2)]
+        signal_widths = np.where(starts_at_dc, below, above)
+        is_mean = np.where(starts_at_dc, offsets == 0, offsets == width[:, None] - 1)
+        signal_widths = np.where(is_mean, mean_df[:, None], signal_widths)
+        signal_power = np.where(
+            width > 0, np.sum(signal_pxx * signal_widths, axis=-1), np.nan
+        )
+
+        # Notch the tone out and refill the notch, and anything else left
+        # at zero, with the median of what remains, never above the
+        # original.
+        np.greater_equal(self._bins, left[:, None], out=ws.mask)
+        np.less_equal(self._bins, right[:, None], out=ws.mask2)
+        ws.mask &= ws.mask2
+        np.copyto(pxx, 0.0, where=ws.mask)
+        estimated_noise_density = self._median_of_positive(pxx, ws)
+        np.equal(pxx, 0.0, out=ws.mask)
+        np.copyto(pxx, estimated_noise_density[:, None], where=ws.mask)
+        np.minimum(pxx, ws.orig_pxx, out=pxx)
+        np.multiply(pxx, self._widths, out=ws.work)
+        total_noise = np.sum(ws.work, axis=-1)
+
+        return (
+            pysnr.mag2db(signal_power / total_noise),
+            pysnr.mag2db(total_noise),
+        )
+
+    @staticmethod
+    def _median_of_positive(pxx, ws):
+        # np.median(row[row > 0]) for every row, though each row has its
+        # own count: sorting the rest to the end lines the positive
+        # values up at the start of each row.
+        work = ws.work
+        np.copyto(work, pxx)
+        np.greater(pxx, 0.0, out=ws.mask)
+        np.copyto(work, np.inf, where=~ws.mask)
+        work.sort(axis=-1)
+        count = np.count_nonzero(ws.mask, axis=-1)
+        rows = np.arange(len(work))
+        lower = work[rows, np.maximum(count - 1, 0) // 2]
+        upper = work[rows, count // 2]
+        return np.where(count > 0, (lower + upper) / 2, np.nan)
+
+
+def _band_mask(frequencies, sample_frequency, band, response):
+    """
+    Weights each periodogram bin for band-limiting.
+
+    Args:
+        frequencies (numpy.ndarray): the bins' frequencies (Hz)
+        sample_frequency (float): sample rate (Hz)
+        band ((float, float)): brickwall pass band (Hz), or None
+        response (tuple[float]): FIR taps, or None
+
+    Returns:
+        numpy.ndarray: the weight of each bin, or None for no mask
+    """
+    if band is None and response is None:
+        return None
+    mask = np.ones(len(frequencies))
+    if band is not None:
+        (low, high) = band
+        if low is not None:
+            mask[frequencies < low] = 0.0
+        if high is not None:
+            mask[frequencies > high] = 0.0
+    if response is not None:
+        (_, h) = scipy.signal.freqz(response, worN=frequencies, fs=sample_frequency)
+        mask *= np.abs(h) ** 2
+    return mask
+
+
+class _Workspace:
+    # Scratch arrays for measuring num_records records at a time.
+    def __init__(self, num_records, num_samples, num_bins, dtype):
+        self.num_records = num_records
+        self.means = np.empty((num_records, 1), dtype=dtype)
+        self.records = np.empty((num_records, num_samples), dtype=dtype)
+        self.orig_pxx = np.empty((num_records, num_bins), dtype=dtype)
+        self.pxx = np.empty((num_records, num_bins), dtype=dtype)
+        self.work = np.empty((num_records, num_bins), dtype=dtype)
+        self.mask = np.empty((num_records, num_bins), dtype=bool)
+        self.mask2 = np.empty((num_records, num_bins), dtype=bool)
+
+
+class StreamingSinad:
+    """
+    Estimates SINAD continuously, a block of samples at a time.
+
+    measure() needs a whole record and costs an FFT per reading.  This
+    instead keeps running sums over a window of the most recent samples
+    -- a small bank of DFT bins either side of the tone's, and the sum
+    and sum of squares at 0, 1 and 2 cycles per window, each updated one
+    sample in and one out as a sliding DFT -- and reports every
+    hop_length samples once the window has filled.  The cost is a few
+    operations per sample and bin whatever the window or reporting rate.
+
+    A real tone is never exactly on its nominal frequency, and off a
+    bin a rectangular window leaks it into every other bin, where it
+    would count as noise.  So the bins are Hann-windowed, each from
+    three neighbouring rectangular ones, and the tone's power is summed
+    over its lobe as measure() sums it: from the bank's largest bin
+    outward on each side while the bins keep falling.  With a window h
+    of W samples and the one-sided density 2|Y|**2/(W sum(h**2)), that
+    is
+
+        tone = 16 sum(|Y|**2) / (3 W**2)
+
+    over the lobe's bins Y.  The total power is the variance over the
+    window weighted by h**2, which is what the bins sum to over the
+    whole spectrum; weighted otherwise, the tone's share of the noise
+    in its lobe would not cancel out between the two.  Then
+
+        SINAD = total / (total - tone)
+
+    the radio definition, as measure() reports.  The window is rounded
+    to a whole number of tone cycles, which keeps harmonics of the tone
+    out of the bank.  Everything that is not the tone counts as noise
+    and distortion; unlike measure() there is no notch to refill, so
+    band-limit the samples first just the same.
+
+    Args:
+        sample_frequency (float): sample rate of the stream (Hz)
+        window_length (int): samples per reading, before rounding
+        hop_length (int): samples between readings
+        tone_frequency (float): frequency of the test tone (Hz)
+    """
+
+    # Hann-windowed bins either side of the tone's: enough to hold its
+    # lobe, and the sidelobes that still count at 40 dB, with the tone a
+    # bin or so off nominal.
+    BANK_HALF_WIDTH = 8
+
+    # The Hann window squared, 0.375 - 0.5 cos(2 pi m / W)
+    # + 0.125 cos(4 pi m / W), by cycles per window.
+    _HANN_SQUARED = np.array([0.375, -0.5, 0.125])
+
+    # Samples taken in at once, which bounds the bank's scratch.
+    _CHUNK_LENGTH = 8192
+
+    def __init__(
+        self, sample_frequency, window_length, hop_length, tone_frequency=1000.0
+    ):
+        if hop_length < 1:
+            raise ValueError(f"hop_length must be positive, not {hop_length}")
+        samples_per_cycle = sample_frequency / tone_frequency
+        cycles = max(1, round(window_length / samples_per_cycle))
+        self.window_length = max(3, round(cycles * samples_per_cycle))
+        self.hop_length = hop_length
+        self._omega = 2.0 * np.pi * tone_frequency / sample_frequency
+        # The rectangular bins, one more each side than the Hann bins
+        # built from them, in bins from the tone's.
+        self._offsets = np.arange(-self.BANK_HALF_WIDTH - 1, self.BANK_HALF_WIDTH + 2)
+        self._omegas = self._omega + 2.0 * np.pi * self._offsets / self.window_length
+        # A sample's bin contribution when it leaves the window is its
+        # contribution when it arrived, rotated by the window length.
+        self._leaving = np.exp(1j * self._omegas * self.window_length)
+        self._ring = np.zeros(self.window_length)
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the stream so far.
+
+        Call this between captures that are not consecutive samples of
+        one stream, as with FirFilter.reset().
+        """
+        self._ring[:] = 0.0
+        self._position = 0
+        self._count = 0
+        self._phase = 0.0
+        self._tone_sums = np.zeros(len(self._offsets), dtype=complex)
+        # The sum and the sum of squares, by cycles per window.
+        self._sums = np.zeros((2, len(self._HANN_SQUARED)), dtype=complex)
+
+    def update(self, samples):
+        """
+        Takes in the next block of the stream.
+
+        Args:
+            samples (numpy.ndarray): the next samples, as a 1-D array
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): the SINAD (dB) and the total
+                                            noise-plus-distortion power
+                                            (dB) of each reading due
+                                            within the block, oldest
+                                            first; empty if none were
+        """
+        sinad_dB = []
+        noise_dB = []
+        # A chunk no longer than the window never overwrites a sample
+        # it still has to remove.
+        step = min(self.window_length, self._CHUNK_LENGTH)
+        for start in range(0, len(samples), step):
+            chunk = np.asarray(samples[start : start + step])
+            (chunk_sinad_dB, chunk_noise_dB) = self._update(chunk)
+            sinad_dB.append(chunk_sinad_dB)
+            noise_dB.append(chunk_noise_dB)
+        if not sinad_dB:
+            return (np.empty(0), np.empty(0))
+        return (np.concatenate(sinad_dB), np.concatenate(noise_dB))
+
+    def _tone_phasors(self, counts):
+        # exp(-1j omega t) for each bin of the bank, (bins, len(counts)),
+        # at sample numbers self._count + counts.  The bins are whole
+        # cycles per window apart, so that part is exact from the
+        # sample number modulo the window.
+        w = self.window_length
+        cycles = np.outer(self._offsets, (self._count + counts) % w) / w
+        return np.exp(-1j * (self._phase + self._omega * counts + 2.0 * np.pi * cycles))
+
+    def _cycle_phasors(self, counts):
+        # exp(-2j pi k t / W) for k of 0, 1 and 2 cycles per window,
+        # (3, len(counts)), at sample numbers counts, exact from them
+        # modulo the window.
+        w = self.window_length
+        cycles = np.outer(np.arange(len(self._HANN_SQUARED)), counts % w)
+        return np.exp(-2j * np.pi * cycles / w)
+
+    def _update(self, chunk):
+        w = self.window_length
+        n = len(chunk)
+        slots = (self._position + np.arange(n)) % w
+        leaving = self._ring[slots]
+        phasors = self._tone_phasors(np.arange(n))
+        # Whole cycles per window, so these leave on the phasor they
+        # arrived with.
+        cycle_phasors = self._cycle_phasors(self._count + np.arange(n))
+        moments = np.stack((chunk - leaving, chunk * chunk - leaving * leaving))
+
+        # Each sum after each sample of the chunk, as the running total
+        # plus the cumulative change.
+        tone_sums = self._tone_sums[:, None] + np.cumsum(
+            phasors * (chunk - self._leaving[:, None] * leaving), axis=-1
+        )
+        sums = self._sums[:, :, None] + np.cumsum(
+            moments[:, None] * cycle_phasors, axis=-1
+        )
+
+        self._ring[slots] = chunk
+        self._position = (self._position + n) % w
+        self._phase = (self._phase + self._omega * n) % (2.0 * np.pi)
+        self._tone_sums = tone_sums[:, -1]
+        self._sums = sums[..., -1]
+        counts = self._count + 1 + np.arange(n)
+        self._count += n
+        if self._position == 0:
+            self._resum()
+
+        due = (counts >= w) & ((counts - w) % self.hop_length == 0)
+        # The window starts at sample number count - W, the same modulo
+        # W, and h(m)**2 weights sample t0 + m; its sum is 3W/8.
+        turns = np.conj(self._cycle_phasors(counts[due]))
+        weights = self._HANN_SQUARED[:, None] * turns
+        (mean, power) = np.sum(np.real(weights * sums[..., due]), axis=1) / (0.375 * w)
+        total = power - mean * mean
+        tone = self._tone_power(tone_sums[:, due], counts[due])
+        noise = np.maximum(total - tone, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (
+                pysnr.mag2db(total / noise),
+                pysnr.mag2db(noise),
+            )
+
+    def _tone_power(self, tone_sums, counts):
+        """
+        Sums the tone's lobe over the Hann-windowed bank.
+
+        Args:
+            tone_sums (numpy.ndarray): the rectangular bins, (bins, D),
+                                       for D readings
+            counts (numpy.ndarray): samples taken in at each reading
+
+        Returns:
+            numpy.ndarray: the tone's power at each reading
+        """
+        w = self.window_length
+        # The Hann window, 0.5 - 0.5 cos(2 pi m / W) from the window's
+        # first sample, is a bin less half of each neighbour, turned to
+        # where the window starts.
+        turn = self._cycle_phasors(counts)[1]
+        hann = 0.5 * tone_sums[1:-1] - 0.25 * (
+            turn * tone_sums[:-2] + np.conj(turn) * tone_sums[2:]
+        )
+        power = np.abs(hann) ** 2
+
+        # As SinadPlan._tone_edges(): from the peak, a bin either side
+        # and on while the bins keep falling.
+        k = len(power)
+        bins = np.arange(k)[:, None]
+        peak = np.argmax(power, axis=0)
+        stop = np.empty(power.shape, dtype=bool)
+        stop[0] = True
+        np.greater(power[:-1], power[1:], out=stop[1:])
+        stop &= bins <= np.maximum(0, peak - 1)
+        left = k - 1 - np.argmax(stop[::-1], axis=0)
+        stop[-1] = True
+        np.less(power[:-1], power[1:], out=stop[:-1])
+        stop &= bins >= np.minimum(peak + 1, k - 1)
+        right = np.argmax(stop, axis=0)
+        in_lobe = (bins >= left) & (bins <= right)
+        return 16.0 * np.sum(power, axis=0, where=in_lobe) / (3.0 * w * w)
+
+    def _resum(self):
+        # The running sums pick up rounding error with every sample, so
+        # each time the ring comes round they are recomputed from it.
+        # The ring is then in arrival order, oldest first.
+        w = self.window_length
+        ages = np.arange(-w, 0)
+        moments = np.stack((self._ring, self._ring * self._ring))
+        self._tone_sums = np.sum(self._tone_phasors(ages) * self._ring, axis=-1)
+        self._sums = np.sum(
+            moments[:, None] * self._cycle_phasors(self._count + ages), axis=-1
+        )
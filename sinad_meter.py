@@ -1,12 +1,14 @@
 #! /usr/bin/env python3
 
 import argparse
+import contextlib
 import sys
 
 import matplotlib.pyplot as plt
 import matplotlib.style as mplstyle
 import numpy as np
 
+import capture
 import filters
 import sinad as sinad_pkg
 import source as source_pkg
@@ -17,47 +19,141 @@ _NOISY = False
 mplstyle.use("fast")
 
 
-def run(source, sample_frequency, record_length, lpf_cutoff, hpf_cutoff):
+# How SINAD is computed from the samples: "fft" measures each record
+# whole, "streaming" keeps running sums and reports every update
+# interval, however long the records.
+ENGINES = ("fft", "streaming")
+
+
+def _channel_colors(count):
+    # The first channel keeps the meter's blue.
+    return ["#346f9f", *(f"C{i}" for i in range(1, count))]
+
+
+def run(
+    source,
+    sample_frequency,
+    record_length,
+    lpf_cutoff,
+    hpf_cutoff,
+    engine="fft",
+    update_interval=None,
+    band_limit="time",
+    decimate=False,
+    channels=(0,),
+    filter_spec=None,
+):
     num_samples = round(sample_frequency * record_length)
+    record_num_samples = num_samples
+
+    # Everything after the decimator runs at its lower rate.
+    decimator = None
+    if decimate:
+        decimator = filters.make_decimator(sample_frequency, num_samples, lpf_cutoff)
+    if decimator is not None:
+        sample_frequency /= decimator.factor
+        num_samples //= decimator.factor
 
     acquisition_nr = 0
     fig = None
-    ch1_line = None
-    sinad_line = None
+    channel_lines = None
+    sinad_lines = None
+    filtered_sinad_lines = None
     sinad_text = None
     first_time = True
+    # Smooths each channel's readings along its own row.
     sinad_filter = filters.make_moving_average_filter(32)
 
-    audio_filter = filters.make_audio_filter(sample_frequency, hpf_cutoff, lpf_cutoff)
+    (audio_filter, spectral) = filters.make_band_limit(
+        sample_frequency, hpf_cutoff, lpf_cutoff, band_limit, spec=filter_spec
+    )
+
+    # One per channel.
+    streaming_sinads = None
+    if engine == "streaming":
+        hop_length = round(sample_frequency * (update_interval or record_length / 4))
+        streaming_sinads = [
+            sinad_pkg.StreamingSinad(sample_frequency, num_samples, hop_length)
+            for _ in channels
+        ]
 
     while True:
         acquisition_nr += 1
         if _NOISY:
             print(f"[{acquisition_nr}] Recording {num_samples} samples ...")
 
-        samples = source.read()
-        assert len(samples) == num_samples
+        try:
+            samples = source.read()
+        except EOFError as e:
+            # A recording has run out.
+            print(e, file=sys.stderr)
+            break
+        except source_pkg.OverrunError as e:
+            # The stream broke; start the filters over on the new one.
+            print(f"{e}; resynchronizing", file=sys.stderr)
+            if decimator is not None:
+                decimator.reset()
+            if audio_filter:
+                audio_filter.reset()
+            for streaming_sinad in streaming_sinads or []:
+                streaming_sinad.reset()
+            continue
+        assert samples.shape[-1] == record_num_samples
+
+        if decimator is not None:
+            if not source.continuous:
+                decimator.reset()
+            samples = decimator(samples)
 
         if audio_filter:
             if not source.continuous:
                 audio_filter.reset()
             samples = audio_filter(samples)
 
-        t = np.arange(len(samples)) / sample_frequency
+        # A row per channel, however many there are.
+        samples = samples.reshape(len(channels), -1)
+        t = np.arange(samples.shape[-1]) / sample_frequency
 
-        (sinad, _) = sinad_pkg.measure(samples, sample_frequency)
+        # Readings, a row per channel.
+        if streaming_sinads is not None:
+            if not source.continuous:
+                for streaming_sinad in streaming_sinads:
+                    streaming_sinad.reset()
+            readings = np.array(
+                [
+                    streaming_sinad.update(row)[0]
+                    for streaming_sinad, row in zip(
+                        streaming_sinads, samples, strict=True
+                    )
+                ]
+            )
+            if readings.shape[-1] == 0:
+                # The window has not filled yet.
+                continue
+        else:
+            # Every channel in one pass.
+            (sinad_dB, _) = sinad_pkg.measure_batch(
+                samples, sample_frequency, **spectral
+            )
+            readings = sinad_dB[:, None]
+        sinad = readings[:, -1]
 
         if first_time:
             first_time = False
-            sinad_filter(np.full(len(sinad_filter), sinad))
+            sinad_filter(np.repeat(readings[:, :1], len(sinad_filter), axis=-1))
 
-        filtered_sinad = sinad_filter(np.array([sinad]))[0]
+        filtered_sinad = sinad_filter(readings)[:, -1]
 
         suptitle_text = (
             f"{source.pretty_name} Acquisition # {acquisition_nr:5d}\n"
             f"{num_samples} samples ({record_length} seconds at {sample_frequency} Hz)"
         )
-        filtered_sinad_text = f"SINAD={filtered_sinad:.1f} dB"
+        filtered_sinad_text = "\n".join(
+            f"SINAD={value:.1f} dB"
+            if len(channels) == 1
+            else f"ch{channel} SINAD={value:.1f} dB"
+            for channel, value in zip(channels, filtered_sinad, strict=True)
+        )
 
         if fig is None:
             fig = plt.figure(figsize=(16, 8))
@@ -70,24 +166,35 @@ def run(source, sample_frequency, record_length, lpf_cutoff, hpf_cutoff):
             x_max = 1.05 * record_length
             ch1_axis.set_xlim(x_min, x_max)
             ch1_axis.set_ylim(*source.sample_range())
-            (ch1_line,) = ch1_axis.plot(t, samples, color="#346f9f", label="channel 1")
+            channel_lines = [
+                ch1_axis.plot(t, row, color=color, label=f"channel {channel + 1}")[0]
+                for channel, row, color in zip(
+                    channels, samples, _channel_colors(len(channels)), strict=True
+                )
+            ]
             sinad_axis = ch1_axis.twinx()
             sinad_axis.set_ylabel("SINDAD [dB]")
             sinad_axis.set_ylim(0, 30)
-            sinad_line = sinad_axis.axhline(
-                y=sinad, color="r", linestyle="--", alpha=0.25
-            )
-            filtered_sinad_line = sinad_axis.axhline(y=filtered_sinad, color="r")
+            sinad_lines = [
+                sinad_axis.axhline(y=value, color="r", linestyle="--", alpha=0.25)
+                for value in sinad
+            ]
+            filtered_sinad_lines = [
+                sinad_axis.axhline(y=value, color="r") for value in filtered_sinad
+            ]
             sinad_text = sinad_axis.text(
                 x_min + 0.75 * (x_max - x_min), 22, filtered_sinad_text, fontsize=20
             )
             fig.show()
         else:
             fig.suptitle(suptitle_text)
-            ch1_line.set_xdata(t)
-            ch1_line.set_ydata(samples)
-            sinad_line.set_ydata([sinad] * 2)
-            filtered_sinad_line.set_ydata([filtered_sinad] * 2)
+            for line, row in zip(channel_lines, samples, strict=True):
+                line.set_xdata(t)
+                line.set_ydata(row)
+            for line, value in zip(sinad_lines, sinad, strict=True):
+                line.set_ydata([value] * 2)
+            for line, value in zip(filtered_sinad_lines, filtered_sinad, strict=True):
+                line.set_ydata([value] * 2)
             sinad_text.set_text(filtered_sinad_text)
 
         fig.canvas.draw()
@@ -125,7 +232,73 @@ def main():
         "-H", "--hpf", type=float, help="highpass cutoff to apply in Hz (default: none)"
     )
 
+    parser.add_argument(
+        "--filter-spec",
+        type=filters.parse_filter_spec,
+        metavar="STOP_LOW,STOP_HIGH,RIPPLE_DB,ATTENUATION_DB",
+        help="design the --hpf/--lpf filter as the cheapest that meets "
+        "this, e.g. 100,4500,0.1,60; leave out a stopband edge with no "
+        "cutoff (default: a 101-tap window design)",
+    )
+
+    parser.add_argument(
+        "-E",
+        "--engine",
+        choices=ENGINES,
+        default="fft",
+        help="SINAD engine: fft measures each record whole; streaming "
+        "updates running sums and reports every --update-interval "
+        "(default: fft)",
+    )
+    parser.add_argument(
+        "-u",
+        "--update-interval",
+        type=float,
+        dest="update_interval",
+        help="seconds between readings with --engine streaming "
+        "(default: a quarter of the record length)",
+    )
+    parser.add_argument(
+        "--band-limit",
+        choices=filters.BAND_LIMITS,
+        default="time",
+        help="how --hpf and --lpf are applied: time filters the samples; "
+        "brickwall and response instead weight the SINAD periodogram, by "
+        "the band or by the filter's response, and skip the filter pass.  "
+        "Needs --engine fft (default: time)",
+    )
+
+    parser.add_argument(
+        "--decimate",
+        action="store_true",
+        help="bring the sample rate down to about 4x --lpf before filtering "
+        "and measuring, which makes both cheaper (default: off)",
+    )
+
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        metavar="N",
+        help="read up to N records ahead on a separate thread, so that "
+        "acquisition overlaps processing (default: 0, off)",
+    )
+    parser.add_argument(
+        "--capture",
+        metavar="DIR",
+        help="also keep every raw record, with its time, in DIR for "
+        "analysing again later (see capture.py)",
+    )
+
     (args, unparsed_args) = parser.parse_known_args()
+    if args.band_limit != "time" and args.engine != "fft":
+        parser.error("--band-limit other than time needs --engine fft")
+    filter_spec = None
+    if args.filter_spec is not None:
+        try:
+            filter_spec = filters.band_spec(args.hpf, args.lpf, args.filter_spec)
+        except ValueError as e:
+            parser.error(f"--filter-spec: {e}")
 
     source_class = registry.get(args.source)
     source_parser = argparse.ArgumentParser(
@@ -149,6 +322,21 @@ def main():
         default=default_record_length,
         help=f"record length, in seconds (default: {default_record_length} s)",
     )
+    source_parser.add_argument(
+        "--dtype",
+        choices=source_pkg.DTYPES,
+        default="float64",
+        help="sample type from the source on: float32 halves the memory "
+        "filtering and measurement stream through (default: float64)",
+    )
+    source_parser.add_argument(
+        "--channels",
+        type=source_pkg.parse_channels,
+        metavar="N[,N...]",
+        help="input channels to capture, counting from 0, e.g. 0,1 for two "
+        "receivers at once; each is filtered and measured on its own "
+        "(default: 0)",
+    )
 
     source_class.augment_argparse(source_parser)
     if args.help_source:
@@ -156,13 +344,46 @@ def main():
         return
     source_args = source_parser.parse_args(args=unparsed_args)
 
-    with source_class(source_args) as source:
+    source = source_pkg.open_source(source_class, source_args, args.prefetch)
+    prefetching = source
+    writer = None
+    if args.capture:
+        writer = capture.CaptureWriter(
+            args.capture,
+            round(source_args.sample_frequency * source_args.record_length),
+            source_args.sample_frequency,
+            source_class.name,
+            vars(source_args),
+            source_pkg.sample_dtype(source_args),
+            num_channels=len(source_pkg.channels(source_args)),
+        )
+        source = capture.CapturingSource(source, writer)
+    with writer or contextlib.nullcontext(), source:
         run(
             source,
             source_args.sample_frequency,
             source_args.record_length,
             args.lpf,
             args.hpf,
+            args.engine,
+            args.update_interval,
+            args.band_limit,
+            args.decimate,
+            source_pkg.channels(source_args),
+            filter_spec,
+        )
+        if isinstance(prefetching, source_pkg.PrefetchingSource):
+            print(
+                f"prefetch: {prefetching.overflows} records dropped, "
+                f"{prefetching.backpressure_waits} waits for the display, "
+                f"{prefetching.underruns} waits for the source",
+                file=sys.stderr,
+            )
+    if writer is not None:
+        print(
+            f"captured {writer.records_written} records to {args.capture} "
+            f"({writer.backlog_waits} waits for the disk)",
+            file=sys.stderr,
         )
 
 
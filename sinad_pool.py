@@ -0,0 +1,171 @@
+#
+# SINAD measurement across a pool of processes.
+#
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import sinad as sinad_pkg
+
+
+class SinadPool:
+    """
+    Filters and measures records in worker processes.
+
+    The caller writes records into the records array, which lives in
+    shared memory, and submits row ranges as they fill; only the range
+    crosses to a worker, never the samples.  Submitting while still
+    capturing overlaps the two, so capture can run at the device's rate
+    while the analysis spreads over cores.
+
+    Filtering in a worker restarts the filter on every record, which is
+    only right for a source that is not continuous.  A continuous
+    source's records must be filtered in order, in the capturing
+    process, and submitted already filtered.
+
+    Records of several channels are rows of (num_channels, num_samples),
+    and their readings come back a row of channels per record.
+
+    Args:
+        jobs (int): worker processes
+        capacity (int): rows in the records array
+        num_samples (int): samples per record
+        sample_frequency (float): sample rate of the records (Hz)
+        audio_filter (filters.FirFilter): the filter workers apply, or
+                                          None
+        spectral (dict): band and response keyword arguments for
+                         sinad.measure_batch(), from
+                         filters.make_band_limit()
+        dtype (numpy.dtype): the records' sample type
+        num_channels (int): channels per record
+    """
+
+    def __init__(
+        self,
+        jobs,
+        capacity,
+        num_samples,
+        sample_frequency,
+        audio_filter,
+        spectral=None,
+        dtype=np.float64,
+        num_channels=1,
+    ):
+        shape = (capacity, num_samples)
+        if num_channels > 1:
+            shape = (capacity, num_channels, num_samples)
+        dtype = np.dtype(dtype)
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=int(np.prod(shape)) * dtype.itemsize
+        )
+        self.records = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf)
+        # spawn, not fork: the capturing process has audio and prefetch
+        # threads running, and forking a threaded process is unsafe.
+        self._executor = ProcessPoolExecutor(
+            jobs,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                self._shm.name,
+                shape,
+                dtype,
+                sample_frequency,
+                audio_filter,
+                spectral or {},
+            ),
+        )
+        self._futures = []
+
+    def submit(self, start, stop, apply_filter):
+        """
+        Queues rows [start, stop) of records for measurement.
+
+        Args:
+            start (int): first row
+            stop (int): one past the last row
+            apply_filter (bool): whether the worker filters them first
+        """
+        self._futures.append(
+            self._executor.submit(_measure_rows, start, stop, apply_filter)
+        )
+
+    def gather(self, block=True):
+        """
+        Collects the results of what was submitted since the last gather().
+
+        Args:
+            block (bool): whether to wait for everything, or to return
+                          only what has finished, keeping the order:
+                          nothing past the first range still running
+
+        Returns:
+            (numpy.ndarray, numpy.ndarray): the SINAD (dB) and the total
+                                            noise-plus-distortion power
+                                            (dB) of each row collected,
+                                            in the order submitted; a
+                                            row per record, a column
+                                            per channel, with several
+        """
+        finished = len(self._futures)
+        if not block:
+            finished = 0
+            while finished < len(self._futures) and self._futures[finished].done():
+                finished += 1
+        results = [future.result() for future in self._futures[:finished]]
+        del self._futures[:finished]
+        if not results:
+            empty = np.empty((0, *self.records.shape[1:-1]))
+            return (empty, empty)
+        return (
+            np.concatenate([r[0] for r in results]),
+            np.concatenate([r[1] for r in results]),
+        )
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+        # The view has to go before the block it points into can close.
+        del self.records
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+
+#
+# Worker side.  Each worker attaches to the records once, at start.
+#
+
+_worker = {}
+
+
+def _init_worker(shm_name, shape, dtype, sample_frequency, audio_filter, spectral):
+    # Workers share the capturing process's resource tracker, so
+    # attaching registers nothing new and the block is unlinked once, by
+    # SinadPool.close().
+    shm = shared_memory.SharedMemory(name=shm_name)
+    _worker["shm"] = shm
+    _worker["records"] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _worker["sample_frequency"] = sample_frequency
+    _worker["audio_filter"] = audio_filter
+    _worker["spectral"] = spectral
+
+
+def _measure_rows(start, stop, apply_filter):
+    rows = _worker["records"][start:stop]
+    audio_filter = _worker["audio_filter"]
+    if apply_filter and audio_filter:
+        filtered = np.empty_like(rows)
+        for i, row in enumerate(rows):
+            audio_filter.reset()
+            filtered[i] = audio_filter(row)
+        rows = filtered
+    return sinad_pkg.measure_batch(
+        rows, _worker["sample_frequency"], **_worker["spectral"]
+    )
@@ -1,8 +1,22 @@
+import collections
 import importlib
+import threading
 
+import numpy as np
 import registries
 
 
+class OverrunError(RuntimeError):
+    """
+    Raised by read() on a continuous source whose reader fell behind.
+
+    Samples were lost, so the stream has a gap.  The source has dropped
+    its backlog and the next read() starts a fresh, unbroken stream;
+    anything carrying state across reads should be reset before it
+    sees that record.
+    """
+
+
 class Source:
     name: str = "error"
     pretty_name: str = "error"
@@ -35,8 +49,47 @@ class Source:
         pass
 
     def read(self):
+        """
+        Returns the next record.
+
+        Returns:
+            numpy.ndarray: the record, shaped as record_shape() says for
+                           the channels asked for
+        """
         raise NotImplementedError("read is not implemented")
 
+    def flush(self):
+        """
+        Drops whatever has been captured but not yet read.
+
+        The next read() starts with samples captured after this call, so
+        use it after changing the signal, to keep a record from
+        straddling the change.  For a continuous source the stream has a
+        gap here and stateful filtering must be reset.
+
+        Record-based backends capture afresh on every read(), so by
+        default there is nothing to drop.
+        """
+
+    def discard(self, num_samples):
+        """
+        Reads and drops at least num_samples samples.
+
+        This is for letting what is being measured settle after a change,
+        following a flush().  By default it reads whole records, so it
+        may drop up to a record more than asked.
+
+        Args:
+            num_samples (int): how many samples to drop
+
+        Returns:
+            int: how many were dropped
+        """
+        dropped = 0
+        while dropped < num_samples:
+            dropped += self.read().shape[-1]
+        return dropped
+
     def sample_range(self):
         raise NotImplementedError("sample_range is not implemented")
 
@@ -52,6 +105,230 @@ class Source:
         self.close()
 
 
+class PrefetchingSource(Source):
+    """
+    Reads ahead from another source on a worker thread.
+
+    The worker keeps up to depth records queued while the caller
+    processes the last one, so acquisition and processing overlap and
+    the reading rate is set by the slower of the two rather than their
+    sum.
+
+    What happens when the queue is full depends on the source.  A
+    continuous one is held back (backpressure), since dropping a record
+    would break its stream; it then buffers, and if it overruns, that
+    OverrunError comes out of read() in its place in the stream.  A
+    record-based one is live, so the oldest queued record is dropped
+    instead, as the source itself would have done.
+
+    The counters say how the two sides are keeping up:
+
+        overflows -- records dropped because the queue was full
+        backpressure_waits -- times the worker waited for room
+        underruns -- times read() waited for a record
+
+    Args:
+        inner (Source): the source to read from; it is started, stopped
+                        and closed with this one
+        depth (int): the most records to hold
+    """
+
+    def __init__(self, inner, depth=2):
+        if depth < 1:
+            raise ValueError(f"depth must be positive, not {depth}")
+        self._inner = inner
+        self._depth = depth
+        self.name = inner.name
+        self.pretty_name = inner.pretty_name
+        self.continuous = inner.continuous
+        # (generation, record), or an exception in place of a record.
+        # flush() moves to a new generation, which makes everything read
+        # before it stale, including a read that was under way.
+        self._queue = collections.deque()
+        self._generation = 0
+        # What ended the stream, once the worker has stopped on it.  Kept
+        # through flush(), so that every read() after it raises it.
+        self._error = None
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self.overflows = 0
+        self.backpressure_waits = 0
+        self.underruns = 0
+
+    def start(self):
+        self._inner.start()
+        self._stopping = False
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, name=f"PrefetchingSource({self.name})", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify_all()
+            self._thread.join()
+            self._thread = None
+        self._inner.stop()
+
+    def close(self):
+        self._inner.close()
+
+    def read(self):
+        with self._cond:
+            while True:
+                if not self._queue:
+                    if self._error is not None:
+                        raise self._error
+                    self.underruns += 1
+                    self._cond.wait_for(lambda: self._queue or self._error is not None)
+                    continue
+                (generation, item) = self._queue.popleft()
+                self._cond.notify_all()
+                if generation == self._generation:
+                    break
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def flush(self):
+        with self._cond:
+            self._generation += 1
+            self._queue.clear()
+            self._cond.notify_all()
+        self._inner.flush()
+
+    def sample_range(self):
+        return self._inner.sample_range()
+
+    def sample_unit(self):
+        return self._inner.sample_unit()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                generation = self._generation
+            try:
+                item = self._inner.read()
+            except OverrunError as e:
+                # The stream resumes after the gap; pass the news on in
+                # order and keep reading.
+                item = e
+            # Anything else ends the stream; the caller is the one to
+            # hear about it.
+            except Exception as e:  # noqa: BLE001
+                item = e
+            with self._cond:
+                if len(self._queue) >= self._depth and not self._stopping:
+                    if self.continuous:
+                        self.backpressure_waits += 1
+                        self._cond.wait_for(
+                            lambda: len(self._queue) < self._depth or self._stopping
+                        )
+                    else:
+                        self._queue.popleft()
+                        self.overflows += 1
+                if self._stopping:
+                    return
+                if isinstance(item, Exception) and not isinstance(item, OverrunError):
+                    # Raised by read() once it has had what came before,
+                    # and by every read() after, flushed or not.
+                    self._error = item
+                    self._cond.notify_all()
+                    return
+                self._queue.append((generation, item))
+                self._cond.notify_all()
+
+
+def open_source(source_class, args, prefetch=0):
+    """
+    Makes a source, optionally reading ahead.
+
+    Args:
+        source_class (type[Source]): the backend
+        args (argparse.Namespace): its arguments
+        prefetch (int): records to read ahead, or 0 not to
+
+    Returns:
+        Source: the source, not yet started
+    """
+    inner = source_class(args)
+    if not prefetch:
+        return inner
+    return PrefetchingSource(inner, prefetch)
+
+
+# What --dtype may ask a source to hand out.  float32 halves the memory
+# every stage after the source streams through, and filters and the SINAD
+# FFT keep to it (see filters.working_dtype()).
+DTYPES = ("float64", "float32")
+
+
+def sample_dtype(args):
+    """
+    The sample type a source's arguments ask for.
+
+    Args:
+        args (argparse.Namespace): the source's arguments
+
+    Returns:
+        numpy.dtype: --dtype, or float64 if it was not given
+    """
+    return np.dtype(getattr(args, "dtype", None) or "float64")
+
+
+def parse_channels(text):
+    """
+    Parses --channels: input channels, counting from 0, by commas.
+
+    Args:
+        text (str): e.g. "0,1"
+
+    Returns:
+        tuple[int]: the channels, in the order given
+    """
+    channels = tuple(int(x) for x in text.split(","))
+    if any(c < 0 for c in channels) or len(set(channels)) != len(channels):
+        raise ValueError(f"channels must be distinct and non-negative: {text}")
+    return channels
+
+
+def channels(args):
+    """
+    The input channels a source's arguments ask for.
+
+    Args:
+        args (argparse.Namespace): the source's arguments
+
+    Returns:
+        tuple[int]: --channels, or (0,) if it was not given
+    """
+    return tuple(getattr(args, "channels", None) or (0,))
+
+
+def record_shape(num_samples, channels):
+    """
+    The shape of what read() returns.
+
+    One channel is a plain 1-D record, as it always was; several are
+    stacked, one row each, so that filters and the SINAD FFT take all of
+    them along the last axis in one pass.
+
+    Args:
+        num_samples (int): samples per record
+        channels (tuple[int]): the input channels
+
+    Returns:
+        tuple[int]: (num_samples,) or (len(channels), num_samples)
+    """
+    if len(channels) == 1:
+        return (num_samples,)
+    return (len(channels), num_samples)
+
+
 class SourceRegistry(registries.Registry[type[Source]]):
     lookup_attrs = ("name",)
 
@@ -65,7 +342,12 @@ SOURCE_REGISTRY = SourceRegistry()
 # them here keeps that in one place instead of relying on every script
 # to import backends it never names.
 #
-BACKEND_MODULES = ("source_digilent", "source_portaudio")
+BACKEND_MODULES = (
+    "source_digilent",
+    "source_portaudio",
+    "source_replay",
+    "source_synthetic",
+)
 
 # Backends whose import failed, as module name -> the ImportError.  A
 # missing backend is not fatal: pydwf is of no interest if you are
@@ -2,6 +2,9 @@
 # Analog Discovery 3 audio source.
 #
 
+import threading
+import time
+
 import numpy as np
 from pydwf import (
     DwfAcquisitionMode,
@@ -15,13 +18,24 @@ from pydwf import (
 from pydwf.utilities import openDwfDevice
 
 import source
+from ring_buffer import RingBuffer
+
+# How long read() sleeps between polls of the device while a record is
+# coming in.  A record is hundreds of milliseconds, so this costs no
+# latency worth having and keeps the polling loop off the CPU.
+POLL_INTERVAL = 5e-3
+
+# How much longer than a record read() waits before deciding the device
+# has stalled.
+TIMEOUT_MARGIN = 1.0
 
 
 class DigilentSource(source.Source):
     name: str = "digilent"
     pretty_name: str = "Digilent DWF Source"
-    # Each read() is a separate record acquisition with a gap before the
-    # next, not a continuous stream.
+    # By default each read() is a separate record acquisition with a gap
+    # before the next, not a continuous stream.  --continuous instead
+    # runs one unbounded acquisition that a background thread drains.
     continuous: bool = False
 
     @staticmethod
@@ -42,6 +56,20 @@ class DigilentSource(source.Source):
             dest="serial_number_filter",
             help="serial number filter to select a specific Digilent Waveforms device",
         )
+        parser.add_argument(
+            "--continuous",
+            action="store_true",
+            help="acquire one unbroken stream and return every sample in "
+            "order, rather than a separate record per read",
+        )
+        parser.add_argument(
+            "--max-backlog",
+            type=float,
+            default=2.0,
+            dest="max_backlog",
+            help="with --continuous, seconds of unread samples to hold before "
+            "giving up on the reader (default: 2 s)",
+        )
         #
         # Useful hack.
         parser.add_argument(
@@ -54,6 +82,10 @@ class DigilentSource(source.Source):
 
     def __init__(self, args):
         self._num_samples = round(args.sample_frequency * args.record_length)
+        self._timeout = args.record_length + TIMEOUT_MARGIN
+        self._dtype = source.sample_dtype(args)
+        self._channels = source.channels(args)
+        self.continuous = args.continuous
         self._dwf = DwfLibrary()
         self._device = openDwfDevice(
             self._dwf,
@@ -61,60 +93,65 @@ class DigilentSource(source.Source):
             score_func=(lambda param: param[DwfEnumConfigInfo.AnalogInBufferSize]),
         )
         self._analog_in = self._device.analogIn
-        self._analog_in.channelEnableSet(0, True)
-        self._analog_in.channelFilterSet(0, DwfAnalogInFilter.Average)
-        self._analog_in.channelRangeSet(0, 5.0)
+        channel_count = self._analog_in.channelCount()
+        for channel in self._channels:
+            if channel >= channel_count:
+                raise ValueError(
+                    f"DigilentSource: no channel {channel}; "
+                    f"the device has {channel_count}"
+                )
+            self._analog_in.channelEnableSet(channel, True)
+            self._analog_in.channelFilterSet(channel, DwfAnalogInFilter.Average)
+            self._analog_in.channelRangeSet(channel, 5.0)
         self._analog_in.acquisitionModeSet(DwfAcquisitionMode.Record)
         self._analog_in.frequencySet(args.sample_frequency)
-        self._analog_in.recordLengthSet(args.record_length)
+        self._stream = None
+        if self.continuous:
+            # A record length of zero records until told to stop.
+            self._analog_in.recordLengthSet(0.0)
+            capacity = max(
+                self._num_samples, round(args.sample_frequency * args.max_backlog)
+            )
+            self._stream = _StreamReader(
+                self._analog_in, capacity, self._dtype, self._channels
+            )
+        else:
+            self._analog_in.recordLengthSet(args.record_length)
         if args.enable_ch1_out:
             _configure_analog_output(
                 self._device, 0, frequency=100, amplitude=1.0, offset=0.0, symmetry=0.25
             )
 
+    def start(self):
+        if self._stream is not None:
+            self._stream.start()
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+
     def close(self):
         self._device.close()
 
     def read(self):
-        samples = []
-        total_samples_lost = 0
-        total_samples_corrupted = 0
-        self._device.analogIn.configure(False, True)
-        while True:
-            status = self._analog_in.status(True)
-
-            (
-                current_samples_available,
-                current_samples_lost,
-                current_samples_corrupted,
-            ) = self._analog_in.statusRecord()
-            total_samples_lost += current_samples_lost
-            total_samples_corrupted += current_samples_corrupted
-
-            if current_samples_available != 0:
-                current_samples = self._analog_in.statusData(
-                    0, current_samples_available
-                )
-                samples.append(current_samples)
-
-            if status == DwfState.Done:
-                break
-
-        if total_samples_lost > 0:
-            print(f"DigilentSource: {total_samples_lost} list samples in acquisition")
-        if total_samples_corrupted > 0:
-            print(
-                f"DigilentSource: {total_samples_corrupted} corrupted "
-                "samples in acquisition"
-            )
+        if self._stream is not None:
+            return self._stream.read(self._num_samples, self._timeout)
+        return _acquire_record(
+            self._analog_in,
+            self._num_samples,
+            self._timeout,
+            dtype=self._dtype,
+            channels=self._channels,
+        )
 
-        samples = np.concatenate(samples)
-        if len(samples) > self._num_samples:
-            discard_count = len(samples) - self._num_samples
-            # print(f"discarding oldest {discard_count} samples out of {len(samples)}")
-            samples = samples[discard_count:]
+    def flush(self):
+        if self._stream is not None:
+            self._stream.flush()
 
-        return samples
+    def discard(self, num_samples):
+        if self._stream is None:
+            return super().discard(num_samples)
+        return self._stream.discard(num_samples, self._timeout)
 
     def sample_range(self):
         return (-2.0, 2.0)
@@ -131,6 +168,221 @@ class DigilentSource(source.Source):
         self.close()
 
 
+def _acquire_record(
+    analog_in,
+    num_samples,
+    timeout,
+    poll_interval=POLL_INTERVAL,
+    dtype=float,
+    channels=(0,),
+):
+    """
+    Runs one Record-mode acquisition.
+
+    Samples are written straight into the record as they arrive.  If the
+    device delivers more than a record, the newest are kept.
+
+    Args:
+        analog_in: the device's pydwf AnalogIn, configured for Record mode
+        num_samples (int): samples per record
+        timeout (float): seconds to wait for the acquisition to finish
+        poll_interval (float): seconds between polls of the device
+        dtype (numpy.dtype): what to hand the samples out as
+        channels (tuple[int]): the enabled channels to read
+
+    Returns:
+        numpy.ndarray: the record, shaped as source.record_shape() says
+    """
+    samples = np.empty(source.record_shape(num_samples, channels), dtype=dtype)
+    filled = 0
+    total_samples_lost = 0
+    total_samples_corrupted = 0
+    deadline = time.monotonic() + timeout
+    analog_in.configure(False, True)
+    while True:
+        status = analog_in.status(True)
+
+        (
+            current_samples_available,
+            current_samples_lost,
+            current_samples_corrupted,
+        ) = analog_in.statusRecord()
+        total_samples_lost += current_samples_lost
+        total_samples_corrupted += current_samples_corrupted
+
+        if current_samples_available != 0:
+            chunk = _status_data(analog_in, channels, current_samples_available)
+            filled = _append_newest(samples, filled, chunk)
+
+        if status == DwfState.Done:
+            break
+        if time.monotonic() > deadline:
+            raise TimeoutError(
+                f"DigilentSource: acquisition did not finish within {timeout} s "
+                f"({filled} of {num_samples} samples)"
+            )
+        time.sleep(poll_interval)
+
+    if total_samples_lost > 0:
+        print(f"DigilentSource: {total_samples_lost} lost samples in acquisition")
+    if total_samples_corrupted > 0:
+        print(
+            f"DigilentSource: {total_samples_corrupted} corrupted "
+            "samples in acquisition"
+        )
+    if filled < num_samples:
+        raise RuntimeError(
+            f"DigilentSource: acquisition ended with {filled} of {num_samples} samples"
+        )
+    return samples
+
+
+def _status_data(analog_in, channels, count):
+    # What one poll brought in, shaped as a record is.
+    if len(channels) == 1:
+        return analog_in.statusData(channels[0], count)
+    return np.stack([analog_in.statusData(channel, count) for channel in channels])
+
+
+def _append_newest(samples, filled, chunk):
+    # Appends chunk to the first filled samples, along the last axis,
+    # sliding the oldest out if it does not fit.  Returns the new fill.
+    n = samples.shape[-1]
+    m = chunk.shape[-1]
+    if m >= n:
+        samples[...] = chunk[..., m - n :]
+        return n
+    excess = max(0, filled + m - n)
+    if excess:
+        samples[..., : filled - excess] = samples[..., excess:filled]
+        filled -= excess
+    samples[..., filled : filled + m] = chunk
+    return filled + m
+
+
+class _StreamReader:
+    """
+    Drains an unbounded Record-mode acquisition on a background thread.
+
+    The thread polls the device at a steady pace and copies what it gets
+    into a ring buffer; read() hands records out of it in order.  Samples
+    the device lost or corrupted, or that the ring had to drop because
+    the reader fell behind, are a gap in the stream and make the next
+    read() raise source.OverrunError.
+
+    Args:
+        analog_in: the device's pydwf AnalogIn, configured for Record mode
+                   with a record length of zero
+        capacity (int): the most unread samples to hold
+        dtype (numpy.dtype): what to hand the samples out as
+        channels (tuple[int]): the enabled channels to read
+        poll_interval (float): seconds between polls of the device
+    """
+
+    def __init__(
+        self,
+        analog_in,
+        capacity,
+        dtype=float,
+        channels=(0,),
+        poll_interval=POLL_INTERVAL,
+    ):
+        self._analog_in = analog_in
+        self._channels = channels
+        self._poll_interval = poll_interval
+        # Frames, one value per channel, when there are several.
+        self._ring = RingBuffer(
+            capacity, dtype, None if len(channels) == 1 else len(channels)
+        )
+        # Guards _ring and the fields below, and signals read().
+        self._cond = threading.Condition()
+        self._lost = 0
+        self._error = None
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopping.clear()
+        self._analog_in.configure(False, True)
+        self._thread = threading.Thread(
+            target=self._run, name="DigilentSource", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        self._analog_in.configure(False, False)
+
+    def read(self, num_samples, timeout):
+        with self._cond:
+            if not self._cond.wait_for(
+                lambda: (
+                    self._ring.available >= num_samples
+                    or self._lost
+                    or self._error is not None
+                ),
+                timeout,
+            ):
+                raise TimeoutError(
+                    f"DigilentSource: no record within {timeout} s "
+                    f"({self._ring.available} of {num_samples} samples)"
+                )
+            if self._error is not None:
+                raise self._error
+            if self._lost:
+                lost = self._lost
+                self._lost = 0
+                self._ring.discard()
+                raise source.OverrunError(
+                    f"DigilentSource: {lost} samples lost from the stream"
+                )
+            return np.ascontiguousarray(self._ring.read(num_samples).T)
+
+    def flush(self):
+        with self._cond:
+            self._ring.discard()
+            # A gap before the flush is no longer one worth reporting.
+            self._lost = 0
+
+    def discard(self, num_samples, timeout):
+        remaining = num_samples
+        while remaining > 0:
+            try:
+                remaining -= self.read(
+                    min(remaining, self._ring.capacity), timeout
+                ).shape[-1]
+            except source.OverrunError:
+                # A gap in what is being thrown away anyway.
+                continue
+        return num_samples
+
+    def _run(self):
+        try:
+            while not self._stopping.is_set():
+                status = self._analog_in.status(True)
+                (available, lost, corrupted) = self._analog_in.statusRecord()
+                chunk = None
+                if available != 0:
+                    chunk = _status_data(self._analog_in, self._channels, available)
+                with self._cond:
+                    self._lost += lost + corrupted
+                    if chunk is not None:
+                        self._lost += self._ring.write(chunk.T)
+                    self._cond.notify()
+                if status == DwfState.Done:
+                    raise RuntimeError("DigilentSource: acquisition stopped")
+                self._stopping.wait(self._poll_interval)
+        # Whatever went wrong, read() is where the caller will hear of it.
+        except Exception as e:  # noqa: BLE001
+            with self._cond:
+                self._error = e
+                self._cond.notify()
+
+
 def _configure_analog_output(
     device, channel, frequency, amplitude, offset, symmetry=None
 ):
@@ -10,6 +10,7 @@ import numpy as np
 import sounddevice
 
 import source
+from ring_buffer import RingBuffer
 
 
 def _int_or_str(text):
@@ -48,10 +49,11 @@ class _ListDevicesAction(argparse.Action):
 class PortAudioSource(source.Source):
     name: str = "portaudio"
     pretty_name: str = "PortAudio Source"
-    # A background callback drains the device continuously, but read()
-    # returns only the newest window and discards whatever piled up while
-    # the caller was busy, so consecutive reads are not one uninterrupted
-    # stream and stateful filtering must reset between them.
+    # A background callback drains the device continuously, but by
+    # default read() returns only the newest window and discards whatever
+    # piled up while the caller was busy, so consecutive reads are not
+    # one uninterrupted stream and stateful filtering must reset between
+    # them.  --continuous instead returns every sample in order.
     continuous: bool = False
 
     @staticmethod
@@ -72,6 +74,20 @@ class PortAudioSource(source.Source):
             help="audio device to open: numeric index or name substring "
             "(see --list-devices)",
         )
+        parser.add_argument(
+            "--continuous",
+            action="store_true",
+            help="return every sample in order, rather than only the newest "
+            "record, so that filters can carry state across reads",
+        )
+        parser.add_argument(
+            "--max-backlog",
+            type=float,
+            default=2.0,
+            dest="max_backlog",
+            help="with --continuous, seconds of unread audio to hold before "
+            "giving up on the reader (default: 2 s)",
+        )
         parser.add_argument(
             "--list-devices",
             action=_ListDevicesAction,
@@ -80,13 +96,37 @@ class PortAudioSource(source.Source):
 
     def __init__(self, args):
         self._num_samples = round(args.sample_frequency * args.record_length)
-        self._channel = 0
-        # Guards _blocks / _available and signals read() when a fresh
-        # window has accumulated.
+        channels = source.channels(args)
+        # What the callback keeps of each block of frames: a plain index
+        # for one channel, and a slice rather than a list where it can
+        # be, so that the callback copies without allocating.
+        if len(channels) == 1:
+            self._columns = channels[0]
+        elif channels == tuple(range(channels[0], channels[0] + len(channels))):
+            self._columns = slice(channels[0], channels[0] + len(channels))
+        else:
+            self._columns = list(channels)
+        # The device delivers float32; that is handed out as is with
+        # --dtype float32, and widened with the default float64.
+        self._dtype = source.sample_dtype(args)
+        self.continuous = args.continuous
+        self._max_backlog = max(
+            self._num_samples, round(args.sample_frequency * args.max_backlog)
+        )
+        # Live mode only ever needs the newest record; continuous mode
+        # holds up to the backlog limit.  Either way the callback copies
+        # into this in place, so PortAudio's thread never allocates.
+        capacity = self._max_backlog if self.continuous else self._num_samples
+        self._ring = RingBuffer(
+            capacity,
+            dtype=np.float32,
+            channels=None if len(channels) == 1 else len(channels),
+        )
+        # Guards _ring and the flags, and signals read() when a whole
+        # record is available.
         self._cond = threading.Condition()
-        self._blocks = []
-        self._available = 0
         self._overflowed = False
+        self._lost = 0
         try:
             # InputStream, not Stream: Stream is duplex and a scalar
             # device applies to both halves, so a capture-only device
@@ -98,6 +138,8 @@ class PortAudioSource(source.Source):
             self._stream = sounddevice.InputStream(
                 samplerate=args.sample_frequency,
                 device=args.device,
+                channels=max(channels) + 1,
+                dtype="float32",
                 callback=self._callback,
             )
         except ValueError as e:
@@ -108,13 +150,17 @@ class PortAudioSource(source.Source):
 
     def _callback(self, indata, _frames, _time, status):
         # Runs on PortAudio's thread; indata is reused after we return, so
-        # copy the channel we keep.
+        # copy the channels we keep.
         with self._cond:
             if status.input_overflow:
                 self._overflowed = True
-            self._blocks.append(indata[:, self._channel].copy())
-            self._available += len(indata)
-            self._cond.notify()
+            dropped = self._ring.write(indata[:, self._columns])
+            if self.continuous:
+                # The reader has fallen too far behind and the oldest of
+                # its backlog is gone; read() reports the gap.
+                self._lost += dropped
+            if self._ring.available >= self._num_samples:
+                self._cond.notify()
 
     def start(self):
         self._stream.start()
@@ -126,24 +172,60 @@ class PortAudioSource(source.Source):
         self._stream.close()
 
     def read(self):
+        if self.continuous:
+            return self._read_continuous()
         with self._cond:
-            self._cond.wait_for(lambda: self._available >= self._num_samples)
-            samples = np.concatenate(self._blocks)
+            self._cond.wait_for(lambda: self._ring.available >= self._num_samples)
+            # Only the newest record: the next read starts fresh from
+            # live audio, so the backlog captured while the caller was
+            # busy is thrown away rather than played back late.
+            samples = self._channels_first(self._ring.read_newest(self._num_samples))
             overflowed = self._overflowed
-            # Drop everything: the next read starts fresh from live audio,
-            # so the backlog captured while the caller was busy is thrown
-            # away rather than played back late.
-            self._blocks = []
-            self._available = 0
             self._overflowed = False
         if overflowed:
             print(
                 "PortAudioSource: input overflowed; samples were dropped",
                 file=sys.stderr,
             )
-        # The newest num_samples are one contiguous span; older backlog is
-        # discarded to stay live.
-        return samples[-self._num_samples :]
+        return samples
+
+    def _read_continuous(self):
+        with self._cond:
+            if self._overflowed or self._lost:
+                lost = self._lost
+                self._ring.discard()
+                self._overflowed = False
+                self._lost = 0
+                raise source.OverrunError(
+                    "PortAudioSource: reader fell behind; "
+                    + (f"{lost} samples dropped" if lost else "input overflowed")
+                )
+            self._cond.wait_for(lambda: self._ring.available >= self._num_samples)
+            return self._channels_first(self._ring.read(self._num_samples))
+
+    def _channels_first(self, frames):
+        # The ring holds frames, (n, channels); a record is a row per
+        # channel.
+        return np.ascontiguousarray(frames.T, dtype=self._dtype)
+
+    def flush(self):
+        with self._cond:
+            self._ring.discard()
+            # A gap before the flush is no longer one worth reporting.
+            self._overflowed = False
+            self._lost = 0
+
+    def discard(self, num_samples):
+        remaining = num_samples
+        with self._cond:
+            while remaining > 0:
+                self._cond.wait_for(lambda: self._ring.available > 0)
+                remaining -= self._ring.discard(remaining)
+            # Samples lost meanwhile were older than the ones just
+            # dropped, so what follows is still unbroken.
+            self._overflowed = False
+            self._lost = 0
+        return num_samples
 
     def sample_range(self):
         return (-1.0, 1.0)
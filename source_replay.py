@@ -0,0 +1,241 @@
+#
+# Replay source: serves recorded audio as if it were being captured.
+#
+
+import pathlib
+import time
+
+import numpy as np
+import scipy.io.wavfile
+
+import capture
+import source
+
+# Full scale of each PCM sample type, so that WAV audio reads as
+# floating point in [-1, 1) like PortAudio's.
+_PCM_FULL_SCALE = {
+    np.dtype(np.int16): 2**15,
+    np.dtype(np.int32): 2**31,
+}
+
+
+def load_samples(path, channel=0):
+    """
+    Maps a recording into memory, without reading it in.
+
+    A WAV file, a .npy array (samples, or samples by channels), or a
+    capture directory (see capture.py), whose records are replayed end to
+    end.
+
+    Args:
+        path (str or pathlib.Path): the recording
+        channel (int): which channel of a multichannel recording, or
+                       None for all of them, as (samples, channels)
+
+    Returns:
+        (numpy.ndarray, float, float): the samples (memory-mapped, in
+                                       the file's own type), what a
+                                       sample is scaled by to give
+                                       floating point, and the
+                                       recording's sample rate, or
+                                       None if it does not say
+    """
+    path = pathlib.Path(path)
+    if path.is_dir():
+        recording = capture.Capture(path)
+        if recording.records.ndim != 2:
+            # Its records are a row per channel; a channel's samples are
+            # not one run of the file to map.
+            raise ValueError(
+                f"{path} holds {recording.num_channels} channels; only "
+                "single-channel captures can be replayed"
+            )
+        return (recording.records.reshape(-1), 1.0, recording.sample_frequency)
+    if path.suffix.lower() == ".npy":
+        (samples, scale, sample_frequency) = (np.load(path, mmap_mode="r"), 1.0, None)
+    else:
+        (sample_frequency, samples) = scipy.io.wavfile.read(path, mmap=True)
+        if samples.dtype == np.uint8:
+            raise ValueError(f"{path}: 8-bit WAV is not supported")
+        scale = 1.0 / _PCM_FULL_SCALE.get(samples.dtype, 1.0)
+    if samples.ndim == 2 and channel is not None:
+        samples = samples[:, channel]
+    return (samples, scale, sample_frequency)
+
+
+class ReplaySource(source.Source):
+    name: str = "replay"
+    pretty_name: str = "Replay Source"
+    # A recording is one stream, so filters may carry state across reads.
+    # Looping joins the end to the start without a gap being reported.
+    # A capture whose stream broke between records is not one; see
+    # __init__().
+    continuous: bool = True
+
+    @staticmethod
+    def default_sample_frequency():
+        return 48_000
+
+    @staticmethod
+    def default_record_length():
+        return 250e-3
+
+    @staticmethod
+    def augment_argparse(parser):
+        parser.add_argument(
+            "-f",
+            "--file",
+            type=pathlib.Path,
+            required=True,
+            help="recording to replay: a WAV file, a .npy array, or a "
+            "--capture directory.  -s must match its sample rate.",
+        )
+        parser.add_argument(
+            "--channel",
+            type=int,
+            default=0,
+            help="channel of a multichannel recording (default: 0); "
+            "--channels takes several",
+        )
+        parser.add_argument(
+            "--speed",
+            type=float,
+            default=0.0,
+            help="pace reads at this multiple of real time, e.g. 1 to "
+            "behave like a live device; 0 reads as fast as possible "
+            "(default: 0)",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="start again from the beginning at the end, rather than stopping",
+        )
+
+    def __init__(self, args):
+        self._num_samples = round(args.sample_frequency * args.record_length)
+        self._dtype = source.sample_dtype(args)
+        channels = (
+            source.channels(args)
+            if getattr(args, "channels", None)
+            else (args.channel,)
+        )
+        self._shape = source.record_shape(self._num_samples, channels)
+        # Columns of each chunk of (samples, channels) to keep, or None
+        # for a recording already cut down to its one channel.
+        self._columns = None
+        if len(channels) == 1:
+            (self._samples, self._scale, sample_frequency) = load_samples(
+                args.file, channels[0]
+            )
+        else:
+            (self._samples, self._scale, sample_frequency) = load_samples(
+                args.file, None
+            )
+            num_columns = self._samples.shape[1] if self._samples.ndim == 2 else 1
+            if max(channels) >= num_columns:
+                raise ValueError(
+                    f"{args.file} has {num_columns} channels, so no "
+                    f"channel {max(channels)}"
+                )
+            self._columns = list(channels)
+        if sample_frequency is not None and sample_frequency != args.sample_frequency:
+            raise ValueError(
+                f"{args.file} is sampled at {sample_frequency:g} Hz; "
+                f"pass -s {sample_frequency:g}"
+            )
+        if len(self._samples) < self._num_samples:
+            raise ValueError(
+                f"{args.file} holds {len(self._samples)} samples, "
+                f"fewer than a record's {self._num_samples}"
+            )
+        if pathlib.Path(args.file).is_dir():
+            # Records captured from a record-based source, or either side
+            # of an overrun or a power change, were never one stream.
+            self.continuous = not np.any(capture.Capture(args.file).gap[1:])
+        self._path = args.file
+        self._sample_rate = args.sample_frequency * args.speed
+        self._loop = args.loop
+        self._position = 0
+        # Samples taken since start(), by read() or skipped, which is
+        # what pacing is measured against.
+        self._consumed = 0
+        self._start_time = None
+        self._range = None
+
+    def start(self):
+        self._consumed = 0
+        self._start_time = time.monotonic()
+
+    def read(self):
+        samples = np.empty(self._shape, dtype=self._dtype)
+        self._take(samples)
+        return samples
+
+    def flush(self):
+        # Unpaced, nothing has piled up.  Paced, whatever "arrived" since
+        # the last read is dropped, as it would be from a device.
+        if self._sample_rate and self._start_time is not None:
+            arrived = int((time.monotonic() - self._start_time) * self._sample_rate)
+            if arrived > self._consumed:
+                self._skip(arrived - self._consumed)
+
+    def discard(self, num_samples):
+        self._wait_for(num_samples)
+        self._skip(num_samples)
+        return num_samples
+
+    def sample_range(self):
+        if self._range is None:
+            if self._scale != 1.0:
+                self._range = (-1.0, 1.0)
+            else:
+                # One pass over the mapped file, the first time asked.
+                self._range = (
+                    float(np.min(self._samples)),
+                    float(np.max(self._samples)),
+                )
+        return self._range
+
+    def sample_unit(self):
+        return "AU"
+
+    def _wait_for(self, num_samples):
+        if not self._sample_rate or self._start_time is None:
+            return
+        due = self._start_time + (self._consumed + num_samples) / self._sample_rate
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _take(self, out):
+        num_samples = out.shape[-1]
+        self._wait_for(num_samples)
+        filled = 0
+        while filled < num_samples:
+            chunk = self._next_chunk(num_samples - filled)
+            count = len(chunk)
+            if self._columns is not None:
+                chunk = chunk[:, self._columns].T
+            np.multiply(chunk, self._scale, out=out[..., filled : filled + count])
+            filled += count
+            self._advance(count)
+
+    def _skip(self, num_samples):
+        while num_samples > 0:
+            count = len(self._next_chunk(num_samples))
+            self._advance(count)
+            num_samples -= count
+
+    def _next_chunk(self, count):
+        if self._position == len(self._samples):
+            if not self._loop:
+                raise EOFError(f"ReplaySource: end of {self._path}")
+            self._position = 0
+        return self._samples[self._position : self._position + count]
+
+    def _advance(self, count):
+        self._position += count
+        self._consumed += count
+
+
+source.SOURCE_REGISTRY.register(ReplaySource)
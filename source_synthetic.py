@@ -0,0 +1,215 @@
+#
+# Synthetic source: a test tone with known impairments, no hardware.
+#
+
+import math
+
+import numpy as np
+
+import source
+
+
+def _floats(text):
+    return [float(x) for x in text.split(",") if x]
+
+
+def _spur(text):
+    (frequency, level) = text.split(":")
+    return (float(frequency), float(level))
+
+
+class SyntheticSource(source.Source):
+    """
+    Generates a tone with a known SINAD.
+
+    Everything that is not the tone -- harmonics, spurs, hum and white
+    noise -- together makes up the noise and distortion, and the noise
+    is whatever power is left once the rest is accounted for.  The SINAD
+    is of the signal as generated, before any band-limiting, so a
+    filter that removes the hum raises what a meter reads.
+
+    The stream is continuous: tones keep their phase and the noise
+    carries on from one read to the next, so a given seed always gives
+    the same samples however they are split into records.
+
+    With several channels, as from receivers side by side, each channel
+    carries the same tones and its own noise, at its own SINAD.
+    """
+
+    name: str = "synthetic"
+    pretty_name: str = "Synthetic Source"
+    continuous: bool = True
+
+    @staticmethod
+    def default_sample_frequency():
+        return 48_000
+
+    @staticmethod
+    def default_record_length():
+        return 250e-3
+
+    @staticmethod
+    def augment_argparse(parser):
+        parser.add_argument(
+            "--sinad",
+            type=_floats,
+            default=[12.0],
+            metavar="DB[,DB...]",
+            help="SINAD of the generated signal, in dB; inf for no noise.  "
+            "With --channels, one for all or one per channel (default: 12 dB)",
+        )
+        parser.add_argument(
+            "--tone-frequency",
+            type=float,
+            default=1000.0,
+            dest="tone_frequency",
+            help="tone frequency (default: 1000 Hz)",
+        )
+        parser.add_argument(
+            "--amplitude",
+            type=float,
+            default=0.5,
+            help="tone peak amplitude (default: 0.5)",
+        )
+        parser.add_argument(
+            "--harmonics",
+            type=_floats,
+            default=[],
+            metavar="DBC,...",
+            help="levels of the 2nd, 3rd, ... harmonics relative to the tone",
+        )
+        parser.add_argument(
+            "--spur",
+            type=_spur,
+            action="append",
+            default=[],
+            metavar="HZ:DBC",
+            help="a spur at HZ, DBC relative to the tone; may be repeated",
+        )
+        parser.add_argument(
+            "--hum",
+            type=float,
+            metavar="DBC",
+            help="mains hum relative to the tone (default: none)",
+        )
+        parser.add_argument(
+            "--hum-frequency",
+            type=float,
+            default=60.0,
+            dest="hum_frequency",
+            help="mains frequency (default: 60 Hz)",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="noise and phase seed, for a repeatable signal (default: 0)",
+        )
+
+    def __init__(self, args):
+        self._num_samples = round(args.sample_frequency * args.record_length)
+        self._dtype = source.sample_dtype(args)
+        channels = source.channels(args)
+        self._shape = source.record_shape(self._num_samples, channels)
+        sinads = args.sinad
+        if len(sinads) == 1:
+            sinads = sinads * len(channels)
+        if len(sinads) != len(channels):
+            raise ValueError(
+                f"{len(sinads)} SINADs for {len(channels)} channels; give one or "
+                "one per channel"
+            )
+        self._amplitude = args.amplitude
+        self._rng = np.random.default_rng(args.seed)
+
+        # (frequency, level relative to the tone in dB) of every tone
+        # but the fundamental.
+        impairments = [
+            ((k + 2) * args.tone_frequency, level)
+            for (k, level) in enumerate(args.harmonics)
+        ]
+        impairments += args.spur
+        if args.hum is not None:
+            impairments.append((args.hum_frequency, args.hum))
+        nyquist = args.sample_frequency / 2
+        for frequency, _ in impairments:
+            if not 0 < frequency < nyquist:
+                raise ValueError(f"{frequency:g} Hz is outside (0, {nyquist:g}) Hz")
+
+        tone_power = args.amplitude**2 / 2
+        impairment_power = sum(
+            tone_power * 10 ** (level / 10) for _, level in impairments
+        )
+        noise_std = []
+        for sinad in sinads:
+            # SINAD = (S + N + D) / (N + D).
+            if math.isinf(sinad):
+                noise_power = 0.0
+            else:
+                noise_power = tone_power / (10 ** (sinad / 10) - 1) - impairment_power
+            if noise_power < 0:
+                raise ValueError(
+                    f"the harmonics, spurs and hum alone make SINAD below {sinad} dB"
+                )
+            noise_std.append(math.sqrt(noise_power))
+        if len(channels) == 1:
+            self._noise_std = noise_std[0]
+        else:
+            # A column, to scale each channel's row of noise.
+            self._noise_std = np.array(noise_std, dtype=self._dtype)[:, None]
+
+        tones = [(args.tone_frequency, 0.0), *impairments]
+        self._omega = np.array(
+            [2 * math.pi * f / args.sample_frequency for f, _ in tones]
+        )
+        self._tone_amplitude = np.array(
+            [args.amplitude * 10 ** (level / 20) for _, level in tones]
+        )
+        self._phase = self._rng.uniform(0, 2 * math.pi, len(tones))
+        # Each further channel's noise is a stream of its own, so that
+        # it too is the same however it is split into records.
+        self._noise_rngs = [self._rng] + [
+            np.random.default_rng([args.seed, channel]) for channel in channels[1:]
+        ]
+
+        # Scratch reused on every read.  The tones are always built in
+        # float64: in float32 the phase of a long record's last samples
+        # is off by enough to read as noise, 80 dB reading 56 over 20 s.
+        self._index = np.arange(self._num_samples, dtype=np.float64)
+        self._work = np.empty(self._num_samples)
+        self._tones = np.empty(self._num_samples)
+        self._noise = np.empty(self._shape, dtype=self._dtype)
+
+    def read(self):
+        tones = self._tones
+        tones[:] = 0.0
+        work = self._work
+        for omega, amplitude, phase in zip(
+            self._omega, self._tone_amplitude, self._phase, strict=True
+        ):
+            np.multiply(self._index, omega, out=work)
+            work += phase
+            np.sin(work, out=work)
+            work *= amplitude
+            tones += work
+        # Every channel has the same tones, in the precision asked for.
+        samples = np.empty(self._shape, dtype=self._dtype)
+        samples[...] = tones
+        # Where each tone picks up on the next read.
+        self._phase = (self._phase + self._omega * self._num_samples) % (2 * math.pi)
+        if np.any(self._noise_std):
+            rows = self._noise.reshape(-1, self._num_samples)
+            for rng, row in zip(self._noise_rngs, rows, strict=True):
+                rng.standard_normal(out=row, dtype=self._dtype)
+            self._noise *= self._noise_std
+            samples += self._noise
+        return samples
+
+    def sample_range(self):
+        return (-2 * self._amplitude, 2 * self._amplitude)
+
+    def sample_unit(self):
+        return "AU"
+
+
+source.SOURCE_REGISTRY.register(SyntheticSource)
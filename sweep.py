@@ -0,0 +1,259 @@
+#
+# Choosing the power levels a sensitivity sweep visits.
+#
+# A strategy calls measure(power_dBm) once per level it wants, and
+# measure returns the mean SINAD there and the standard error of that
+# mean, both in dB.  Recording what was measured is measure's business.
+#
+# RunningStats is for measure's side: it lets a level stop taking
+# readings as soon as its mean is known well enough.
+#
+
+import math
+
+import numpy as np
+
+# Two-sided 95% normal quantile.
+Z_95 = 1.96
+
+
+def linear(measure, start_dBm, stop_dBm, num_points):
+    """
+    Visits evenly spaced levels from start to stop.
+
+    Args:
+        measure (callable): power_dBm -> (mean_dB, sem_dB)
+        start_dBm (float): first level
+        stop_dBm (float): last level
+        num_points (int): how many levels
+
+    Returns:
+        list[(float, float, float)]: (power_dBm, mean_dB, sem_dB) of
+                                     every level visited, in order
+    """
+    return [(p, *measure(p)) for p in np.linspace(start_dBm, stop_dBm, num_points)]
+
+
+def adaptive(
+    measure,
+    start_dBm,
+    stop_dBm,
+    target_dB=12.0,
+    tolerance_dB=0.25,
+    coarse_step_dB=5.0,
+    max_points=40,
+):
+    """
+    Homes in on the level where SINAD crosses the target.
+
+    First a coarse pass climbs from start in steps of coarse_step until
+    SINAD reaches the target, which brackets the crossing.  Then each
+    new level is the secant estimate of the crossing from the bracket's
+    ends, falling back to the midpoint when the secant would barely move
+    an end, and the bracket closes in from whichever side the new level
+    falls on.
+
+    It stops once the crossing is known to within tolerance: either the
+    bracket is that narrow and both ends are distinguishable from the
+    target, or a level is indistinguishable from the target and its
+    noise, carried through the local slope, is within half the
+    tolerance.  Readings too noisy for either stop it once the bracket
+    is a quarter of the tolerance, as does max_points.
+
+    Args:
+        measure (callable): power_dBm -> (mean_dB, sem_dB)
+        start_dBm (float): lowest level to consider
+        stop_dBm (float): highest level to consider
+        target_dB (float): the SINAD whose crossing is wanted
+        tolerance_dB (float): width of the interval to stop at
+        coarse_step_dB (float): step of the bracketing pass
+        max_points (int): the most levels to visit
+
+    Returns:
+        list[(float, float, float)]: (power_dBm, mean_dB, sem_dB) of
+                                     every level visited, in order
+    """
+    visited = []
+
+    def visit(power_dBm):
+        (mean_dB, sem_dB) = measure(power_dBm)
+        visited.append((power_dBm, mean_dB, sem_dB))
+        return visited[-1]
+
+    # Coarse pass: the first level at or above the target, and the one
+    # before it.
+    low = None
+    high = None
+    for power_dBm in _coarse_levels(start_dBm, stop_dBm, coarse_step_dB):
+        point = visit(power_dBm)
+        if point[1] >= target_dB:
+            high = point
+            break
+        low = point
+    if low is None or high is None:
+        # The crossing is not in range; there is nothing to refine.
+        return visited
+
+    while len(visited) < max_points:
+        if _is_resolved(low, high, target_dB, tolerance_dB):
+            break
+        width = high[0] - low[0]
+        power_dBm = _secant(low, high, target_dB)
+        # Keep clear of the ends, or regula falsi can creep in from one
+        # side for ever.
+        if not low[0] + 0.1 * width <= power_dBm <= high[0] - 0.1 * width:
+            power_dBm = low[0] + 0.5 * width
+        point = visit(power_dBm)
+        if point[1] >= target_dB:
+            high = point
+        else:
+            low = point
+
+    return visited
+
+
+def crossing(points, target_dB=12.0):
+    """
+    Interpolates the level where SINAD first crosses the target.
+
+    The crossing is found in power order, rather than by inverting the
+    curve, so a noisy, non-monotonic sweep gives its lowest crossing
+    instead of whatever interpolating SINAD -> power picks.
+
+    Args:
+        points (list[(float, float, float)]): (power_dBm, mean_dB,
+                                              sem_dB), in any order
+        target_dB (float): the SINAD whose crossing is wanted
+
+    Returns:
+        float: the crossing (dBm), or NaN if SINAD never crosses the
+               target from below
+    """
+    points = sorted(p for p in points if not math.isnan(p[1]))
+    for low, high in zip(points, points[1:], strict=False):
+        if low[1] < target_dB <= high[1]:
+            return _secant(low, high, target_dB)
+    return float("nan")
+
+
+class RunningStats:
+    """
+    Mean and spread of readings that arrive a batch at a time.
+
+    Batches are merged without keeping the readings (Chan et al.'s
+    pairwise form of Welford's update), so whether to keep reading can
+    be decided after every batch for the cost of that batch.  NaN
+    readings, which is what the instruments give when out of range, are
+    skipped.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = float("nan")
+        self._m2 = 0.0
+
+    def update(self, readings):
+        """
+        Adds a batch of readings.
+
+        Args:
+            readings (array_like): the readings, possibly containing NaN
+        """
+        readings = np.asarray(readings, dtype=float)
+        readings = readings[~np.isnan(readings)]
+        if readings.size == 0:
+            return
+        count = readings.size
+        mean = readings.mean()
+        m2 = np.sum((readings - mean) ** 2)
+        if self.count == 0:
+            (self.count, self.mean, self._m2) = (count, mean, m2)
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    @property
+    def std(self):
+        """Standard deviation of the readings, as numpy.std gives it."""
+        if self.count == 0:
+            return float("nan")
+        return math.sqrt(self._m2 / self.count)
+
+    @property
+    def sem(self):
+        """Standard error of the mean; NaN until there are two readings."""
+        if self.count < 2:
+            return float("nan")
+        return math.sqrt(self._m2 / (self.count - 1) / self.count)
+
+
+def channel_column(name, channel, channels):
+    """
+    Names a channel's column in a sweep CSV.
+
+    One channel keeps the plain name, as every sweep had before there
+    were channels; with several, each column is suffixed with its
+    channel, e.g. sinad_mean_dB_ch1.
+
+    Args:
+        name (str): the column, e.g. "sinad_mean_dB"
+        channel (int): the input channel
+        channels (tuple[int]): every channel in the sweep
+
+    Returns:
+        str: the column's name
+    """
+    return name if len(channels) == 1 else f"{name}_ch{channel}"
+
+
+def sinad_columns(stats, channels):
+    """
+    Summarizes a level's SINAD readings as sweep CSV columns.
+
+    Args:
+        stats (list[RunningStats]): the readings, one per channel
+        channels (tuple[int]): the channels, in the same order
+
+    Returns:
+        dict: column -> value, channel by channel
+    """
+    columns = {}
+    for channel, level in zip(channels, stats, strict=True):
+        for name, value in (
+            ("sinad_mean_dB", level.mean),
+            ("sinad_std_dB", level.std),
+            ("sinad_sem_dB", level.sem),
+            ("sinad_n", level.count),
+        ):
+            columns[channel_column(name, channel, channels)] = value
+    return columns
+
+
+def _coarse_levels(start_dBm, stop_dBm, step_dB):
+    num_steps = max(1, math.ceil((stop_dBm - start_dBm) / step_dB - 1e-9))
+    return np.linspace(start_dBm, stop_dBm, num_steps + 1)
+
+
+def _secant(low, high, target_dB):
+    ((p0, m0, _), (p1, m1, _)) = (low, high)
+    if m1 == m0:
+        return 0.5 * (p0 + p1)
+    return p0 + (target_dB - m0) * (p1 - p0) / (m1 - m0)
+
+
+def _is_resolved(low, high, target_dB, tolerance_dB):
+    width = high[0] - low[0]
+    slope = (high[1] - low[1]) / width
+    low_clear = target_dB - low[1] > Z_95 * low[2]
+    high_clear = high[1] - target_dB > Z_95 * high[2]
+    if width <= tolerance_dB and low_clear and high_clear:
+        return True
+    # An end indistinguishable from the target is the crossing, as
+    # nearly as the readings can say.
+    for point, clear in ((low, low_clear), (high, high_clear)):
+        if not clear and Z_95 * point[2] / slope <= 0.5 * tolerance_dB:
+            return True
+    return width <= 0.25 * tolerance_dB
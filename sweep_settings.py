@@ -0,0 +1,103 @@
+#
+# The settings of an auto_sinad.py sweep, their defaults, and their
+# bounds.
+#
+# auto_sinad.run(), its command line and orchestrate.py's manifests all
+# take them from here, so a sweep gets the same defaults and is held to
+# the same limits however it is started.  Nothing here touches an
+# instrument, so the orchestrator can check a manifest without loading
+# the drivers.
+#
+
+import collections
+
+import filters
+import keithley_burst
+
+STRATEGIES = ("linear", "adaptive")
+
+# The audio band (Hz) a sweep measures over, and sets the Keithley to.
+AUDIO_BAND = (200.0, 4000.0)
+
+# Everything about a sweep but its instruments, source and files:
+# readings to prefetch and worker processes, seconds of audio dropped
+# after each power change, how the levels are chosen and between which
+# powers (dBm), the SINAD (dB) whose crossing is sought and how closely,
+# how many readings a level takes, and how the audio band is applied
+# and its filter designed.  keithley_readings of None is max_readings;
+# filter_spec is None for the default filter, or the stopband edges,
+# ripple and attenuation, as filters.parse_filter_spec() returns them.
+Settings = collections.namedtuple(
+    "Settings",
+    "prefetch jobs settle_time strategy start_dBm stop_dBm num_points "
+    "target_dB tolerance_dB coarse_step_dB min_readings max_readings "
+    "target_sem_dB keithley_readings band_limit decimate filter_spec",
+    defaults=(
+        0,
+        1,
+        0.25,
+        "linear",
+        -125.0,
+        -95.0,
+        51,
+        12.0,
+        0.25,
+        5.0,
+        10,
+        128,
+        None,
+        None,
+        "time",
+        False,
+        None,
+    ),
+)
+
+DEFAULTS = Settings()
+
+
+def check(settings):
+    """
+    Fills in a sweep's defaults and checks the result is a sweep.
+
+    Args:
+        settings (dict): some of Settings' fields
+
+    Returns:
+        Settings: all of them
+
+    Raises:
+        ValueError: a setting is unknown or out of bounds
+    """
+    unknown = sorted(set(settings) - set(Settings._fields))
+    if unknown:
+        raise ValueError(f"unknown sweep settings: {', '.join(unknown)}")
+    s = DEFAULTS._replace(**settings)
+    if s.prefetch < 0:
+        raise ValueError("need prefetch >= 0")
+    if s.jobs < 1:
+        raise ValueError("need jobs >= 1")
+    if s.settle_time < 0:
+        raise ValueError("need settle_time >= 0")
+    if s.strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {', '.join(STRATEGIES)}")
+    if s.num_points < 1:
+        raise ValueError("need num_points >= 1")
+    if s.tolerance_dB <= 0 or s.coarse_step_dB <= 0:
+        raise ValueError("need tolerance_dB and coarse_step_dB > 0")
+    if not 1 <= s.min_readings <= s.max_readings:
+        raise ValueError("need 1 <= min_readings <= max_readings")
+    if s.target_sem_dB is not None and s.target_sem_dB <= 0:
+        raise ValueError("need target_sem_dB > 0")
+    keithley_readings = s.keithley_readings or s.max_readings
+    if not 1 <= keithley_readings <= keithley_burst.MAX_READINGS:
+        raise ValueError(
+            f"need 1 <= Keithley readings <= {keithley_burst.MAX_READINGS}"
+        )
+    if s.band_limit not in filters.BAND_LIMITS:
+        raise ValueError(f"band_limit must be one of {', '.join(filters.BAND_LIMITS)}")
+    if s.filter_spec is not None:
+        # A manifest's is a list.
+        s = s._replace(filter_spec=tuple(s.filter_spec))
+        filters.band_spec(*AUDIO_BAND, s.filter_spec)
+    return s
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+import agc
+
+
+def test_settles_at_the_target():
+    gain_control = agc.AutomaticGainControl(0.1, smoothing_factor=0.5)
+    samples = 0.5 * np.sin(np.linspace(0, 200 * np.pi, 4800))
+    for _ in range(100):
+        out = gain_control(samples)
+    assert np.sqrt(np.mean(out**2)) == pytest.approx(0.1, rel=1e-3)
+
+
+def test_int16_does_not_overflow():
+    # Squared, 30000 wraps around in int16.
+    gain_control = agc.AutomaticGainControl(0.1, smoothing_factor=1.0)
+    gain_control(np.full(100, 30_000, dtype=np.int16))
+    assert gain_control.get_current_power_estimate() == pytest.approx(30_000**2)
+
+
+def test_float32_stays_float32():
+    gain_control = agc.AutomaticGainControl(0.1)
+    assert gain_control(np.ones(100, dtype=np.float32)).dtype == np.float32
@@ -0,0 +1,50 @@
+import copy
+
+import pytest
+
+import benchmark
+
+
+@pytest.fixture(scope="module")
+def report():
+    return benchmark.run(
+        ["sinad.measure", "make_audio_filter", "loop"], [16_000], [0.1], min_time=0.01
+    )
+
+
+def test_every_point_is_reported(report):
+    assert [r["case"] for r in report["results"]] == [
+        "sinad.measure",
+        "make_audio_filter",
+        "loop",
+    ]
+    for result in report["results"]:
+        assert result["calls_per_second"] > 0
+        assert result["peak_bytes"] > 0
+    (measure, design, loop) = report["results"]
+    assert measure["realtime"] == pytest.approx(0.1 * measure["calls_per_second"])
+    assert design["realtime"] is None
+    assert loop["realtime"] > 0
+
+
+def test_compare_flags_only_what_slowed(report):
+    baseline = copy.deepcopy(report)
+    (measure, design, _) = baseline["results"]
+    measure["calls_per_second"] *= 2
+    design["calls_per_second"] *= 1.1
+    regressions = benchmark.compare(report, baseline, tolerance=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("sinad.measure at 16000 Hz, 0.1 s")
+
+
+def test_compare_ignores_points_not_in_the_baseline(report):
+    assert benchmark.compare(report, {"results": []}) == []
+
+
+def test_falling_behind(report):
+    slow = copy.deepcopy(report)
+    slow["results"][-1]["realtime"] = 0.5
+    assert benchmark.falling_behind(report) == []
+    assert benchmark.falling_behind(slow) == [
+        "loop at 16000 Hz, 0.1 s: 0.50x real time"
+    ]
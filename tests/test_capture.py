@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+import capture
+import source
+
+NUM_SAMPLES = 64
+
+
+class _CountingSource(source.Source):
+    """Hands out records filled with 0, 1, 2, ..."""
+
+    name = "counting"
+    pretty_name = "Counting Source"
+
+    def __init__(self, continuous=True):
+        self.continuous = continuous
+        self._next = 0
+
+    def read(self):
+        self._next += 1
+        return np.full(NUM_SAMPLES, float(self._next - 1))
+
+
+def _writer(path, **kwargs):
+    return capture.CaptureWriter(path, NUM_SAMPLES, 16_000, "counting", **kwargs)
+
+
+def test_records_read_back_as_written(tmp_path):
+    rng = np.random.default_rng(0)
+    records = rng.standard_normal((10, NUM_SAMPLES))
+    buffer = np.empty(NUM_SAMPLES)
+    with _writer(tmp_path, depth=2) as writer:
+        for i, record in enumerate(records):
+            # The writer takes a copy, so the buffer can be reused.
+            buffer[:] = record
+            writer.write(buffer, power_dBm=-120.0 + i)
+    c = capture.Capture(tmp_path)
+    assert len(c) == 10
+    assert c.sample_frequency == 16_000
+    assert c.metadata["source"] == "counting"
+    np.testing.assert_array_equal(c.records, records)
+    np.testing.assert_array_equal(c.power_dBm, -120.0 + np.arange(10))
+    assert isinstance(c.records, np.memmap)
+    assert np.all(np.diff(c.timestamp) >= 0)
+
+
+def test_capture_is_a_view_of_the_disk(tmp_path):
+    records = np.arange(3 * NUM_SAMPLES, dtype=float).reshape(3, NUM_SAMPLES)
+    with _writer(tmp_path) as writer:
+        for record in records:
+            writer.write(record)
+    c = capture.Capture(tmp_path)
+    np.testing.assert_array_equal(c.records, records)
+    assert not c.records.flags.writeable
+    assert np.all(np.isnan(c.power_dBm))
+
+
+def test_appending_drops_a_record_cut_short(tmp_path):
+    with _writer(tmp_path) as writer:
+        writer.write(np.zeros(NUM_SAMPLES))
+        writer.write(np.ones(NUM_SAMPLES))
+    # A crash part way through the second record's samples.
+    with open(tmp_path / capture.RECORDS_NAME, "r+b") as f:
+        f.truncate(NUM_SAMPLES * 8 + 100)
+    assert len(capture.Capture(tmp_path)) == 1
+    with _writer(tmp_path) as writer:
+        writer.write(np.full(NUM_SAMPLES, 2.0))
+    c = capture.Capture(tmp_path)
+    np.testing.assert_array_equal(c.records[:, 0], [0.0, 2.0])
+
+
+def test_appending_refuses_a_different_shape(tmp_path):
+    _writer(tmp_path).close()
+    with pytest.raises(ValueError):
+        capture.CaptureWriter(tmp_path, NUM_SAMPLES + 1, 16_000, "counting")
+
+
+def test_empty_capture(tmp_path):
+    _writer(tmp_path).close()
+    c = capture.Capture(tmp_path)
+    assert len(c) == 0
+    assert c.records.shape == (0, NUM_SAMPLES)
+
+
+@pytest.mark.parametrize("continuous", [True, False])
+def test_capturing_source_marks_gaps(tmp_path, continuous):
+    with (
+        _writer(tmp_path) as writer,
+        capture.CapturingSource(_CountingSource(continuous), writer) as capturing,
+    ):
+        capturing.power_dBm = -110.0
+        capturing.read()
+        capturing.read()
+        capturing.flush()
+        capturing.discard(NUM_SAMPLES)
+        capturing.power_dBm = -100.0
+        capturing.read()
+    c = capture.Capture(tmp_path)
+    # What discard() dropped is not captured.
+    np.testing.assert_array_equal(c.records[:, 0], [0.0, 1.0, 3.0])
+    np.testing.assert_array_equal(c.power_dBm, [-110.0, -110.0, -100.0])
+    np.testing.assert_array_equal(c.gap, [True, not continuous, True])
+
+
+def test_records_of_several_channels(tmp_path):
+    records = np.random.default_rng(1).standard_normal((4, 2, NUM_SAMPLES))
+    with _writer(tmp_path, num_channels=2) as writer:
+        for record in records:
+            writer.write(record)
+        with pytest.raises(ValueError):
+            writer.write(records[0, 0])
+    c = capture.Capture(tmp_path)
+    assert c.num_channels == 2
+    np.testing.assert_array_equal(c.records, records)
+    # Appending takes the same channels only.
+    with pytest.raises(ValueError):
+        _writer(tmp_path)
@@ -0,0 +1,70 @@
+import csv
+
+import pytest
+
+import checkpoint
+
+CONFIG = {"strategy": "linear", "start_dBm": -125.0, "num_points": 3}
+
+
+def _read(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def _row(power_dBm):
+    return {"power_dBm": power_dBm, "sinad_mean_dB": power_dBm + 130.0}
+
+
+def test_rows_are_on_disk_as_soon_as_written(tmp_path):
+    path = tmp_path / "sweep.csv"
+    with checkpoint.SweepLog(path, CONFIG) as log:
+        log.write(_row(-125.0))
+        rows = _read(path)
+    assert len(rows) == 1
+    assert float(rows[0]["power_dBm"]) == -125.0
+    assert rows[0]["config_hash"] == checkpoint.config_hash(CONFIG)
+
+
+def test_resume_keeps_the_levels_done(tmp_path):
+    path = tmp_path / "sweep.csv"
+    with checkpoint.SweepLog(path, CONFIG) as log:
+        log.write(_row(-110.0))
+        log.write(_row(-125.0))
+    with checkpoint.SweepLog(path, CONFIG, resume=True) as log:
+        assert sorted(log.done) == [-125.0, -110.0]
+        assert float(log.done[-110.0]["sinad_mean_dB"]) == 20.0
+        log.write(_row(-95.0))
+    log.sort()
+    assert [float(r["power_dBm"]) for r in _read(path)] == [-125.0, -110.0, -95.0]
+
+
+def test_without_resume_starts_afresh(tmp_path):
+    path = tmp_path / "sweep.csv"
+    with checkpoint.SweepLog(path, CONFIG) as log:
+        log.write(_row(-110.0))
+    with checkpoint.SweepLog(path, CONFIG) as log:
+        assert not log.done
+        log.write(_row(-95.0))
+    assert [float(r["power_dBm"]) for r in _read(path)] == [-95.0]
+
+
+def test_resume_refuses_another_configuration(tmp_path):
+    path = tmp_path / "sweep.csv"
+    with checkpoint.SweepLog(path, CONFIG) as log:
+        log.write(_row(-110.0))
+    with pytest.raises(checkpoint.ConfigMismatchError):
+        checkpoint.SweepLog(path, {**CONFIG, "num_points": 51}, resume=True)
+
+
+def test_resume_drops_a_row_cut_short(tmp_path):
+    path = tmp_path / "sweep.csv"
+    with checkpoint.SweepLog(path, CONFIG) as log:
+        log.write(_row(-125.0))
+        log.write(_row(-110.0))
+    text = path.read_text()
+    path.write_text(text[: text.rindex(",")])
+    with checkpoint.SweepLog(path, CONFIG, resume=True) as log:
+        assert list(log.done) == [-125.0]
+        log.write(_row(-110.0))
+    assert [float(r["power_dBm"]) for r in _read(path)] == [-125.0, -110.0]
@@ -0,0 +1,262 @@
+#
+# FirFilter must give what one lfilter() over the whole stream gives,
+# however the stream is split into calls and whichever engine it uses.
+#
+
+import numpy as np
+import pytest
+import scipy.signal
+
+import filters
+
+
+def _split(samples, sizes):
+    starts = np.cumsum([0, *sizes])
+    return [samples[a:b] for a, b in zip(starts[:-1], starts[1:], strict=True)]
+
+
+@pytest.mark.parametrize("numtaps", [31, filters.FirFilter.FFT_THRESHOLD + 1, 1001])
+def test_matches_lfilter_across_calls(numtaps):
+    rng = np.random.default_rng(numtaps)
+    taps = rng.standard_normal(numtaps)
+    samples = rng.standard_normal(30_000)
+    audio_filter = filters.FirFilter(taps)
+    pieces = _split(samples, [3, 997, 12_000, 5])
+    pieces.append(samples[13_005:])
+    got = np.concatenate([audio_filter(piece) for piece in pieces])
+    expected = scipy.signal.lfilter(taps, 1.0, samples)
+    assert got == pytest.approx(expected, abs=1e-12)
+
+
+def test_long_filters_use_overlap_save():
+    assert not filters.FirFilter(np.ones(filters.FirFilter.FFT_THRESHOLD))._use_fft
+    assert filters.FirFilter(np.ones(filters.FirFilter.FFT_THRESHOLD + 1))._use_fft
+
+
+def test_overlap_save_keeps_only_the_overlap():
+    audio_filter = filters.FirFilter(np.ones(401))
+    audio_filter(np.zeros(100_000))
+    # Its own copy, not a view holding on to the call's samples.
+    assert audio_filter._history.base is None
+    assert audio_filter._history.shape == (400,)
+
+
+@pytest.mark.parametrize("numtaps", [31, 401])
+def test_reset_clears_the_delay_line(numtaps):
+    rng = np.random.default_rng(1)
+    taps = rng.standard_normal(numtaps)
+    audio_filter = filters.FirFilter(taps)
+    audio_filter(rng.standard_normal(5000))
+    audio_filter.reset()
+    samples = rng.standard_normal(5000)
+    expected = scipy.signal.lfilter(taps, 1.0, samples)
+    assert audio_filter(samples) == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize("sizes", [[12_000] * 3, [7, 1, 2, 12_345, 1000, 1, 22_644]])
+def test_decimator_matches_filtering_then_downsampling(sizes):
+    decimator = filters.make_decimator(48_000, 12_000, 4000.0)
+    assert decimator.factor == 3
+    samples = np.random.default_rng(2).standard_normal(sum(sizes))
+    got = np.concatenate([decimator(piece) for piece in _split(samples, sizes)])
+    expected = scipy.signal.lfilter(decimator._taps, 1.0, samples)[::3]
+    assert got == pytest.approx(expected, abs=1e-12)
+
+
+def test_decimator_keeps_only_the_overlap():
+    decimator = filters.make_decimator(48_000, 12_000, 4000.0)
+    decimator(np.zeros(100_000))
+    assert decimator._history.base is None
+    assert decimator._history.shape == (len(decimator) - 1,)
+
+
+def test_decimator_keeps_the_audio_band():
+    sample_frequency = 48_000
+    decimator = filters.make_decimator(sample_frequency, 12_000, 4000.0)
+    t = np.arange(24_000) / sample_frequency
+    tone = np.sin(2 * np.pi * 3000 * t)
+    # Folds to 3 kHz at 16 kHz unless it is filtered out first.
+    alias = np.sin(2 * np.pi * 13_000 * t)
+    settled = slice(len(decimator), None)
+    assert np.std(decimator(tone)[settled]) == pytest.approx(np.sqrt(0.5), rel=1e-3)
+    decimator.reset()
+    assert np.std(decimator(alias)[settled]) < 1e-4
+
+
+@pytest.mark.parametrize(
+    ("sample_frequency", "num_samples", "factor"),
+    [(48_000, 12_000, 3), (192_000, 48_000, 12), (48_000, 12_001, None)],
+)
+def test_make_decimator_divides_the_record(sample_frequency, num_samples, factor):
+    decimator = filters.make_decimator(sample_frequency, num_samples, 4000.0)
+    assert (decimator and decimator.factor) == factor
+
+
+def test_make_decimator_needs_oversampling_above_2():
+    with pytest.raises(ValueError):
+        filters.make_decimator(48_000, 12_000, 4000.0, oversampling=2)
+    decimator = filters.make_decimator(48_000, 12_000, 4000.0, oversampling=2.5)
+    assert decimator.factor == 4
+
+
+# A telephone-band spec, at a rate where every method is quick to design.
+SPEC = filters.FilterSpec((300.0, 3000.0), (200.0, 4000.0), 0.5, 60.0)
+SAMPLE_FREQUENCY = 16_000
+
+
+def _gain_dB(design, frequencies):
+    if design.method == "iir":
+        (_, h) = scipy.signal.sosfreqz(
+            design.coefficients, worN=frequencies, fs=SAMPLE_FREQUENCY
+        )
+    else:
+        (_, h) = scipy.signal.freqz(
+            design.coefficients, worN=frequencies, fs=SAMPLE_FREQUENCY
+        )
+    return 20 * np.log10(np.abs(h))
+
+
+@pytest.mark.parametrize("linear_phase", [False, True])
+def test_design_meets_the_spec(linear_phase):
+    design = filters.design_filter(SAMPLE_FREQUENCY, SPEC, linear_phase)
+    if linear_phase:
+        assert design.method in ("kaiser", "remez")
+    passband = _gain_dB(design, np.linspace(300.0, 3000.0, 2000))
+    stopband = _gain_dB(
+        design, np.r_[np.linspace(1.0, 200.0, 500), np.linspace(4000.0, 7999.0, 2000)]
+    )
+    assert np.ptp(passband) <= SPEC.ripple_dB + 1e-3
+    assert np.max(stopband) <= np.max(passband) - SPEC.attenuation_dB + 1e-3
+    # About the passband, give or take ripple and transitions.
+    assert 2500.0 < design.enbw < 3800.0
+
+
+def test_design_picks_the_cheapest():
+    fir = filters.design_filter(SAMPLE_FREQUENCY, SPEC, linear_phase=True)
+    best = filters.design_filter(SAMPLE_FREQUENCY, SPEC)
+    assert best.cost <= fir.cost
+    assert fir.method == "remez"  # equiripple is shorter than Kaiser's
+    assert fir.cost < 583
+
+
+@pytest.mark.parametrize("estimate", [11, 1001, 3001])
+def test_fir_length_is_bisected(estimate):
+    lengths = []
+
+    def design(numtaps):
+        lengths.append(numtaps)
+        return np.ones(numtaps) if numtaps >= 1001 else None
+
+    assert len(filters._shortest(design, estimate)) == 1001
+    assert len(lengths) <= 2 * np.log2(filters.MAX_NUMTAPS)
+    assert all(n % 2 for n in lengths)
+    assert filters._shortest(lambda _: None, estimate) is None
+
+
+def test_an_exact_elliptic_design_is_not_thrown_out():
+    # Its passband peaks at unity gain between grid points, so the peak
+    # sampled is a hair below 0 dB and its stopband a hair too close to it.
+    spec = filters.FilterSpec((None, 3000.0), (None, 3500.0), 0.5, 60.0)
+    design = filters.design_filter(48_000, spec)
+    assert design.method == "iir"
+    assert design.cost <= 20
+
+
+def test_designs_are_memoized():
+    first = filters.design_filter(SAMPLE_FREQUENCY, SPEC)
+    assert filters.design_filter(float(SAMPLE_FREQUENCY), SPEC, False) is first
+    assert not first.coefficients.flags.writeable
+
+
+def test_design_rejects_a_malformed_spec():
+    with pytest.raises(ValueError):
+        filters.design_filter(
+            SAMPLE_FREQUENCY,
+            filters.FilterSpec((300.0, 3000.0), (400.0, 4000.0), 1, 40),
+        )
+
+
+def test_sos_filter_carries_state():
+    design = filters.design_filter(SAMPLE_FREQUENCY, SPEC)
+    assert design.method == "iir"
+    audio_filter = filters.make_audio_filter(SAMPLE_FREQUENCY, 300.0, 3000.0, spec=SPEC)
+    samples = np.random.default_rng(4).standard_normal(10_000)
+    got = np.concatenate([audio_filter(piece) for piece in _split(samples, [3, 9997])])
+    expected = scipy.signal.sosfilt(np.array(design.coefficients), samples)
+    assert got == pytest.approx(expected, abs=1e-12)
+
+
+def test_audio_filter_spec_must_match_the_cutoffs():
+    with pytest.raises(ValueError):
+        filters.make_audio_filter(SAMPLE_FREQUENCY, 200.0, 3000.0, spec=SPEC)
+
+
+def test_filter_spec_from_the_command_line():
+    spec = filters.band_spec(300.0, 3000.0, filters.parse_filter_spec("200,4000,.5,60"))
+    assert spec == SPEC
+    lowpass = filters.band_spec(None, 3000.0, filters.parse_filter_spec(",4000,1,40"))
+    assert lowpass.stopband == (None, 4000.0)
+    for text in ("200,4000,0.5", "200,,0.5,60", "200,4000,0,60"):
+        with pytest.raises(ValueError):
+            filters.band_spec(300.0, 3000.0, filters.parse_filter_spec(text))
+
+
+@pytest.mark.parametrize("band_limit", filters.BAND_LIMITS)
+def test_band_limit_designs_to_a_spec(band_limit):
+    (audio_filter, spectral) = filters.make_band_limit(
+        SAMPLE_FREQUENCY, 300.0, 3000.0, band_limit, spec=SPEC
+    )
+    if band_limit == "time":
+        design = filters.design_filter(SAMPLE_FREQUENCY, SPEC)
+        np.testing.assert_array_equal(audio_filter.sos, design.coefficients)
+    elif band_limit == "response":
+        design = filters.design_filter(SAMPLE_FREQUENCY, SPEC, linear_phase=True)
+        assert spectral["response"] == tuple(design.coefficients)
+    else:
+        assert spectral == {"band": (300.0, 3000.0)}
+
+
+@pytest.mark.parametrize(
+    "make",
+    [
+        lambda: filters.make_audio_filter(48_000, 200.0, 4000.0),
+        lambda: filters.make_audio_filter(48_000, 200.0, 4000.0, 401),
+        lambda: filters.make_decimator(48_000, 12_000, 4000.0),
+        lambda: filters.make_filter(SAMPLE_FREQUENCY, SPEC),
+    ],
+)
+def test_float32_stays_float32(make):
+    samples = np.random.default_rng(5).standard_normal(12_000)
+    (double, single) = (make(), make())
+    expected = np.concatenate(
+        [double(piece) for piece in _split(samples, [5000, 7000])]
+    )
+    got = np.concatenate(
+        [single(piece) for piece in _split(samples.astype(np.float32), [5000, 7000])]
+    )
+    assert got.dtype == np.float32
+    assert got == pytest.approx(expected, abs=1e-4)
+
+
+@pytest.mark.parametrize(
+    "make",
+    [
+        lambda: filters.make_audio_filter(48_000, 200.0, 4000.0),
+        lambda: filters.make_audio_filter(48_000, 200.0, 4000.0, 401),
+        lambda: filters.make_decimator(48_000, 12_000, 4000.0),
+        lambda: filters.make_filter(SAMPLE_FREQUENCY, SPEC),
+    ],
+)
+def test_channels_each_carry_their_own_state(make):
+    samples = np.random.default_rng(6).standard_normal((3, 12_000))
+    block_filter = make()
+    got = np.concatenate(
+        [block_filter(samples[:, :5000]), block_filter(samples[:, 5000:])], axis=-1
+    )
+    for channel, row in enumerate(samples):
+        np.testing.assert_allclose(got[channel], make()(row), atol=1e-12)
+    # State for three channels is no state for one.
+    with pytest.raises(ValueError):
+        block_filter(samples[0])
+    block_filter.reset()
+    block_filter(samples[0])
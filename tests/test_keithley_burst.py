@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+import pytest
+
+import keithley_burst
+
+
+class _FakeKeithley:
+    """
+    Answers the SCPI a burst uses, as a 2015 would.
+
+    The buffer fills only once release() is called, so a test can hold
+    the burst open while it checks what happens meanwhile.
+    """
+
+    def __init__(self, readings, frequency_Hz=1000.0, hold=False):
+        self.commands = []
+        self._readings = readings
+        self._frequency_Hz = frequency_Hz
+        self._released = threading.Event()
+        if not hold:
+            self._released.set()
+        self._points = None
+        self._count = None
+        self._running = False
+
+    def release(self):
+        self._released.set()
+
+    def write(self, command):
+        self.commands.append(command)
+        (header, _, argument) = command.partition(" ")
+        if header == ":TRAC:POIN":
+            self._points = int(argument)
+        elif header == ":SAMP:COUN":
+            self._count = int(argument)
+        elif header == ":INIT":
+            assert self._points == self._count
+            self._running = True
+
+    def query(self, command):
+        self.commands.append(command)
+        if command == ":STAT:MEAS:COND?":
+            full = self._running and self._released.is_set()
+            return str(keithley_burst.BUFFER_FULL if full else 0)
+        if command == ":TRAC:DATA?":
+            assert self._running
+            self._running = False
+            return ",".join(f"{x:+.6E}" for x in self._readings[: self._count])
+        if command == ":SENS:DIST:FREQ?":
+            return f"{self._frequency_Hz:+.6E}"
+        raise AssertionError(f"unexpected query {command}")
+
+
+def test_burst_fetches_readings_in_one_transfer():
+    readings = [12.0 + 0.1 * i for i in range(20)]
+    meter = _FakeKeithley(readings, frequency_Hz=1000.5)
+    with keithley_burst.KeithleyBurst(meter, poll_interval=1e-3) as burst:
+        (got, frequency_Hz) = burst.start(20).result(timeout=5)
+    np.testing.assert_allclose(got, readings)
+    assert frequency_Hz == pytest.approx(1000.5)
+    assert ":READ?" not in meter.commands
+    assert meter.commands.count(":TRAC:DATA?") == 1
+
+
+def test_burst_runs_while_the_caller_carries_on():
+    meter = _FakeKeithley([12.0] * 8, hold=True)
+    with keithley_burst.KeithleyBurst(meter, poll_interval=1e-3) as burst:
+        future = burst.start(8)
+        # Still waiting on the meter, and the caller was not held up.
+        assert not future.done()
+        meter.release()
+        (got, _) = future.result(timeout=5)
+    assert len(got) == 8
+
+
+def test_overflow_readings_are_nan():
+    meter = _FakeKeithley([12.0, 9.9e37, 13.0], frequency_Hz=9.9e37)
+    with keithley_burst.KeithleyBurst(meter, poll_interval=1e-3) as burst:
+        (got, frequency_Hz) = burst.start(3).result(timeout=5)
+    assert got[0] == 12.0 and np.isnan(got[1]) and got[2] == 13.0
+    assert np.isnan(frequency_Hz)
+
+
+def test_burst_size_is_bounded_by_the_buffer():
+    with keithley_burst.KeithleyBurst(_FakeKeithley([])) as burst:
+        with pytest.raises(ValueError):
+            burst.start(keithley_burst.MAX_READINGS + 1)
+        with pytest.raises(ValueError):
+            burst.start(0)
+
+
+def test_a_stalled_burst_times_out():
+    meter = _FakeKeithley([12.0] * 8, hold=True)
+    with keithley_burst.KeithleyBurst(
+        meter, poll_interval=1e-3, reading_time=1e-3, timeout_margin=0.05
+    ) as burst:
+        assert burst.timeout(8) == pytest.approx(0.058)
+        with pytest.raises(TimeoutError):
+            burst.start(8).result(timeout=5)
+    assert ":ABOR" in meter.commands
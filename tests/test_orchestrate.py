@@ -0,0 +1,249 @@
+import json
+import os
+import re
+
+import pandas as pd
+import pytest
+
+import auto_sinad
+import orchestrate
+import source
+import source_synthetic
+
+# The stand-in receiver's SINAD, in dB above the generator's power.  The
+# audio filter takes out the noise outside its band, which reads about 6
+# dB better, so that the receiver crosses 12 dB at about -118 dBm.
+RECEIVER_GAIN_dB = 124.0
+
+# The stand-in bench's RF, shared by its generator and receiver, which
+# both live in the station's process.
+_bench = {"power_dBm": -200.0}
+
+
+class _StandInGenerator:
+    """A signal generator that sets the bench's power, and may fail."""
+
+    def __init__(self, fail_above_dBm=None):
+        self._fail_above_dBm = fail_above_dBm
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        pass
+
+    def set_power(self, power_dBm):
+        if self._fail_above_dBm is not None and power_dBm > self._fail_above_dBm:
+            raise OSError("VISA timeout")
+        _bench["power_dBm"] = power_dBm
+
+    def set_output(self, _on):
+        pass
+
+
+def _dead_generator(_resource_manager, _resource_name):
+    os._exit(3)
+
+
+class _StandInReceiver(source.Source):
+    """A synthetic tone whose SINAD follows the bench's power."""
+
+    name = "standin-receiver"
+    pretty_name = "Stand-in Receiver"
+    continuous = True
+    default_sample_frequency = staticmethod(
+        source_synthetic.SyntheticSource.default_sample_frequency
+    )
+    default_record_length = staticmethod(
+        source_synthetic.SyntheticSource.default_record_length
+    )
+    augment_argparse = staticmethod(source_synthetic.SyntheticSource.augment_argparse)
+
+    def __init__(self, args):
+        self._args = args
+        self._power_dBm = None
+        self._tone = None
+
+    def read(self):
+        if _bench["power_dBm"] != self._power_dBm:
+            self._power_dBm = _bench["power_dBm"]
+            self._args.sinad = [max(self._power_dBm + RECEIVER_GAIN_dB, 0.5)]
+            self._tone = source_synthetic.SyntheticSource(self._args)
+        return self._tone.read()
+
+    def sample_range(self):
+        return self._tone.sample_range()
+
+    def sample_unit(self):
+        return "AU"
+
+
+def _stand_in_station(station, output_path, settings, progress):
+    # The real worker, on the stand-in bench, set up in the station's
+    # own process.
+    source.SOURCE_REGISTRY.register(_StandInReceiver)
+    auto_sinad.SIGGENS.update(
+        {
+            "standin": (lambda _rm, _name: _StandInGenerator(), None),
+            "faulty": (lambda _rm, _name: _StandInGenerator(-110.0), None),
+            "dead": (_dead_generator, None),
+        }
+    )
+    return orchestrate.sweep_station(station, output_path, settings, progress)
+
+
+def _write_manifest(path, stations, **settings):
+    path.write_text(json.dumps({"sweep": settings, "stations": stations}))
+    return path
+
+
+def test_load_manifest(tmp_path):
+    path = _write_manifest(
+        tmp_path / "benches.json",
+        [
+            {"dut": "a", "siggen": "hp8663a", "source": "portaudio"},
+            {
+                "dut": "b",
+                "siggen": "rssmb100a",
+                "siggen_resource": "TCPIP::b::INSTR",
+                "source": "synthetic",
+                "source_args": ["--sinad", "20"],
+                "sweep": {"num_points": 5},
+            },
+        ],
+        start_dBm=-120.0,
+    )
+    (stations, settings) = orchestrate.load_manifest(path)
+    assert settings == {"start_dBm": -120.0}
+    assert stations == [
+        orchestrate.Station("a", "hp8663a", "portaudio", None, [], None, {}),
+        orchestrate.Station(
+            "b",
+            "rssmb100a",
+            "synthetic",
+            "TCPIP::b::INSTR",
+            ["--sinad", "20"],
+            None,
+            {"num_points": 5},
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    ("stations", "settings", "message"),
+    [
+        ([], {}, "no stations"),
+        ([{"dut": "a", "siggen": "hp8663a"}], {}, "missing 1 required"),
+        ([{"dut": "", "siggen": "hp8663a", "source": "x"}], {}, "needs a dut"),
+        (
+            [{"dut": "a", "siggen": "hp8663a", "source": "x", "colour": "red"}],
+            {},
+            "colour",
+        ),
+        ([{"dut": "../a", "siggen": "hp8663a", "source": "x"}], {}, "not a file"),
+        (
+            [
+                {"dut": "a", "siggen": "hp8663a", "source": "x"},
+                {"dut": "a", "siggen": "rssmb100a", "source": "x"},
+            ],
+            {},
+            "more than once: a",
+        ),
+        (
+            [
+                {"dut": "a", "siggen": "hp8663a", "source": "x"},
+                {"dut": "b", "siggen": "hp8663a", "source": "x"},
+            ],
+            {},
+            "share a signal generator: hp8663a (default)",
+        ),
+        (
+            [{"dut": "a", "siggen": "hp8663a", "source": "x"}],
+            {"resume": True},
+            "unknown sweep settings: resume",
+        ),
+        (
+            [
+                {
+                    "dut": "a",
+                    "siggen": "hp8663a",
+                    "source": "x",
+                    "sweep": {"max_readings": 5},
+                }
+            ],
+            {"min_readings": 10},
+            "a: need 1 <= min_readings <= max_readings",
+        ),
+    ],
+)
+def test_load_manifest_refuses(tmp_path, stations, settings, message):
+    path = _write_manifest(tmp_path / "benches.json", stations, **settings)
+    with pytest.raises(ValueError, match=re.escape(message)):
+        orchestrate.load_manifest(path)
+
+
+def test_a_failing_station_fails_alone(tmp_path):
+    receiver = ("standin-receiver", ["-s", "16000", "-r", "0.1"])
+    stations = [
+        orchestrate.Station("good", "standin", *receiver),
+        orchestrate.Station("faulty", "faulty", *receiver),
+        orchestrate.Station("dead", "dead", *receiver),
+        orchestrate.Station("short", "standin", *receiver, sweep={"num_points": 3}),
+    ]
+    events = []
+    results = orchestrate.orchestrate(
+        stations,
+        tmp_path,
+        {
+            "start_dBm": -125.0,
+            "stop_dBm": -105.0,
+            "num_points": 5,
+            "min_readings": 4,
+            "max_readings": 16,
+        },
+        worker=_stand_in_station,
+        on_event=lambda *event: events.append(event),
+    )
+
+    assert list(results) == ["good", "faulty", "dead", "short"]
+    assert [r.status for r in results.values()] == ["done", "failed", "failed", "done"]
+    (crossing,) = results["good"].sensitivities_dBm
+    assert crossing == pytest.approx(-118.0, abs=2.0)
+    good = pd.read_csv(tmp_path / "good.csv")
+    assert list(good.power_dBm) == [-125.0, -120.0, -115.0, -110.0, -105.0]
+    assert list(good.sinad_n) == [16] * 5
+    # A station's own settings override the shared ones.
+    assert len(pd.read_csv(tmp_path / "short.csv")) == 3
+
+    # The faulty generator stopped its station above -110 dBm; what it
+    # measured is kept, and why it stopped is in its log.
+    assert "OSError: VISA timeout" in results["faulty"].error
+    assert len(pd.read_csv(tmp_path / "faulty.csv")) == 4
+    assert "Traceback" in (tmp_path / "faulty.log").read_text()
+    assert results["dead"].error == "exited with code 3"
+    assert f"wrote {tmp_path / 'good.csv'}" in (tmp_path / "good.log").read_text()
+
+    rows = [
+        payload for (dut, kind, payload) in events if dut == "good" and kind == "row"
+    ]
+    assert [row["power_dBm"] for row in rows] == list(good.power_dBm)
+    assert ("good", "done", [crossing]) in events
+    assert ("dead", "failed", "exited with code 3") in events
+
+
+def test_write_summary(tmp_path):
+    results = {
+        "a": orchestrate.StationResult("a", "done", [-118.0], None),
+        "b": orchestrate.StationResult("b", "failed", [], "OSError: no"),
+    }
+    orchestrate.write_summary(results, tmp_path / "summary.json")
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    assert summary == [
+        {"dut": "a", "status": "done", "sensitivities_dBm": [-118.0], "error": None},
+        {
+            "dut": "b",
+            "status": "failed",
+            "sensitivities_dBm": [],
+            "error": "OSError: no",
+        },
+    ]
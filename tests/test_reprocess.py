@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import capture
+import filters
+import reprocess
+import sinad
+
+SAMPLE_FREQUENCY = 16_000
+NUM_SAMPLES = 1600
+
+
+def _record(rng, noise):
+    t = np.arange(NUM_SAMPLES) / SAMPLE_FREQUENCY
+    return np.sin(2 * np.pi * 1000 * t) + noise * rng.standard_normal(NUM_SAMPLES)
+
+
+@pytest.fixture
+def sweep_capture(tmp_path):
+    """Four records at each of three levels, each record its own capture."""
+    rng = np.random.default_rng(0)
+    records = {}
+    path = tmp_path / "capture"
+    with capture.CaptureWriter(path, NUM_SAMPLES, SAMPLE_FREQUENCY, "test") as w:
+        for power_dBm, noise in ((-120.0, 1.0), (-110.0, 0.3), (-100.0, 0.1)):
+            records[power_dBm] = [_record(rng, noise) for _ in range(4)]
+            for record in records[power_dBm]:
+                w.write(record, power_dBm, gap=True)
+    return (path, records)
+
+
+def test_levels_splits_by_power(sweep_capture):
+    (path, _) = sweep_capture
+    assert reprocess.levels(capture.Capture(path)) == [
+        (-120.0, 0, 4),
+        (-110.0, 4, 8),
+        (-100.0, 8, 12),
+    ]
+
+
+def test_config_name():
+    assert (
+        reprocess.config_name(reprocess.Config(200.0, 4000.0, 101, ("kaiser", 38)))
+        == "200-4000Hz_101taps_kaiser38"
+    )
+    assert (
+        reprocess.config_name(reprocess.Config(None, 3000.0, 51, "hann"))
+        == "-3000Hz_51taps_hann"
+    )
+    assert (
+        reprocess.config_name(reprocess.Config(None, None, 101, "hann"))
+        == "nofilter_101taps_hann"
+    )
+
+
+def test_one_csv_per_configuration(sweep_capture, tmp_path):
+    (path, records) = sweep_capture
+    configs = [
+        reprocess.Config(200.0, 4000.0, 101, sinad.DEFAULT_WINDOW),
+        reprocess.Config(300.0, 3000.0, 101, "hann"),
+    ]
+    written = reprocess.reprocess([path], configs, tmp_path / "out", jobs=2)
+    assert [p.name for p in written] == [
+        "200-4000Hz_101taps_kaiser38.csv",
+        "300-3000Hz_101taps_hann.csv",
+    ]
+    for config, csv_path in zip(configs, written, strict=True):
+        df = pd.read_csv(csv_path)
+        assert list(df["power_dBm"]) == [-120.0, -110.0, -100.0]
+        assert list(df["sinad_n"]) == [4, 4, 4]
+        audio_filter = filters.make_audio_filter(
+            SAMPLE_FREQUENCY, config.hpf_cutoff, config.lpf_cutoff
+        )
+        for power_dBm, row in zip(df["power_dBm"], df.itertuples(), strict=True):
+            expected = []
+            for record in records[power_dBm]:
+                audio_filter.reset()
+                expected.append(
+                    sinad.measure(
+                        audio_filter(record), SAMPLE_FREQUENCY, config.window
+                    )[0]
+                )
+            assert row.sinad_mean_dB == pytest.approx(np.mean(expected), abs=1e-9)
+            assert row.sinad_std_dB == pytest.approx(np.std(expected), abs=1e-9)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ring_buffer import RingBuffer
+
+
+def test_reads_come_out_in_order_across_the_wrap():
+    ring = RingBuffer(10)
+    stream = np.arange(100, dtype=float)
+    got = []
+    for start in range(0, 100, 7):
+        ring.write(stream[start : start + 7])
+        while ring.available >= 3:
+            got.append(ring.read(3))
+    got.append(ring.read(ring.available))
+    np.testing.assert_array_equal(np.concatenate(got), stream)
+
+
+def test_overflow_drops_the_oldest_and_says_how_many():
+    ring = RingBuffer(10)
+    assert ring.write(np.arange(8.0)) == 0
+    assert ring.write(np.arange(8.0, 13.0)) == 3
+    np.testing.assert_array_equal(ring.read(10), np.arange(3.0, 13.0))
+
+
+def test_a_write_larger_than_the_ring_keeps_its_newest():
+    ring = RingBuffer(4)
+    assert ring.write(np.arange(10.0)) == 6
+    np.testing.assert_array_equal(ring.read(4), [6.0, 7.0, 8.0, 9.0])
+
+
+def test_read_newest_drops_the_rest():
+    ring = RingBuffer(10)
+    ring.write(np.arange(9.0))
+    out = np.empty(4)
+    assert ring.read_newest(4, out=out) is out
+    np.testing.assert_array_equal(out, [5.0, 6.0, 7.0, 8.0])
+    assert ring.available == 0
+
+
+def test_discard():
+    ring = RingBuffer(10)
+    ring.write(np.arange(6.0))
+    assert ring.discard(4) == 4
+    np.testing.assert_array_equal(ring.read(2), [4.0, 5.0])
+    ring.write(np.arange(3.0))
+    assert ring.discard() == 3
+    assert ring.available == 0
+
+
+def test_cannot_read_more_than_is_there():
+    ring = RingBuffer(10)
+    ring.write(np.arange(3.0))
+    with pytest.raises(ValueError):
+        ring.read(4)
+
+
+def test_channels_are_frames():
+    ring = RingBuffer(10, channels=2)
+    frames = np.arange(30, dtype=float).reshape(15, 2)
+    assert ring.write(frames[:8]) == 0
+    np.testing.assert_array_equal(ring.read(3), frames[:3])
+    assert ring.write(frames[8:]) == 2
+    np.testing.assert_array_equal(ring.read(ring.available), frames[5:])
@@ -9,6 +9,7 @@ import numpy as np
 import pytest
 import scipy.io
 
+import filters
 import sinad
 from vendored import pysnr
 
@@ -100,3 +101,214 @@ def test_never_negative_without_a_tone():
     assert got_dB >= 0.0
     assert got_dB < 1.0
     assert adc_dB < -10.0
+
+
+def test_batch_matches_measure():
+    """
+    A stack of records reads the same as measuring them one by one.
+
+    The rows span tone levels from well above to well below the noise,
+    with DC offsets, and include one with no tone at all.
+    """
+    sample_frequency = 48_000
+    n = 12_000
+    t = np.arange(n) / sample_frequency
+    rng = np.random.default_rng(2)
+    records = np.array(
+        [
+            10 ** rng.uniform(-3, 0) * np.sin(2 * np.pi * 1000 * t + rng.uniform(0, 6))
+            + 0.05 * rng.standard_normal(n)
+            + rng.uniform(-0.1, 0.1)
+            for _ in range(32)
+        ]
+        + [rng.standard_normal(n)]
+    )
+    (got_dB, got_noise_dB) = sinad.measure_batch(records, sample_frequency)
+    expected = [sinad.measure(record, sample_frequency) for record in records]
+    assert got_dB == pytest.approx([e[0] for e in expected], abs=1e-9)
+    assert got_noise_dB == pytest.approx([e[1] for e in expected], abs=1e-9)
+
+
+@pytest.mark.parametrize("name", MATLAB_SINAD_DB)
+def test_batch_of_one_matches_measure(name):
+    (signal, sample_frequency) = _load(name)
+    (got_dB, got_noise_dB) = sinad.measure_batch(signal[None, :], sample_frequency)
+    (expected_dB, expected_noise_dB) = sinad.measure(signal, sample_frequency)
+    assert got_dB[0] == pytest.approx(expected_dB, abs=1e-9)
+    assert got_noise_dB[0] == pytest.approx(expected_noise_dB, abs=1e-9)
+
+
+def test_batch_rejects_a_single_record():
+    with pytest.raises(ValueError):
+        sinad.measure_batch(np.zeros(1000), 48_000)
+
+
+def test_plan_is_shared_per_length_and_rate():
+    assert sinad.get_plan(4800, 48_000.0) is sinad.get_plan(4800, 48_000.0)
+    assert sinad.get_plan(4800, 48_000.0) is not sinad.get_plan(4801, 48_000.0)
+
+
+def test_plan_scratch_does_not_carry_between_records():
+    """Reusing the scratch arrays must not leak one record into the next."""
+    sample_frequency = 48_000
+    rng = np.random.default_rng(3)
+    t = np.arange(4800) / sample_frequency
+    quiet = np.sin(2 * np.pi * 1000 * t) + 0.3 * rng.standard_normal(len(t))
+    loud = np.sin(2 * np.pi * 1000 * t) + 0.001 * rng.standard_normal(len(t))
+    first = sinad.measure(quiet, sample_frequency)
+    sinad.measure(loud, sample_frequency)
+    sinad.measure_batch(np.vstack((loud, quiet, loud)), sample_frequency)
+    assert sinad.measure(quiet, sample_frequency) == first
+
+
+def test_plan_rejects_other_lengths():
+    with pytest.raises(ValueError):
+        sinad.get_plan(4800, 48_000.0).measure(np.zeros(4799))
+
+
+def test_brickwall_measures_noise_in_the_band():
+    """White noise in a band is the total scaled by the band's share."""
+    sample_frequency = 48_000
+    samples = _tone_in_noise(12.0, 12_000, sample_frequency)
+    plan = sinad.get_plan(12_000, sample_frequency, band=(200.0, 4000.0))
+    assert plan.noise_bandwidth == pytest.approx(3800.0, abs=2 * 4.0)
+    noise_power = 0.5 / 10**1.2 * plan.noise_bandwidth / (sample_frequency / 2)
+    expected_dB = _to_radio_sinad(10 * np.log10(0.5 / noise_power))
+    (got_dB, _) = sinad.measure(samples, sample_frequency, band=(200.0, 4000.0))
+    assert got_dB == pytest.approx(expected_dB, abs=0.3)
+
+
+def test_brickwall_rejects_what_is_outside_the_band():
+    sample_frequency = 48_000
+    samples = _tone_in_noise(30.0, 12_000, sample_frequency)
+    t = np.arange(len(samples)) / sample_frequency
+    spurred = samples + 0.3 * np.sin(2 * np.pi * 8000 * t)
+    band = (200.0, 4000.0)
+    assert sinad.measure(spurred, sample_frequency)[0] < 20
+    assert sinad.measure(spurred, sample_frequency, band=band)[0] == pytest.approx(
+        sinad.measure(samples, sample_frequency, band=band)[0], abs=0.1
+    )
+
+
+def test_response_mask_matches_filtering_the_samples():
+    sample_frequency = 48_000
+    audio_filter = filters.make_audio_filter(sample_frequency, 200.0, 4000.0)
+    samples = _tone_in_noise(12.0, 13_000, sample_frequency)
+    t = np.arange(len(samples)) / sample_frequency
+    samples += 0.3 * np.sin(2 * np.pi * 60 * t)
+    # The first 1000 samples fill the filter's delay line.
+    filtered = audio_filter(samples)[1000:]
+    (expected_dB, _) = sinad.measure(filtered, sample_frequency)
+    (got_dB, _) = sinad.measure(
+        samples[1000:], sample_frequency, response=audio_filter.taps
+    )
+    assert got_dB == pytest.approx(expected_dB, abs=0.1)
+
+
+@pytest.mark.parametrize("noise_power_ratio_dB", [0.0, 12.0, 40.0, 60.0])
+def test_float32_matches_float64(noise_power_ratio_dB):
+    sample_frequency = 48_000
+    records = np.array(
+        [
+            _tone_in_noise(noise_power_ratio_dB, 12_000, sample_frequency, seed)
+            for seed in range(4)
+        ]
+    )
+    (expected_dB, expected_noise_dB) = sinad.measure_batch(records, sample_frequency)
+    single = records.astype(np.float32)
+    (got_dB, got_noise_dB) = sinad.measure_batch(single, sample_frequency)
+    assert got_dB == pytest.approx(expected_dB, abs=1e-3)
+    assert got_noise_dB == pytest.approx(expected_noise_dB, abs=1e-3)
+    assert sinad.measure(single[0], sample_frequency)[0] == pytest.approx(
+        got_dB[0], abs=1e-5
+    )
+
+
+def test_plan_works_in_the_records_precision():
+    plan = sinad.get_plan(4800, 48_000.0, dtype=np.dtype(np.float32))
+    assert plan.dtype == np.float32
+    assert sinad.get_plan(4800, 48_000.0).dtype == np.float64
+
+
+def _tone_in_noise(
+    noise_power_ratio_dB, n, sample_frequency, seed=0, tone_frequency=1000.0
+):
+    t = np.arange(n) / sample_frequency
+    tone = np.sin(2 * np.pi * tone_frequency * t + 0.3)
+    noise = np.random.default_rng(seed).standard_normal(n)
+    noise *= np.sqrt(0.5 / 10 ** (noise_power_ratio_dB / 10)) / noise.std()
+    return tone + noise
+
+
+@pytest.mark.parametrize(
+    ("noise_power_ratio_dB", "expected_dB"),
+    [(0.0, 3.01), (6.0, 6.97), (12.0, 12.27), (20.0, 20.04)],
+)
+def test_streaming_known_signal_to_noise(noise_power_ratio_dB, expected_dB):
+    sample_frequency = 48_000
+    samples = _tone_in_noise(
+        noise_power_ratio_dB, 2 * sample_frequency, sample_frequency
+    )
+    # A DC offset is not part of the signal, for either engine.
+    samples += 0.2
+    engine = sinad.StreamingSinad(sample_frequency, 12_000, 3_000)
+    (got_dB, _) = engine.update(samples)
+    assert len(got_dB) == 1 + (len(samples) - 12_000) // 3_000
+    assert np.mean(got_dB) == pytest.approx(expected_dB, abs=0.25)
+
+
+@pytest.mark.parametrize("offset_Hz", [0.5, 1.0, 2.0])
+def test_streaming_tone_off_nominal(offset_Hz):
+    # A rectangular window leaked a tone 0.5 Hz off into the noise,
+    # reading 13 dB here.
+    sample_frequency = 48_000
+    samples = _tone_in_noise(
+        37.0, 2 * sample_frequency, sample_frequency, tone_frequency=1000 + offset_Hz
+    )
+    engine = sinad.StreamingSinad(sample_frequency, 12_000, 3_000)
+    (got_dB, _) = engine.update(samples)
+    expected_dB = np.mean(
+        [
+            sinad.measure(samples[i : i + 12_000], sample_frequency)[0]
+            for i in range(0, len(samples), 12_000)
+        ]
+    )
+    assert np.mean(got_dB) == pytest.approx(expected_dB, abs=0.25)
+
+
+def test_streaming_does_not_depend_on_block_size():
+    sample_frequency = 16_000
+    samples = _tone_in_noise(12.0, 5 * sample_frequency, sample_frequency)
+    whole = sinad.StreamingSinad(sample_frequency, 3200, 800)
+    (expected_dB, expected_noise_dB) = whole.update(samples)
+    blocks = sinad.StreamingSinad(sample_frequency, 3200, 800)
+    readings = [
+        blocks.update(samples[i : i + 357]) for i in range(0, len(samples), 357)
+    ]
+    assert np.concatenate([r[0] for r in readings]) == pytest.approx(expected_dB)
+    assert np.concatenate([r[1] for r in readings]) == pytest.approx(expected_noise_dB)
+
+
+def test_streaming_reset_starts_a_new_window():
+    sample_frequency = 16_000
+    engine = sinad.StreamingSinad(sample_frequency, 3200, 800)
+    samples = _tone_in_noise(12.0, 3200, sample_frequency)
+    (first_dB, _) = engine.update(samples)
+    engine.reset()
+    (again_dB, _) = engine.update(samples)
+    assert len(first_dB) == 1
+    assert again_dB == pytest.approx(first_dB)
+
+
+def test_batch_takes_channels_as_leading_axes():
+    sample_frequency = 48_000
+    records = np.array(
+        [
+            [_tone_in_noise(level, 4800, sample_frequency, seed) for level in (6, 20)]
+            for seed in range(3)
+        ]
+    )
+    (sinad_dB, noise_dB) = sinad.measure_batch(records, sample_frequency)
+    assert sinad_dB.shape == noise_dB.shape == (3, 2)
+    (flat_dB, _) = sinad.measure_batch(records.reshape(6, -1), sample_frequency)
+    np.testing.assert_array_equal(sinad_dB.reshape(-1), flat_dB)
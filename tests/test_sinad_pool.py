@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import filters
+import sinad
+import sinad_pool
+
+SAMPLE_FREQUENCY = 16_000
+NUM_SAMPLES = 3200
+
+
+def _records(count, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(NUM_SAMPLES) / SAMPLE_FREQUENCY
+    return np.array(
+        [
+            np.sin(2 * np.pi * 1000 * t)
+            + 10 ** rng.uniform(-3, 0) * rng.standard_normal(len(t))
+            for _ in range(count)
+        ]
+    )
+
+
+@pytest.fixture(scope="module")
+def pool():
+    audio_filter = filters.make_audio_filter(SAMPLE_FREQUENCY, 200, 4000)
+    with sinad_pool.SinadPool(2, 16, NUM_SAMPLES, SAMPLE_FREQUENCY, audio_filter) as p:
+        yield p
+
+
+def test_pool_matches_measuring_in_process(pool):
+    records = _records(16)
+    pool.records[:] = records
+    for start in range(0, 16, 5):
+        pool.submit(start, min(start + 5, 16), apply_filter=False)
+    (got_dB, got_noise_dB) = pool.gather()
+    (expected_dB, expected_noise_dB) = sinad.measure_batch(records, SAMPLE_FREQUENCY)
+    np.testing.assert_array_equal(got_dB, expected_dB)
+    np.testing.assert_array_equal(got_noise_dB, expected_noise_dB)
+
+
+def test_pool_filters_each_record_afresh(pool):
+    records = _records(16, seed=1)
+    pool.records[:] = records
+    pool.submit(0, 10, apply_filter=True)
+    pool.submit(10, 16, apply_filter=True)
+    (got_dB, _) = pool.gather()
+    audio_filter = filters.make_audio_filter(SAMPLE_FREQUENCY, 200, 4000)
+    expected_dB = []
+    for record in records:
+        audio_filter.reset()
+        expected_dB.append(sinad.measure(audio_filter(record), SAMPLE_FREQUENCY)[0])
+    assert got_dB == pytest.approx(expected_dB, abs=1e-9)
+
+
+def test_gather_with_nothing_submitted(pool):
+    (got_dB, got_noise_dB) = pool.gather()
+    assert len(got_dB) == len(got_noise_dB) == 0
+
+
+def test_gather_without_blocking_keeps_order(pool):
+    records = _records(16, seed=2)
+    pool.records[:] = records
+    pool.submit(0, 8, apply_filter=False)
+    pool.submit(8, 16, apply_filter=False)
+    got = []
+    while len(got) < 16:
+        got.extend(pool.gather(block=False)[0])
+    (expected_dB, _) = sinad.measure_batch(records, SAMPLE_FREQUENCY)
+    np.testing.assert_array_equal(got, expected_dB)
+    assert len(pool.gather()[0]) == 0
+
+
+def test_pool_of_several_channels():
+    records = np.stack([_records(6, seed=3), _records(6, seed=4)], axis=1)
+    with sinad_pool.SinadPool(
+        2, 6, NUM_SAMPLES, SAMPLE_FREQUENCY, None, num_channels=2
+    ) as channels_pool:
+        channels_pool.records[:] = records
+        channels_pool.submit(0, 4, apply_filter=False)
+        channels_pool.submit(4, 6, apply_filter=False)
+        (got_dB, _) = channels_pool.gather()
+    assert got_dB.shape == (6, 2)
+    np.testing.assert_array_equal(
+        got_dB, sinad.measure_batch(records, SAMPLE_FREQUENCY)[0]
+    )
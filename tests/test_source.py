@@ -0,0 +1,119 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import source
+
+
+class _CountingSource(source.Source):
+    """Hands out records numbered 0, 1, 2, ..., optionally failing at one."""
+
+    name = "counting"
+    pretty_name = "Counting Source"
+
+    def __init__(self, continuous=True, fail_at=None, error=RuntimeError):
+        self.continuous = continuous
+        self._fail_at = fail_at
+        self._error = error
+        self._next = 0
+        self.reads = threading.Semaphore(0)
+
+    def read(self):
+        n = self._next
+        self._next += 1
+        self.reads.release()
+        if n == self._fail_at:
+            raise self._error(f"record {n}")
+        return np.full(4, float(n))
+
+
+def _wait_for_reads(inner, count):
+    for _ in range(count):
+        assert inner.reads.acquire(timeout=1.0)
+
+
+def test_prefetch_of_a_continuous_source_keeps_every_record():
+    inner = _CountingSource(continuous=True)
+    with source.PrefetchingSource(inner, depth=2) as prefetching:
+        # Let the worker fill the queue and block.
+        _wait_for_reads(inner, 3)
+        deadline = time.monotonic() + 1.0
+        while not prefetching.backpressure_waits and time.monotonic() < deadline:
+            time.sleep(1e-3)
+        got = [prefetching.read()[0] for _ in range(10)]
+    assert got == list(range(10))
+    assert prefetching.backpressure_waits > 0
+    assert prefetching.overflows == 0
+
+
+def test_prefetch_of_a_record_source_drops_the_oldest():
+    inner = _CountingSource(continuous=False)
+    with source.PrefetchingSource(inner, depth=2) as prefetching:
+        _wait_for_reads(inner, 10)
+        first = prefetching.read()[0]
+    assert first >= 7
+    assert prefetching.overflows >= 7
+    assert not prefetching.continuous
+
+
+def test_prefetch_passes_overruns_on_in_order():
+    inner = _CountingSource(fail_at=2, error=source.OverrunError)
+    with source.PrefetchingSource(inner, depth=2) as prefetching:
+        assert prefetching.read()[0] == 0
+        assert prefetching.read()[0] == 1
+        with pytest.raises(source.OverrunError):
+            prefetching.read()
+        assert prefetching.read()[0] == 3
+
+
+def test_prefetch_stops_on_other_errors():
+    inner = _CountingSource(fail_at=1)
+    with source.PrefetchingSource(inner, depth=2) as prefetching:
+        assert prefetching.read()[0] == 0
+        with pytest.raises(RuntimeError):
+            prefetching.read()
+
+
+def _read_within(prefetching, timeout=2.0):
+    # What read() raises, failing rather than hanging if it never returns.
+    raised = []
+
+    def read():
+        try:
+            prefetching.read()
+        except Exception as e:  # noqa: BLE001
+            raised.append(e)
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "read() hung"
+    return raised[0] if raised else None
+
+
+def test_prefetch_error_survives_a_flush():
+    inner = _CountingSource(fail_at=0, error=TimeoutError)
+    with source.PrefetchingSource(inner, depth=2) as prefetching:
+        _wait_for_reads(inner, 1)
+        prefetching.flush()
+        assert isinstance(_read_within(prefetching), TimeoutError)
+        # And again: the stream stays ended.
+        assert isinstance(_read_within(prefetching), TimeoutError)
+
+
+def test_prefetch_flush_drops_what_was_read_ahead():
+    inner = _CountingSource(continuous=True)
+    with source.PrefetchingSource(inner, depth=2) as prefetching:
+        _wait_for_reads(inner, 3)
+        prefetching.flush()
+        # Everything read before the flush, even the read under way, is
+        # stale; the first record after it was read after it.
+        assert prefetching.read()[0] >= 3
+
+
+def test_default_discard_reads_whole_records():
+    inner = _CountingSource()
+    assert inner.discard(5) == 8
+    assert inner.read()[0] == 2
@@ -0,0 +1,159 @@
+#
+# DigilentSource's acquisition loops against a stand-in for pydwf's
+# AnalogIn, so no device is needed.
+#
+
+import numpy as np
+import pytest
+from pydwf import DwfState
+
+import source
+import source_digilent
+
+
+class _FakeAnalogIn:
+    """
+    Delivers a scripted sequence of chunks, one per status() poll.
+
+    After the script runs out, it reports Done if done is set, and
+    otherwise keeps running with nothing new, like a stalled device.
+    """
+
+    def __init__(self, chunks, done=True, lost=None):
+        self._chunks = list(chunks)
+        self._lost = dict(lost or {})
+        self._done = done
+        self._polls = 0
+        self._current = None
+        self.running = False
+
+    def configure(self, _reconfigure, start):
+        self.running = start
+
+    def status(self, _read_data):
+        self._current = self._chunks.pop(0) if self._chunks else None
+        self._polls += 1
+        if self._current is None and self._done:
+            return DwfState.Done
+        return DwfState.Running
+
+    def statusRecord(self):
+        available = 0 if self._current is None else self._current.shape[-1]
+        return (available, self._lost.get(self._polls, 0), 0)
+
+    def statusData(self, channel, count):
+        # Chunks of several channels are a row each.
+        current = np.atleast_2d(self._current)
+        assert count == current.shape[-1]
+        return current[channel]
+
+
+def _chunks(stream, size):
+    return [stream[..., i : i + size] for i in range(0, stream.shape[-1], size)]
+
+
+def test_record_is_assembled_from_chunks():
+    stream = np.arange(100, dtype=float)
+    analog_in = _FakeAnalogIn(_chunks(stream, 7))
+    got = source_digilent._acquire_record(analog_in, 100, timeout=1.0, poll_interval=0)
+    np.testing.assert_array_equal(got, stream)
+
+
+def test_record_keeps_the_newest_samples():
+    stream = np.arange(130, dtype=float)
+    analog_in = _FakeAnalogIn(_chunks(stream, 40))
+    got = source_digilent._acquire_record(analog_in, 100, timeout=1.0, poll_interval=0)
+    np.testing.assert_array_equal(got, stream[-100:])
+
+
+def test_stalled_record_times_out():
+    analog_in = _FakeAnalogIn([np.zeros(10)], done=False)
+    with pytest.raises(TimeoutError):
+        source_digilent._acquire_record(analog_in, 100, timeout=0.05)
+
+
+def test_short_record_is_an_error():
+    analog_in = _FakeAnalogIn([])
+    with pytest.raises(RuntimeError):
+        source_digilent._acquire_record(analog_in, 100, timeout=1.0, poll_interval=0)
+
+
+def test_stream_returns_every_sample_in_order():
+    stream = np.arange(1000, dtype=float)
+    analog_in = _FakeAnalogIn(_chunks(stream, 33), done=False)
+    reader = source_digilent._StreamReader(analog_in, 1000, poll_interval=1e-4)
+    reader.start()
+    try:
+        got = np.concatenate([reader.read(100, timeout=1.0) for _ in range(10)])
+    finally:
+        reader.stop()
+    np.testing.assert_array_equal(got, stream)
+    assert not analog_in.running
+
+
+def test_stream_reports_lost_samples_as_a_gap():
+    analog_in = _FakeAnalogIn(_chunks(np.zeros(300), 50), done=False, lost={2: 5})
+    reader = source_digilent._StreamReader(analog_in, 1000, poll_interval=1e-4)
+    reader.start()
+    try:
+        with pytest.raises(source.OverrunError):
+            for _ in range(3):
+                reader.read(100, timeout=1.0)
+    finally:
+        reader.stop()
+
+
+def test_stalled_stream_times_out():
+    analog_in = _FakeAnalogIn([], done=False)
+    reader = source_digilent._StreamReader(analog_in, 1000, poll_interval=1e-4)
+    reader.start()
+    try:
+        with pytest.raises(TimeoutError):
+            reader.read(100, timeout=0.05)
+    finally:
+        reader.stop()
+
+
+def test_stream_flush_and_discard():
+    # Long enough that the stream is still coming in after the flush.
+    stream = np.arange(200_000, dtype=float)
+    analog_in = _FakeAnalogIn(_chunks(stream, 50), done=False)
+    reader = source_digilent._StreamReader(analog_in, len(stream), poll_interval=1e-4)
+    reader.start()
+    try:
+        first = reader.read(100, timeout=1.0)
+        reader.flush()
+        assert reader.discard(30, timeout=1.0) == 30
+        second = reader.read(100, timeout=1.0)
+    finally:
+        reader.stop()
+    np.testing.assert_array_equal(first, stream[:100])
+    # Whatever the flush dropped, what follows is the stream, in order,
+    # 30 samples past where the flush left it.
+    start = int(second[0])
+    assert start >= 130
+    np.testing.assert_array_equal(second, stream[start : start + 100])
+
+
+def test_record_of_two_channels():
+    stream = np.arange(260, dtype=float).reshape(2, 130)
+    analog_in = _FakeAnalogIn(_chunks(stream, 40))
+    got = source_digilent._acquire_record(
+        analog_in, 100, timeout=1.0, poll_interval=0, channels=(0, 1)
+    )
+    np.testing.assert_array_equal(got, stream[:, -100:])
+
+
+def test_stream_of_two_channels():
+    stream = np.arange(2000, dtype=float).reshape(2, 1000)
+    analog_in = _FakeAnalogIn(_chunks(stream, 33), done=False)
+    reader = source_digilent._StreamReader(
+        analog_in, 1000, channels=(0, 1), poll_interval=1e-4
+    )
+    reader.start()
+    try:
+        got = [reader.read(100, timeout=1.0) for _ in range(10)]
+    finally:
+        reader.stop()
+    assert got[0].flags.c_contiguous
+    np.testing.assert_array_equal(np.concatenate(got, axis=-1), stream)
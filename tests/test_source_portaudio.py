@@ -0,0 +1,120 @@
+#
+# PortAudioSource against a stand-in stream: the test plays the part of
+# PortAudio's thread by calling the source's callback directly, so no
+# device is needed.
+#
+
+import argparse
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import source
+
+# A missing PortAudio is already a failure in test_imports; here it is
+# only a reason there is nothing to test.
+source.load_sources()
+if "source_portaudio" in source.UNAVAILABLE_BACKENDS:
+    pytest.skip(
+        f"PortAudio is unavailable: {source.UNAVAILABLE_BACKENDS['source_portaudio']}",
+        allow_module_level=True,
+    )
+source_portaudio = sys.modules["source_portaudio"]
+
+SAMPLE_FREQUENCY = 1000
+RECORD_LENGTH = 0.1
+BLOCK = 32
+
+
+class _FakeStream:
+    def __init__(self, samplerate, device, callback, **_kwargs):
+        self.callback = callback
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _open(monkeypatch, *argv, channels=None):
+    monkeypatch.setattr(source_portaudio.sounddevice, "InputStream", _FakeStream)
+    parser = argparse.ArgumentParser()
+    source_portaudio.PortAudioSource.augment_argparse(parser)
+    args = parser.parse_args(["-d", "0", *argv])
+    args.sample_frequency = SAMPLE_FREQUENCY
+    args.record_length = RECORD_LENGTH
+    args.channels = channels
+    return source_portaudio.PortAudioSource(args)
+
+
+def _feed(src, samples, overflow=False):
+    # samples are one channel, or frames of several.
+    status = types.SimpleNamespace(input_overflow=overflow)
+    samples = samples.reshape(len(samples), -1)
+    for start in range(0, len(samples), BLOCK):
+        block = samples[start : start + BLOCK]
+        src._stream.callback(block, len(block), None, status)
+
+
+def test_live_mode_keeps_only_the_newest_record(monkeypatch):
+    src = _open(monkeypatch)
+    assert not src.continuous
+    stream = np.arange(1000, dtype=float)
+    _feed(src, stream)
+    np.testing.assert_array_equal(src.read(), stream[-100:])
+
+
+def test_continuous_mode_returns_every_sample_in_order(monkeypatch):
+    src = _open(monkeypatch, "--continuous")
+    assert src.continuous
+    stream = np.arange(1000, dtype=float)
+    _feed(src, stream)
+    got = np.concatenate([src.read() for _ in range(10)])
+    np.testing.assert_array_equal(got, stream)
+
+
+def test_continuous_mode_reports_a_reader_that_fell_behind(monkeypatch):
+    src = _open(monkeypatch, "--continuous", "--max-backlog", "0.5")
+    _feed(src, np.zeros(1000))
+    with pytest.raises(source.OverrunError):
+        src.read()
+    # The backlog went with the error, and the new stream is whole.
+    _feed(src, np.arange(100, dtype=float))
+    np.testing.assert_array_equal(src.read(), np.arange(100))
+
+
+def test_continuous_mode_reports_device_overflow(monkeypatch):
+    src = _open(monkeypatch, "--continuous")
+    _feed(src, np.zeros(100), overflow=True)
+    with pytest.raises(source.OverrunError):
+        src.read()
+
+
+def test_flush_drops_the_backlog_and_any_gap(monkeypatch):
+    src = _open(monkeypatch, "--continuous", "--max-backlog", "0.5")
+    _feed(src, np.zeros(1000))
+    src.flush()
+    _feed(src, np.arange(100, dtype=float))
+    np.testing.assert_array_equal(src.read(), np.arange(100))
+
+
+def test_discard_drops_exactly_that_many(monkeypatch):
+    src = _open(monkeypatch, "--continuous")
+    _feed(src, np.arange(200, dtype=float))
+    assert src.discard(30) == 30
+    np.testing.assert_array_equal(src.read(), np.arange(30, 130))
+
+
+@pytest.mark.parametrize("channels", [(1, 2), (3, 1)])
+def test_channels_come_out_a_row_each(monkeypatch, channels):
+    src = _open(monkeypatch, "--continuous", channels=channels)
+    frames = np.arange(4000, dtype=float).reshape(1000, 4)
+    _feed(src, frames)
+    got = np.concatenate([src.read() for _ in range(10)], axis=-1)
+    np.testing.assert_array_equal(got, frames[:, list(channels)].T)
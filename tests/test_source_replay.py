@@ -0,0 +1,142 @@
+import argparse
+import time
+
+import numpy as np
+import pytest
+import scipy.io.wavfile
+
+import capture
+import source
+import source_replay
+
+SAMPLE_FREQUENCY = 8000
+RECORD_LENGTH = 0.01
+NUM_SAMPLES = 80
+
+
+def _args(path, **kwargs):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--sample-frequency", type=float)
+    parser.add_argument("-r", "--record-length", type=float)
+    source_replay.ReplaySource.augment_argparse(parser)
+    argv = ["-s", str(SAMPLE_FREQUENCY), "-r", str(RECORD_LENGTH), "-f", str(path)]
+    for key, value in kwargs.items():
+        option = "--" + key.replace("_", "-")
+        argv += [option] if value is True else [option, str(value)]
+    return parser.parse_args(argv)
+
+
+def _ramp(count):
+    return np.arange(count, dtype=float)
+
+
+def test_registered():
+    assert source.load_sources().get("replay") is source_replay.ReplaySource
+
+
+def test_npy_is_one_stream(tmp_path):
+    path = tmp_path / "ramp.npy"
+    np.save(path, _ramp(3 * NUM_SAMPLES + 10))
+    with source_replay.ReplaySource(_args(path)) as replay:
+        assert replay.continuous
+        records = [replay.read() for _ in range(3)]
+        with pytest.raises(EOFError):
+            replay.read()
+    np.testing.assert_array_equal(np.concatenate(records), _ramp(3 * NUM_SAMPLES))
+
+
+def test_loop_wraps_to_the_start(tmp_path):
+    path = tmp_path / "ramp.npy"
+    np.save(path, _ramp(NUM_SAMPLES + 30))
+    with source_replay.ReplaySource(_args(path, loop=True)) as replay:
+        replay.read()
+        second = replay.read()
+    np.testing.assert_array_equal(second, np.r_[_ramp(110)[NUM_SAMPLES:], _ramp(50)])
+
+
+def test_wav_is_scaled_to_full_scale(tmp_path):
+    path = tmp_path / "stereo.wav"
+    pcm = np.zeros((NUM_SAMPLES, 2), dtype=np.int16)
+    pcm[:, 1] = np.linspace(-(2**15), 2**15 - 1, NUM_SAMPLES).astype(np.int16)
+    scipy.io.wavfile.write(path, SAMPLE_FREQUENCY, pcm)
+    with source_replay.ReplaySource(_args(path, channel=1)) as replay:
+        samples = replay.read()
+        assert replay.sample_range() == (-1.0, 1.0)
+    np.testing.assert_array_equal(samples, pcm[:, 1] / 2**15)
+
+
+def test_wav_rate_must_match(tmp_path):
+    path = tmp_path / "tone.wav"
+    scipy.io.wavfile.write(path, 2 * SAMPLE_FREQUENCY, np.zeros(1000, np.int16))
+    with pytest.raises(ValueError, match="pass -s 16000"):
+        source_replay.ReplaySource(_args(path))
+
+
+def test_capture_directory_replays_its_records(tmp_path):
+    records = _ramp(3 * NUM_SAMPLES).reshape(3, NUM_SAMPLES)
+    with capture.CaptureWriter(tmp_path, NUM_SAMPLES, SAMPLE_FREQUENCY, "x") as w:
+        for record in records:
+            w.write(record)
+    with source_replay.ReplaySource(_args(tmp_path)) as replay:
+        assert replay.continuous
+        got = [replay.read() for _ in range(3)]
+    np.testing.assert_array_equal(got, records)
+
+
+def test_capture_with_gaps_is_not_one_stream(tmp_path):
+    with capture.CaptureWriter(tmp_path, NUM_SAMPLES, SAMPLE_FREQUENCY, "x") as w:
+        for i in range(3):
+            w.write(_ramp(NUM_SAMPLES), gap=i == 2)
+    with source_replay.ReplaySource(_args(tmp_path)) as replay:
+        assert not replay.continuous
+
+
+def test_paced_replay_keeps_to_the_clock(tmp_path):
+    path = tmp_path / "ramp.npy"
+    np.save(path, _ramp(100 * NUM_SAMPLES))
+    # Ten records at twice real time: 50 ms.
+    with source_replay.ReplaySource(_args(path, speed=2)) as replay:
+        start = time.monotonic()
+        for _ in range(10):
+            replay.read()
+        elapsed = time.monotonic() - start
+        assert 0.04 <= elapsed < 0.5
+        # What "arrived" while we were not reading is dropped.
+        time.sleep(0.05)
+        replay.flush()
+        assert replay.read()[0] >= 18 * NUM_SAMPLES
+
+
+def test_discard_skips_samples(tmp_path):
+    path = tmp_path / "ramp.npy"
+    np.save(path, _ramp(4 * NUM_SAMPLES))
+    with source_replay.ReplaySource(_args(path)) as replay:
+        replay.flush()
+        assert replay.discard(100) == 100
+        assert replay.read()[0] == 100
+
+
+def test_channels_of_a_multichannel_recording(tmp_path):
+    path = tmp_path / "three.npy"
+    frames = _ramp(3 * (NUM_SAMPLES + 10)).reshape(-1, 3)
+    np.save(path, frames)
+    args = _args(path, loop=True)
+    args.channels = (2, 0)
+    with source_replay.ReplaySource(args) as replay:
+        first = replay.read()
+        second = replay.read()
+    assert first.shape == (2, NUM_SAMPLES)
+    np.testing.assert_array_equal(first, frames[:NUM_SAMPLES, [2, 0]].T)
+    # Across the loop back to the start.
+    np.testing.assert_array_equal(
+        second, np.r_[frames[NUM_SAMPLES:], frames[:70]][:, [2, 0]].T
+    )
+
+
+def test_multichannel_capture_is_refused(tmp_path):
+    with capture.CaptureWriter(
+        tmp_path, NUM_SAMPLES, SAMPLE_FREQUENCY, "x", num_channels=2
+    ) as w:
+        w.write(np.zeros((2, NUM_SAMPLES)))
+    with pytest.raises(ValueError, match="2 channels"):
+        source_replay.ReplaySource(_args(tmp_path))
@@ -0,0 +1,125 @@
+import argparse
+
+import numpy as np
+import pytest
+
+import filters
+import sinad
+import source
+import source_synthetic
+
+
+def _source(*argv, sample_frequency=48_000, record_length=0.25, dtype=None):
+    parser = argparse.ArgumentParser()
+    source_synthetic.SyntheticSource.augment_argparse(parser)
+    args = parser.parse_args(argv)
+    args.sample_frequency = sample_frequency
+    args.record_length = record_length
+    args.dtype = dtype
+    return source_synthetic.SyntheticSource(args)
+
+
+def test_registered():
+    assert source.load_sources().get("synthetic") is source_synthetic.SyntheticSource
+
+
+@pytest.mark.parametrize("sample_frequency", [16_000, 48_000, 192_000])
+@pytest.mark.parametrize("sinad_dB", [6.0, 12.0, 20.0])
+def test_noise_gives_the_sinad_asked_for(sample_frequency, sinad_dB):
+    synthetic = _source("--sinad", str(sinad_dB), sample_frequency=sample_frequency)
+    readings = [sinad.measure(synthetic.read(), sample_frequency)[0] for _ in range(8)]
+    assert np.mean(readings) == pytest.approx(sinad_dB, abs=0.3)
+
+
+def test_harmonics_and_spurs_count_as_distortion():
+    # -20 dBc and -23 dBc of distortion, the rest noise, 12 dB in all.
+    synthetic = _source("--sinad", "12", "--harmonics", "-20", "--spur", "2500:-23")
+    readings = [sinad.measure(synthetic.read(), 48_000)[0] for _ in range(8)]
+    assert np.mean(readings) == pytest.approx(12.0, abs=0.3)
+
+
+def test_harmonic_without_noise():
+    synthetic = _source("--sinad", "inf", "--harmonics", "-30")
+    (reading, _) = sinad.measure(synthetic.read(), 48_000)
+    assert reading == pytest.approx(10 * np.log10(1 + 10**3), abs=0.05)
+
+
+def test_band_limiting_attenuates_hum():
+    synthetic = _source("--sinad", "inf", "--hum", "-20")
+    samples = synthetic.read()
+    assert sinad.measure(samples, 48_000)[0] == pytest.approx(20.04, abs=0.1)
+    audio_filter = filters.make_audio_filter(48_000, 200, 4000)
+    assert sinad.measure(audio_filter(samples), 48_000)[0] > 23
+
+
+def test_stream_is_continuous_and_repeatable():
+    short = _source("--seed", "7", "--harmonics", "-30", record_length=0.01)
+    long = _source("--seed", "7", "--harmonics", "-30", record_length=0.03)
+    joined = np.concatenate([short.read() for _ in range(3)])
+    np.testing.assert_allclose(joined, long.read(), atol=1e-9)
+
+
+def test_reads_are_independent_arrays():
+    synthetic = _source()
+    first = synthetic.read()
+    kept = first.copy()
+    synthetic.read()
+    np.testing.assert_array_equal(first, kept)
+
+
+def test_impairments_cannot_exceed_the_sinad():
+    with pytest.raises(ValueError):
+        _source("--sinad", "20", "--harmonics", "-10")
+    with pytest.raises(ValueError):
+        _source("--spur", "30000:-30")
+
+
+def test_float32_end_to_end():
+    synthetic = _source("--sinad", "12", "--hum", "-20", dtype="float32")
+    audio_filter = filters.make_audio_filter(48_000, 200.0, 4000.0)
+    samples = audio_filter(synthetic.read())
+    assert samples.dtype == np.float32
+    readings = [
+        sinad.measure(audio_filter(synthetic.read()), 48_000)[0] for _ in range(8)
+    ]
+    # The filter takes out the hum, leaving the noise: 12 dB over the
+    # whole band is about 20 dB in 200-4000 Hz.
+    assert 19 < np.mean(readings) < 21
+
+
+def test_float32_keeps_long_records_in_phase():
+    # 80 dB, over records long enough that a float32 phase would be
+    # reading 56.
+    readings = {}
+    for dtype in (None, "float32"):
+        synthetic = _source("--sinad", "80", record_length=20.0, dtype=dtype)
+        samples = synthetic.read()
+        readings[dtype] = sinad.measure(samples.astype(np.float64), 48_000)[0]
+    assert samples.dtype == np.float32
+    assert readings["float32"] == pytest.approx(readings[None], abs=0.5)
+    assert readings[None] == pytest.approx(80.0, abs=0.5)
+
+
+def test_channels_have_their_own_noise_and_sinad():
+    parser = argparse.ArgumentParser()
+    source_synthetic.SyntheticSource.augment_argparse(parser)
+    args = parser.parse_args(["--sinad", "12,30"])
+    (args.sample_frequency, args.record_length) = (48_000, 0.25)
+    args.channels = (0, 1)
+    synthetic = source_synthetic.SyntheticSource(args)
+    records = np.array([synthetic.read() for _ in range(8)])
+    assert records.shape == (8, 2, 12_000)
+    readings = sinad.measure_batch(records, 48_000)[0]
+    assert np.mean(readings, axis=0) == pytest.approx([12, 30], abs=0.5)
+    # The first channel is what a one-channel source would give.
+    np.testing.assert_array_equal(records[0, 0], _source("--sinad", "12").read())
+
+
+def test_sinad_per_channel_must_match_the_channels():
+    parser = argparse.ArgumentParser()
+    source_synthetic.SyntheticSource.augment_argparse(parser)
+    args = parser.parse_args(["--sinad", "12,20"])
+    (args.sample_frequency, args.record_length) = (48_000, 0.25)
+    args.channels = (0, 1, 2)
+    with pytest.raises(ValueError):
+        source_synthetic.SyntheticSource(args)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import sweep
+
+
+def _receiver(sem_dB=0.0, seed=0):
+    """
+    A receiver whose SINAD is S/N + 1, with S/N 0 dB at -115 dBm.
+
+    It crosses 12 dB at -115 + 10*log10(10**1.2 - 1), about -103.27 dBm.
+    Readings scatter about the curve by sem_dB.
+    """
+    rng = np.random.default_rng(seed)
+
+    def measure(power_dBm):
+        mean_dB = 10 * np.log10(1 + 10 ** ((power_dBm + 115) / 10))
+        return (mean_dB + sem_dB * rng.standard_normal(), sem_dB)
+
+    return measure
+
+
+CROSSING_DBM = -115 + 10 * np.log10(10**1.2 - 1)
+
+
+def test_linear_visits_every_level():
+    points = sweep.linear(_receiver(), -125, -95, 51)
+    assert [p[0] for p in points] == pytest.approx(np.linspace(-125, -95, 51))
+    assert sweep.crossing(points) == pytest.approx(CROSSING_DBM, abs=0.05)
+
+
+def test_adaptive_finds_the_crossing_in_few_points():
+    points = sweep.adaptive(_receiver(), -125, -95, tolerance_dB=0.1)
+    assert len(points) < 15
+    assert sweep.crossing(points) == pytest.approx(CROSSING_DBM, abs=0.1)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_adaptive_with_noisy_readings(seed):
+    points = sweep.adaptive(_receiver(0.05, seed), -125, -95, tolerance_dB=0.25)
+    assert len(points) < 20
+    assert sweep.crossing(points) == pytest.approx(CROSSING_DBM, abs=0.25)
+
+
+def test_adaptive_without_a_crossing_in_range():
+    points = sweep.adaptive(_receiver(), -140, -125)
+    assert [p[0] for p in points] == pytest.approx([-140, -135, -130, -125])
+    assert np.isnan(sweep.crossing(points))
+
+
+def test_crossing_is_taken_in_power_order():
+    """A dip back below the target after the crossing is not the crossing."""
+    points = [(-110, 8.0, 0), (-105, 13.0, 0), (-100, 11.0, 0), (-95, 20.0, 0)]
+    assert sweep.crossing(points[::-1]) == pytest.approx(-106.0)
+
+
+def test_running_stats_matches_numpy():
+    rng = np.random.default_rng(0)
+    readings = rng.normal(12.0, 0.7, 100)
+    stats = sweep.RunningStats()
+    for start in range(0, 100, 13):
+        stats.update(readings[start : start + 13])
+    assert stats.count == 100
+    assert stats.mean == pytest.approx(readings.mean(), abs=1e-12)
+    assert stats.std == pytest.approx(readings.std(), abs=1e-12)
+    assert stats.sem == pytest.approx(
+        readings.std(ddof=1) / np.sqrt(len(readings)), abs=1e-12
+    )
+
+
+def test_running_stats_skips_nan():
+    stats = sweep.RunningStats()
+    stats.update([float("nan")])
+    assert stats.count == 0
+    assert np.isnan(stats.mean) and np.isnan(stats.std) and np.isnan(stats.sem)
+    stats.update([1.0, float("nan"), 3.0])
+    assert (stats.count, stats.mean) == (2, 2.0)
+
+
+def test_sinad_columns_are_suffixed_only_with_several_channels():
+    stats = sweep.RunningStats()
+    stats.update([11.0, 13.0])
+    assert sweep.sinad_columns([stats], (0,)) == {
+        "sinad_mean_dB": 12.0,
+        "sinad_std_dB": 1.0,
+        "sinad_sem_dB": pytest.approx(1.0),
+        "sinad_n": 2,
+    }
+    columns = sweep.sinad_columns([stats, sweep.RunningStats()], (1, 3))
+    assert list(columns)[:5] == [
+        "sinad_mean_dB_ch1",
+        "sinad_std_dB_ch1",
+        "sinad_sem_dB_ch1",
+        "sinad_n_ch1",
+        "sinad_mean_dB_ch3",
+    ]
+    assert columns["sinad_n_ch3"] == 0
@@ -0,0 +1,44 @@
+import pytest
+
+import keithley_burst
+import sweep_settings
+
+
+def test_check_fills_in_the_defaults():
+    settings = sweep_settings.check({"num_points": 5})
+    assert settings == sweep_settings.DEFAULTS._replace(num_points=5)
+    # The command line's, which a sweep started any other way gets too.
+    assert settings.settle_time == 0.25
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {"resume": True},
+        {"jobs": 0},
+        {"settle_time": -1.0},
+        {"strategy": "random"},
+        {"num_points": 0},
+        {"min_readings": 0},
+        {"min_readings": 20, "max_readings": 10},
+        {"max_readings": keithley_burst.MAX_READINGS + 1},
+        {"keithley_readings": keithley_burst.MAX_READINGS + 1},
+        {"target_sem_dB": 0.0},
+        {"band_limit": "none"},
+        {"filter_spec": [100.0, 3500.0, 0.1, 60.0]},
+        {"filter_spec": [100.0, 4500.0, 0.1]},
+    ],
+)
+def test_check_refuses(settings):
+    with pytest.raises(ValueError):
+        sweep_settings.check(settings)
+
+
+def test_the_keithley_may_take_fewer_than_max_readings():
+    max_readings = keithley_burst.MAX_READINGS + 1
+    sweep_settings.check({"max_readings": max_readings, "keithley_readings": 10})
+
+
+def test_a_manifests_filter_spec_is_a_tuple():
+    settings = sweep_settings.check({"filter_spec": [100, 4500, 0.1, 60]})
+    assert settings.filter_spec == (100, 4500, 0.1, 60)